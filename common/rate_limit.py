@@ -0,0 +1,370 @@
+"""
+Cross-Process Rate Limiting
+
+Token buckets for requests-per-minute and tokens-per-minute, stored in a local
+SQLite file so every worker process on the machine shares the same limits.
+Calls are retried with exponential backoff and jitter, honoring Retry-After,
+and a 429 makes *all* processes back off together instead of retry-storming.
+
+Both sessions use this one module: their helpers.py put common/ on sys.path.
+"""
+
+import asyncio
+import os
+import random
+import sqlite3
+import time
+from contextlib import closing
+from typing import Any, Dict, Optional
+
+import openai
+from langchain_openai import ChatOpenAI
+
+# Relative to this folder, not the working directory
+CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "cache")
+
+RETRYABLE_ERRORS = (
+    openai.RateLimitError,
+    openai.APITimeoutError,
+    openai.APIConnectionError,
+    openai.InternalServerError,
+)
+
+
+class BudgetExceeded(Exception):
+    """Raised when a model has used up its token budget."""
+
+
+class WaitTooLong(Exception):
+    """Raised by acquire() when the limiter would make the caller wait longer than `max_wait`."""
+
+    def __init__(self, model, wait):
+        super().__init__(f"{model} is rate limited for another {wait:.1f}s")
+        self.wait = wait
+
+
+class RateLimiter:
+    """Shared RPM/TPM token buckets plus per-model token budgets.
+
+    `rpm`/`tpm` apply per model. `budgets` maps model name -> max total tokens.
+    """
+
+    def __init__(self, path=os.path.join(CACHE_DIR, "rate_limits.db"), rpm=60, tpm=100_000, budgets: Optional[Dict[str, int]] = None):
+        self.path = path
+        self.rpm = rpm
+        self.tpm = tpm
+        self.budgets = budgets or {}
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with closing(self._connect()) as conn:
+            conn.execute("CREATE TABLE IF NOT EXISTS buckets (name TEXT PRIMARY KEY, level REAL, updated REAL)")
+            conn.execute("CREATE TABLE IF NOT EXISTS cooldown (model TEXT PRIMARY KEY, until REAL)")
+            conn.execute("CREATE TABLE IF NOT EXISTS usage (model TEXT PRIMARY KEY, requests INTEGER, tokens INTEGER)")
+
+    def _connect(self):
+        # autocommit; transactions are opened explicitly with BEGIN IMMEDIATE,
+        # which takes the database write lock and serializes processes
+        return sqlite3.connect(self.path, timeout=30, isolation_level=None)
+
+    def _level(self, conn, name, capacity, now):
+        row = conn.execute("SELECT level, updated FROM buckets WHERE name = ?", (name,)).fetchone()
+        if row is None:
+            return capacity
+        level, updated = row
+        return min(capacity, level + (now - updated) * capacity / 60.0)
+
+    def _set_level(self, conn, name, level, now):
+        conn.execute("INSERT OR REPLACE INTO buckets (name, level, updated) VALUES (?, ?, ?)", (name, level, now))
+
+    def _try_acquire(self, model, tokens):
+        """Take one request and `tokens` tokens if available; else return seconds to wait."""
+        tokens = min(tokens, self.tpm)
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            now = time.time()
+            row = conn.execute("SELECT until FROM cooldown WHERE model = ?", (model,)).fetchone()
+            if row and row[0] > now:
+                conn.execute("COMMIT")
+                return row[0] - now
+            budget = self.budgets.get(model)
+            if budget is not None:
+                used = conn.execute("SELECT tokens FROM usage WHERE model = ?", (model,)).fetchone()
+                if used and used[0] >= budget:
+                    conn.execute("COMMIT")
+                    raise BudgetExceeded(f"{model} has used its budget of {budget} tokens")
+            requests_level = self._level(conn, f"{model}:requests", self.rpm, now)
+            tokens_level = self._level(conn, f"{model}:tokens", self.tpm, now)
+            wait = max(
+                (1 - requests_level) * 60.0 / self.rpm,
+                (tokens - tokens_level) * 60.0 / self.tpm,
+                0.0,
+            )
+            if wait == 0:
+                self._set_level(conn, f"{model}:requests", requests_level - 1, now)
+                self._set_level(conn, f"{model}:tokens", tokens_level - tokens, now)
+            conn.execute("COMMIT")
+            return wait
+        finally:
+            conn.close()
+
+    def acquire(self, model, tokens, max_wait=None):
+        """Block until a request of roughly `tokens` tokens may be sent.
+
+        With `max_wait`, raise WaitTooLong rather than wait more than that in total.
+        """
+        give_up_at = None if max_wait is None else time.monotonic() + max_wait
+        while True:
+            wait = self._try_acquire(model, tokens)
+            if wait == 0:
+                return
+            if give_up_at is not None and time.monotonic() + wait > give_up_at:
+                raise WaitTooLong(model, wait)
+            time.sleep(wait)
+
+    async def aacquire(self, model, tokens, max_wait=None):
+        give_up_at = None if max_wait is None else time.monotonic() + max_wait
+        while True:
+            wait = await asyncio.to_thread(self._try_acquire, model, tokens)
+            if wait == 0:
+                return
+            if give_up_at is not None and time.monotonic() + wait > give_up_at:
+                raise WaitTooLong(model, wait)
+            await asyncio.sleep(wait)
+
+    def record(self, model, estimated_tokens, actual_tokens):
+        """Correct the token bucket with the real usage and add it to the budget."""
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            now = time.time()
+            level = self._level(conn, f"{model}:tokens", self.tpm, now)
+            self._set_level(conn, f"{model}:tokens", level + estimated_tokens - actual_tokens, now)
+            conn.execute(
+                "INSERT INTO usage (model, requests, tokens) VALUES (?, 1, ?) "
+                "ON CONFLICT(model) DO UPDATE SET requests = requests + 1, tokens = tokens + excluded.tokens",
+                (model, actual_tokens),
+            )
+            conn.execute("COMMIT")
+        finally:
+            conn.close()
+
+    def cool_down(self, model, seconds):
+        """Pause every process sending to `model` for `seconds` (after a 429)."""
+        with closing(self._connect()) as conn:
+            until = time.time() + seconds
+            conn.execute(
+                "INSERT INTO cooldown (model, until) VALUES (?, ?) "
+                "ON CONFLICT(model) DO UPDATE SET until = MAX(until, excluded.until)",
+                (model, until),
+            )
+
+    def usage(self):
+        with closing(self._connect()) as conn:
+            rows = conn.execute("SELECT model, requests, tokens FROM usage").fetchall()
+        return {model: {"requests": requests, "tokens": tokens} for model, requests, tokens in rows}
+
+
+# ============================================================================
+# Retries
+# ============================================================================
+
+def _retry_after(error) -> Optional[float]:
+    response = getattr(error, "response", None)
+    if response is None:
+        return None
+    headers = response.headers
+    try:
+        if "retry-after-ms" in headers:
+            return float(headers["retry-after-ms"]) / 1000
+        if "retry-after" in headers:
+            return float(headers["retry-after"])
+    except ValueError:
+        pass
+    return None
+
+
+def backoff_delay(attempt, error=None, base=1.0, cap=60.0) -> float:
+    """Full-jitter exponential backoff, never shorter than the server's Retry-After."""
+    delay = random.uniform(0, min(cap, base * 2 ** attempt))
+    retry_after = _retry_after(error) if error is not None else None
+    if retry_after is not None:
+        delay = max(delay, retry_after + random.uniform(0, base))
+    return delay
+
+
+def _content_chars(content) -> int:
+    # Lengths only: str() of a list of content parts would copy (and escape) all of it
+    if isinstance(content, str):
+        return len(content)
+    return sum(len(part) if isinstance(part, str) else len(part.get("text", "")) for part in content)
+
+
+def _estimate_tokens(messages, max_tokens) -> int:
+    chars = sum(_content_chars(message.content) for message in messages)
+    return chars // 4 + (max_tokens or 256)
+
+
+def _streamed_tokens(messages, streamed_chars) -> int:
+    # The prompt plus what was generated; used when no usage arrived (the stream was cut short)
+    return (sum(_content_chars(message.content) for message in messages) + streamed_chars) // 4
+
+
+def _actual_tokens(result, estimate) -> int:
+    usage = (result.llm_output or {}).get("token_usage") or {}
+    return usage.get("total_tokens") or estimate
+
+
+class RateLimitedChatOpenAI(ChatOpenAI):
+    """ChatOpenAI that waits for the shared limiter and retries transient errors itself.
+
+    Streaming calls are limited too; a stream is only retried if it failed
+    before its first chunk, and one closed early is recorded with the tokens
+    streamed so far. With a `deadline` (anything with
+    `check(what, needed)`, e.g. deadline.Deadline), no attempt starts once the
+    budget is spent, every attempt sends the remaining budget as its timeout,
+    and a limiter wait or retry backoff longer than what is left raises the
+    deadline's error instead of sleeping past it.
+    """
+
+    limiter: Optional[Any] = None
+    deadline: Optional[Any] = None
+    max_attempts: int = 6
+
+    def _call_kwargs(self, kwargs):
+        if self.deadline is None:
+            return kwargs
+        return {**kwargs, "timeout": self.deadline.check("LLM call")}
+
+    def _max_wait(self):
+        """The remaining budget (None without a deadline); raises if it is already spent."""
+        return None if self.deadline is None else self.deadline.check("LLM call")
+
+    def _out_of_time(self, error: WaitTooLong):
+        # the budget is shorter than the wait, so this raises the deadline's own error
+        self.deadline.check("rate limit wait", needed=error.wait)
+        raise error
+
+    def _acquire(self, estimate):
+        try:
+            self.limiter.acquire(self.model_name, estimate, max_wait=self._max_wait())
+        except WaitTooLong as e:
+            self._out_of_time(e)
+
+    async def _aacquire(self, estimate):
+        try:
+            await self.limiter.aacquire(self.model_name, estimate, max_wait=self._max_wait())
+        except WaitTooLong as e:
+            self._out_of_time(e)
+
+    def _retry_delay(self, attempt, error):
+        """Seconds this caller should sleep before the next attempt (0 after a 429: the limiter waits)."""
+        if attempt == self.max_attempts - 1:
+            raise error
+        delay = backoff_delay(attempt, error)
+        if isinstance(error, openai.RateLimitError):
+            self.limiter.cool_down(self.model_name, delay)
+            return 0.0
+        if self.deadline is not None:
+            self.deadline.check(f"retrying after {type(error).__name__}", needed=delay)
+        return delay
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        if self.limiter is None:
+            return super()._generate(messages, stop=stop, run_manager=run_manager, **self._call_kwargs(kwargs))
+        estimate = _estimate_tokens(messages, self.max_tokens)
+        for attempt in range(self.max_attempts):
+            self._acquire(estimate)
+            try:
+                result = super()._generate(messages, stop=stop, run_manager=run_manager, **self._call_kwargs(kwargs))
+            except RETRYABLE_ERRORS as e:
+                time.sleep(self._retry_delay(attempt, e))
+                continue
+            self.limiter.record(self.model_name, estimate, _actual_tokens(result, estimate))
+            return result
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs):
+        if self.limiter is None:
+            return await super()._agenerate(messages, stop=stop, run_manager=run_manager, **self._call_kwargs(kwargs))
+        estimate = _estimate_tokens(messages, self.max_tokens)
+        for attempt in range(self.max_attempts):
+            await self._aacquire(estimate)
+            try:
+                result = await super()._agenerate(messages, stop=stop, run_manager=run_manager,
+                                                  **self._call_kwargs(kwargs))
+            except RETRYABLE_ERRORS as e:
+                await asyncio.sleep(self._retry_delay(attempt, e))
+                continue
+            await asyncio.to_thread(self.limiter.record, self.model_name, estimate, _actual_tokens(result, estimate))
+            return result
+
+    def _stream(self, messages, stop=None, run_manager=None, **kwargs):
+        if self.limiter is None:
+            yield from super()._stream(messages, stop=stop, run_manager=run_manager, **self._call_kwargs(kwargs))
+            return
+        estimate = _estimate_tokens(messages, self.max_tokens)
+        for attempt in range(self.max_attempts):
+            self._acquire(estimate)
+            usage, started, streamed = None, False, 0
+            try:
+                for chunk in super()._stream(messages, stop=stop, run_manager=run_manager, **self._call_kwargs(kwargs)):
+                    started = True
+                    usage = chunk.message.usage_metadata or usage
+                    streamed += len(chunk.text)
+                    yield chunk
+            except RETRYABLE_ERRORS as e:
+                if started:
+                    raise  # part of the answer is already out; a retry would repeat it
+                time.sleep(self._retry_delay(attempt, e))
+                continue
+            except GeneratorExit:
+                # Closed early by the caller (e.g. an agent dispatching a tool mid-stream)
+                self.limiter.record(self.model_name, estimate, _streamed_tokens(messages, streamed))
+                raise
+            self.limiter.record(self.model_name, estimate,
+                                (usage or {}).get("total_tokens") or _streamed_tokens(messages, streamed))
+            return
+
+    async def _astream(self, messages, stop=None, run_manager=None, **kwargs):
+        if self.limiter is None:
+            async for chunk in super()._astream(messages, stop=stop, run_manager=run_manager,
+                                                **self._call_kwargs(kwargs)):
+                yield chunk
+            return
+        estimate = _estimate_tokens(messages, self.max_tokens)
+        for attempt in range(self.max_attempts):
+            await self._aacquire(estimate)
+            usage, started, streamed = None, False, 0
+            try:
+                async for chunk in super()._astream(messages, stop=stop, run_manager=run_manager,
+                                                    **self._call_kwargs(kwargs)):
+                    started = True
+                    usage = chunk.message.usage_metadata or usage
+                    streamed += len(chunk.text)
+                    yield chunk
+            except RETRYABLE_ERRORS as e:
+                if started:
+                    raise
+                await asyncio.sleep(self._retry_delay(attempt, e))
+                continue
+            except GeneratorExit:
+                # Not awaited: the generator may be being finalized rather than aclose()d
+                self.limiter.record(self.model_name, estimate, _streamed_tokens(messages, streamed))
+                raise
+            await asyncio.to_thread(self.limiter.record, self.model_name, estimate,
+                                    (usage or {}).get("total_tokens") or _streamed_tokens(messages, streamed))
+            return
+
+
+_shared_limiter = None
+
+
+def get_shared_limiter():
+    """Limiter configured from OPENROUTER_RPM / OPENROUTER_TPM, or None if unset."""
+    global _shared_limiter
+    if _shared_limiter is None and os.getenv("OPENROUTER_RPM"):
+        _shared_limiter = RateLimiter(
+            path=os.getenv("RATE_LIMIT_DB", os.path.join(CACHE_DIR, "rate_limits.db")),
+            rpm=int(os.getenv("OPENROUTER_RPM")),
+            tpm=int(os.getenv("OPENROUTER_TPM", "100000")),
+        )
+    return _shared_limiter
@@ -0,0 +1,84 @@
+"""
+Thin Client for the Worker Daemon
+
+Sends one query to service/worker.py over its Unix socket and prints the
+answer as it streams back. Only the standard library is imported, so a query
+starts in milliseconds; everything heavy is already loaded in the workers.
+
+Usage:
+    python service/client.py ask "Who is the author?"
+    python service/client.py travel "Distance from Lahore to Murree?"
+    python service/client.py react "What is 15 * 8?" --steps
+    python service/client.py ask            # interactive, like 6_talk_pdf_2.py
+"""
+
+import argparse
+import json
+import os
+import socket
+import sys
+
+
+def default_socket_path():
+    # same default as worker.py, without importing it (and the sessions with it)
+    return os.getenv("DEMO_WORKER_SOCKET") or f"/tmp/langchain-demos-{os.getuid()}.sock"
+
+
+def query(command, text="", socket_path=None):
+    """Yield the worker's events (dicts) for one query as they arrive."""
+    conn = socket.socket(socket.AF_UNIX)
+    try:
+        conn.connect(socket_path or default_socket_path())
+    except OSError:
+        conn.close()
+        raise ConnectionError(f"No worker daemon on {socket_path or default_socket_path()}; "
+                              "start one with: python service/worker.py") from None
+    with conn, conn.makefile("rwb") as stream:
+        stream.write((json.dumps({"command": command, "input": text}) + "\n").encode())
+        stream.flush()
+        for line in stream:
+            yield json.loads(line)
+
+
+def print_answer(command, text, socket_path=None, steps=False):
+    for event in query(command, text, socket_path):
+        if "token" in event:
+            print(event["token"], end="", flush=True)
+        elif "step" in event:
+            if steps:
+                step = event["step"]
+                print(f"[{step['tool']}] {step['tool_input']} -> {step['observation']}", flush=True)
+        elif "error" in event:
+            print(f"Error: {event['error']}", file=sys.stderr)
+            return False
+        elif "output" in event:
+            output = event["output"]
+            print(output if isinstance(output, str) else json.dumps(output), end="")
+    print()
+    return True
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Query the warm worker daemon")
+    parser.add_argument("command", choices=["ask", "travel", "react", "ping"])
+    parser.add_argument("text", nargs="?", help="question (omit for an interactive session)")
+    parser.add_argument("--socket", default=None)
+    parser.add_argument("--steps", action="store_true", help="show the agent's tool calls")
+    args = parser.parse_args()
+
+    try:
+        if args.text is not None or args.command == "ping":
+            sys.exit(0 if print_answer(args.command, args.text or "", args.socket, args.steps) else 1)
+        print("Ask questions (type 'quit' to exit):")
+        while True:
+            question = input("\nQuestion: ")
+            if question.lower() == "quit":
+                break
+            print("Answer: ", end="")
+            print_answer(args.command, question, args.socket, args.steps)
+    except ConnectionError as e:
+        sys.exit(str(e))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,276 @@
+"""
+Agent Service
+
+An asyncio HTTP service in front of the travel agent (session-4) and the PDF
+Q&A `ask` (session-2), built to hold steady under bursty traffic:
+
+- per-endpoint concurrency limits, with a bounded queue of waiting requests
+- load shedding: when the queue is full, answer 429 right away with Retry-After
+- streaming responses (agent steps / answer tokens as they happen)
+- graceful drain: on shutdown stop taking requests and let in-flight ones finish
+- agent logs as JSON lines on stderr, tagged with each request's run_id; the
+  most recent ones are served by /traces
+
+Usage:
+    python service/server.py --port 8080
+    curl -N localhost:8080/travel -d '{"input": "Distance from Lahore to Murree?", "stream": true}'
+    curl -N localhost:8080/ask -d '{"question": "Who is the author?", "stream": true}'
+    curl 'localhost:8080/traces?run_id=3f2a9c1d'
+"""
+
+import argparse
+import asyncio
+import contextlib
+import json
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from aiohttp import web
+
+from sessions import load_session_module
+
+_DONE = object()
+
+
+class ServiceState:
+    """Mutable service-wide state (the aiohttp app itself is frozen once started)."""
+
+    def __init__(self, config):
+        self.draining = False
+        self.in_flight = 0
+        self.idle = asyncio.Event()
+        self.idle.set()
+        self.endpoints = {
+            "travel": Endpoint("travel", config.travel_concurrency, config.queue_size),
+            "ask": Endpoint("ask", config.ask_concurrency, config.queue_size),
+        }
+
+
+class Endpoint:
+    """Concurrency limit plus a bounded wait queue for one route."""
+
+    def __init__(self, name, concurrency, queue_size):
+        self.name = name
+        self.semaphore = asyncio.Semaphore(concurrency)
+        self.queue_size = queue_size
+        self.waiting = 0
+        self.stats = {"accepted": 0, "shed": 0, "completed": 0, "failed": 0}
+
+    def full(self):
+        return self.semaphore.locked() and self.waiting >= self.queue_size
+
+
+# ============================================================================
+# Running sync work off the event loop
+# ============================================================================
+
+async def _stream_from_thread(pool, make_iterator):
+    """Run a blocking iterator in the pool and yield its items on the event loop.
+
+    If the consumer stops early (client disconnect, cancellation), the producer
+    is told to stop and closes the iterator, so the pool thread is free again
+    by the time this generator has been closed.
+    """
+    loop = asyncio.get_running_loop()
+    queue = asyncio.Queue()
+    stop = threading.Event()
+
+    def produce():
+        iterator = make_iterator()
+        try:
+            for item in iterator:
+                if stop.is_set():
+                    break
+                loop.call_soon_threadsafe(queue.put_nowait, item)
+        except Exception as e:
+            loop.call_soon_threadsafe(queue.put_nowait, e)
+        finally:
+            # runs the iterator's own cleanup (with-blocks, open streams) now, not at GC
+            close = getattr(iterator, "close", None)
+            if close is not None:
+                close()
+            loop.call_soon_threadsafe(queue.put_nowait, _DONE)
+
+    future = loop.run_in_executor(pool, produce)
+    try:
+        while True:
+            item = await queue.get()
+            if item is _DONE:
+                break
+            if isinstance(item, Exception):
+                raise item
+            yield item
+    finally:
+        stop.set()
+        # hold the caller's concurrency slot until the thread is actually free
+        await asyncio.shield(future)
+
+
+def _travel_events(app, question):
+    """Agent steps as dicts, ending with the final (or, past the deadline, partial) output."""
+    travel, deadlines = app["travel"], app["deadline"]
+    travel.pull_react_prompt()  # fetched once; never charged to the request's deadline
+    deadline = deadlines.Deadline(app["config"].deadline)
+    agent = travel.create_travel_agent(deadline=deadline)
+    # The run ID tags this request's log records; GET /traces?run_id=... returns them
+    with app["agent_log"].run_context() as run_id:
+        for chunk in deadlines.iter_with_deadline(agent, {"input": question}, deadline):
+            if "stopped_reason" in chunk:
+                yield {"output": chunk["output"], "stopped_reason": chunk["stopped_reason"], "run_id": run_id}
+                return
+            for action, observation in chunk.get("intermediate_step", []):
+                yield {"tool": action.tool, "tool_input": action.tool_input, "observation": str(observation)}
+
+
+def _ask_events(pdf, question):
+    """Answer tokens as dicts; closing this closes ask_stream and frees its prompt budget."""
+    with contextlib.closing(pdf.ask_stream(question)) as tokens:
+        for token in tokens:
+            yield {"token": token}
+
+
+# ============================================================================
+# Handlers
+# ============================================================================
+
+def guarded(endpoint_name):
+    """Admission control: drain check, load shedding, then the concurrency slot."""
+    def decorator(handler):
+        async def wrapper(request):
+            state = request.app["state"]
+            endpoint = state.endpoints[endpoint_name]
+            if state.draining:
+                return web.json_response({"error": "shutting down"}, status=503, headers={"Retry-After": "5"})
+            if endpoint.full():
+                endpoint.stats["shed"] += 1
+                return web.json_response({"error": "too busy"}, status=429, headers={"Retry-After": "1"})
+
+            endpoint.waiting += 1
+            try:
+                await endpoint.semaphore.acquire()
+            finally:
+                endpoint.waiting -= 1
+            endpoint.stats["accepted"] += 1
+            state.in_flight += 1
+            state.idle.clear()
+            try:
+                response = await handler(request)
+                endpoint.stats["completed"] += 1
+                return response
+            except Exception:
+                endpoint.stats["failed"] += 1
+                raise
+            finally:
+                endpoint.semaphore.release()
+                state.in_flight -= 1
+                if state.in_flight == 0:
+                    state.idle.set()
+        return wrapper
+    return decorator
+
+
+async def _respond(request, events, stream, final):
+    """Either stream events as NDJSON lines or return `final(events)` as one JSON body."""
+    try:
+        if not stream:
+            items = [item async for item in events]
+            return web.json_response(final(items))
+        response = web.StreamResponse(headers={"Content-Type": "application/x-ndjson"})
+        await response.prepare(request)
+        async for item in events:
+            await response.write((json.dumps(item) + "\n").encode())
+        await response.write_eof()
+        return response
+    finally:
+        # on a disconnect (ConnectionResetError) or cancellation, stop the producer now
+        await events.aclose()
+
+
+@guarded("travel")
+async def travel_handler(request):
+    body = await request.json()
+    app = request.app
+    question = body["input"]
+    events = _stream_from_thread(app["pool"], lambda: _travel_events(app, question))
+    return await _respond(request, events, body.get("stream", False),
+                          lambda items: {"output": items[-1].get("output"), "run_id": items[-1].get("run_id"),
+                                         "stopped_reason": items[-1].get("stopped_reason"), "steps": items[:-1]})
+
+
+@guarded("ask")
+async def ask_handler(request):
+    body = await request.json()
+    app = request.app
+    question = body["question"]
+    events = _stream_from_thread(app["pool"], lambda: _ask_events(app["pdf"], question))
+    return await _respond(request, events, body.get("stream", False),
+                          lambda items: {"answer": "".join(item["token"] for item in items)})
+
+
+async def traces_handler(request):
+    agent_log = request.app["agent_log"]
+    run_id = request.query.get("run_id")
+    limit = int(request.query.get("limit", 200))
+    return web.json_response({"traces": agent_log.recent_traces(run_id, limit), "dropped": agent_log.dropped_records()})
+
+
+async def stats_handler(request):
+    state = request.app["state"]
+    return web.json_response({
+        "in_flight": state.in_flight,
+        "draining": state.draining,
+        "endpoints": {name: {**e.stats, "waiting": e.waiting} for name, e in state.endpoints.items()},
+    })
+
+
+# ============================================================================
+# App lifecycle
+# ============================================================================
+
+async def on_shutdown(app):
+    # Stop admitting new work, then give in-flight requests time to finish
+    state = app["state"]
+    state.draining = True
+    try:
+        await asyncio.wait_for(state.idle.wait(), timeout=app["config"].drain_timeout)
+    except asyncio.TimeoutError:
+        app["agent_log"].log_event("service.drain_timeout", logging.WARNING, in_flight=state.in_flight)
+    app["pool"].shutdown(wait=False)
+
+
+def create_app(config):
+    app = web.Application()
+    app["config"] = config
+    app["state"] = ServiceState(config)
+    app["pool"] = ThreadPoolExecutor(max_workers=config.travel_concurrency + config.ask_concurrency)
+    app["pdf"] = load_session_module("session-2", "6_talk_pdf_2")
+    app["pdf"].get_paged_document()  # the scripts load lazily; a service pays that cost before serving
+    app["travel"] = load_session_module("session-4", "4_agent_travel")
+    app["agent_log"] = load_session_module("session-4", "agent_log")
+    app["deadline"] = load_session_module("session-4", "deadline")
+    app["agent_log"].configure_logging(config.log_level, json_lines=True)
+    app.router.add_post("/travel", travel_handler)
+    app.router.add_post("/ask", ask_handler)
+    app.router.add_get("/stats", stats_handler)
+    app.router.add_get("/traces", traces_handler)
+    app.on_shutdown.append(on_shutdown)
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description="HTTP service for the travel agent and PDF Q&A")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--travel-concurrency", type=int, default=8)
+    parser.add_argument("--ask-concurrency", type=int, default=4)
+    parser.add_argument("--queue-size", type=int, default=32, help="waiting requests per endpoint before 429s")
+    parser.add_argument("--deadline", type=float, default=60.0, help="seconds per travel agent run")
+    parser.add_argument("--drain-timeout", type=float, default=30.0)
+    parser.add_argument("--log-level", default="INFO", help="agent log level (records go to stderr as JSON lines)")
+    config = parser.parse_args()
+    web.run_app(create_app(config), host=config.host, port=config.port, shutdown_timeout=config.drain_timeout)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""
+Loading session modules side by side
+
+session-2 and session-4 are written as standalone script folders and both have
+a `helpers.py`. To use them in one process, each module is loaded from its
+file under a name of its own: session-2/helpers.py becomes `session2.helpers`,
+session-4/helpers.py `session4.helpers`. What they share (common/rate_limit.py)
+is an ordinary module, imported once for both.
+
+The scripts import their siblings by bare name (`from helpers import get_llm`),
+often inside functions, long after loading. Each loaded module therefore gets
+its own `__import__` (through its `__builtins__`) that maps the names of the
+files in its folder to that session's modules; every other import, and every
+module outside the sessions, goes through the normal import system untouched.
+"""
+
+import builtins
+import importlib.util
+import os
+import sys
+import threading
+import types
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+_sessions = {}
+_sessions_lock = threading.Lock()
+
+
+def session_path(session):
+    return os.path.join(ROOT, session)
+
+
+class _Session:
+    """The modules loaded from one session folder, under the `session2.` style package name."""
+
+    def __init__(self, session):
+        self.path = session_path(session)
+        self.package = session.replace("-", "")
+        # listed once: resolving an import is a set lookup, not a filesystem check
+        self.siblings = {name[:-3] for name in os.listdir(self.path) if name.endswith(".py")}
+        self.modules = {}  # fully loaded
+        self._loading = {}  # being executed, visible to their own thread's (circular) imports
+        self.lock = threading.RLock()
+        self.builtins = {**builtins.__dict__, "__import__": self._import}
+        package = types.ModuleType(self.package)
+        package.__path__ = []  # nothing is found through it; modules are loaded by file
+        sys.modules[self.package] = package
+
+    def _import(self, name, globals=None, locals=None, fromlist=(), level=0):
+        if level == 0 and name in self.siblings:
+            return self.load(name)
+        return builtins.__import__(name, globals, locals, fromlist, level)
+
+    def load(self, module_name):
+        module = self.modules.get(module_name)
+        if module is not None:
+            return module
+        with self.lock:
+            module = self.modules.get(module_name) or self._loading.get(module_name)
+            if module is not None:
+                return module
+            qualified = f"{self.package}.{module_name}"
+            spec = importlib.util.spec_from_file_location(qualified, os.path.join(self.path, module_name + ".py"))
+            module = importlib.util.module_from_spec(spec)
+            module.__builtins__ = self.builtins
+            self._loading[module_name] = sys.modules[qualified] = module
+            try:
+                spec.loader.exec_module(module)
+            except BaseException:
+                sys.modules.pop(qualified, None)
+                raise
+            finally:
+                del self._loading[module_name]
+            self.modules[module_name] = module
+            setattr(sys.modules[self.package], module_name, module)
+            return module
+
+
+def _session(session):
+    with _sessions_lock:
+        if session not in _sessions:
+            _sessions[session] = _Session(session)
+        return _sessions[session]
+
+
+def load_session_module(session, module_name):
+    """Import `module_name` from the given session folder and return the module."""
+    return _session(session).load(module_name)
@@ -0,0 +1,232 @@
+"""
+Warm Worker Daemon
+
+Every run of a script like 6_talk_pdf_2.py or 5_react_deep_dive.py starts
+Python, imports the langchain stack, builds clients and reloads the PDF before
+it answers anything. This daemon pays that once and then answers queries from
+service/client.py over a Unix socket, streaming the answer back.
+
+- the supervisor imports the session modules and maps the PDF, binds the
+  socket, then forks the workers: they start with all of that already loaded
+  (and share it copy-on-write)
+- each worker builds its own LLM clients and agents after the fork (HTTP
+  pools, SQLite connections and logging threads don't survive a fork), then
+  accepts connections on the shared socket, but only while one of its threads
+  is free; the kernel spreads them over the workers, so several cores are used,
+  and a burst waits in the listen backlog rather than behind a busy worker
+- a worker that dies is replaced by a fresh fork of the warm supervisor
+
+Protocol: the client sends one JSON line {"command": ..., "input": ...}; the
+worker answers with JSON lines ({"token": ...} for a PDF answer, {"step": ...}
+then {"output": ...} for an agent, or {"error": ...}) and closes the connection.
+
+Unix only (fork and AF_UNIX).
+
+Usage:
+    python service/worker.py --workers 4
+    python service/client.py ask "Who is the author?"
+"""
+
+import argparse
+import contextlib
+import json
+import os
+import queue
+import signal
+import socket
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from sessions import load_session_module
+
+
+def default_socket_path():
+    return os.getenv("DEMO_WORKER_SOCKET") or f"/tmp/langchain-demos-{os.getuid()}.sock"
+
+
+# ============================================================================
+# Warm state
+# ============================================================================
+
+class Warm:
+    """What the workers keep loaded: session modules (before the fork), clients and agents (after)."""
+
+    def __init__(self):
+        self.pdf = load_session_module("session-2", "6_talk_pdf_2")
+        self.travel = load_session_module("session-4", "4_agent_travel")
+        self.agent_log = load_session_module("session-4", "agent_log")
+        self.react = load_session_module("session-4", "5_react_deep_dive")
+        # import what the first query would otherwise import
+        from langchain.agents import AgentExecutor, create_react_agent  # noqa: F401
+        from langchain import hub  # noqa: F401
+        load_session_module("session-4", "tools")  # 4_agent_travel imports it when an agent is built
+        self.pdf.get_paged_document()
+        self.session_cache = {}
+        self._agents = {"travel": queue.Queue(), "react": queue.Queue()}
+        self._lock = threading.Lock()
+        self.stats = {"served": 0, "failed": 0}
+
+    def after_fork(self, log_level, threads):
+        self.agent_log.configure_logging(log_level, json_lines=True)
+        self.pdf.get_paged_llm()
+        # one agent of each kind per thread, built now so even the first query finds one ready
+        for _ in range(threads):
+            self._agents["travel"].put(self.travel.create_travel_agent(session_cache=self.session_cache))
+            self._agents["react"].put(self.react.create_react_agent_demo())
+
+    @contextlib.contextmanager
+    def agent(self, kind):
+        """Borrow an agent of `kind` (an executor runs one query at a time)."""
+        agent = self._agents[kind].get()
+        try:
+            yield agent
+        finally:
+            self._agents[kind].put(agent)
+
+    def count(self, key):
+        with self._lock:
+            self.stats[key] += 1
+
+
+def _agent_events(agent, question):
+    for chunk in agent.iter({"input": question}):
+        if "intermediate_step" in chunk:
+            for action, observation in chunk["intermediate_step"]:
+                yield {"step": {"tool": action.tool, "tool_input": action.tool_input, "observation": str(observation)}}
+        elif "output" in chunk:
+            yield {"output": chunk["output"]}
+
+
+def events(warm: Warm, command, question):
+    """The answer to one request as a sequence of JSON-able dicts."""
+    if command == "ask":
+        # closed here, not at GC, if the client goes away: that frees its prompt budget
+        with contextlib.closing(warm.pdf.ask_stream(question)) as tokens:
+            for token in tokens:
+                yield {"token": token}
+    elif command in ("travel", "react"):
+        with warm.agent(command) as agent, warm.agent_log.run_context() as run_id:
+            for event in _agent_events(agent, question):
+                yield {**event, "run_id": run_id} if "output" in event else event
+    elif command == "ping":
+        yield {"output": {"pid": os.getpid(), **warm.stats}}
+    else:
+        yield {"error": f"unknown command: {command}"}
+
+
+# ============================================================================
+# Worker processes
+# ============================================================================
+
+def _serve_connection(warm: Warm, conn):
+    with conn, conn.makefile("rwb") as stream:
+        try:
+            request = json.loads(stream.readline() or b"{}")
+            for event in events(warm, request.get("command"), request.get("input", "")):
+                stream.write((json.dumps(event) + "\n").encode())
+                stream.flush()
+            warm.count("served")
+        except (BrokenPipeError, ConnectionResetError):
+            pass  # the client went away
+        except Exception as e:
+            warm.count("failed")
+            try:
+                stream.write((json.dumps({"error": repr(e)}) + "\n").encode())
+                stream.flush()
+            except OSError:
+                pass
+
+
+def _serve_and_release(warm: Warm, conn, free):
+    try:
+        _serve_connection(warm, conn)
+    finally:
+        free.release()
+
+
+def worker_loop(warm: Warm, listener, threads, log_level):
+    """Runs in a forked child: warm up the clients, then answer connections until SIGTERM."""
+    signal.signal(signal.SIGTERM, lambda *_: os._exit(0))
+    signal.signal(signal.SIGINT, signal.SIG_IGN)  # Ctrl+C is the supervisor's to handle
+    warm.after_fork(log_level, threads)
+    # Accept only with a thread free: a busy worker leaves connections in the
+    # listen backlog for an idle one instead of queueing them behind its own
+    free = threading.Semaphore(threads)
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        while True:
+            free.acquire()
+            conn, _ = listener.accept()
+            pool.submit(_serve_and_release, warm, conn, free)
+
+
+def _spawn(warm, listener, args):
+    pid = os.fork()
+    if pid == 0:
+        try:
+            worker_loop(warm, listener, args.threads, args.log_level)
+        finally:
+            os._exit(1)
+    return pid
+
+
+def _bind(path):
+    if os.path.exists(path):
+        probe = socket.socket(socket.AF_UNIX)
+        try:
+            probe.connect(path)
+            sys.exit(f"A worker daemon is already listening on {path}")
+        except OSError:
+            os.unlink(path)  # left behind by a daemon that didn't shut down cleanly
+        finally:
+            probe.close()
+    listener = socket.socket(socket.AF_UNIX)
+    listener.bind(path)
+    os.chmod(path, 0o600)
+    listener.listen(128)
+    return listener
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Keep the session scripts warm and answer queries over a Unix socket")
+    parser.add_argument("--socket", default=default_socket_path())
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 2, help="worker processes")
+    parser.add_argument("--threads", type=int, default=4, help="concurrent queries per worker")
+    parser.add_argument("--log-level", default="WARNING", help="agent log level (JSON lines on stderr)")
+    args = parser.parse_args()
+
+    started = time.monotonic()
+    warm = Warm()
+    listener = _bind(args.socket)
+    children = {_spawn(warm, listener, args) for _ in range(args.workers)}
+    print(f"{args.workers} workers on {args.socket} (warmed in {time.monotonic() - started:.1f}s)", flush=True)
+
+    stopping = []
+
+    def stop(*_):
+        stopping.append(True)
+        for pid in children:
+            os.kill(pid, signal.SIGTERM)
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+    try:
+        while children:
+            try:
+                pid, status = os.wait()
+            except ChildProcessError:
+                break
+            children.discard(pid)
+            if not stopping:
+                print(f"worker {pid} exited ({status}), starting a new one", flush=True)
+                time.sleep(1)  # don't spin if workers die at startup
+                children.add(_spawn(warm, listener, args))
+    finally:
+        listener.close()
+        if os.path.exists(args.socket):
+            os.unlink(args.socket)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,27 +1,44 @@
-from helpers import (get_llm, get_response)
+from helpers import (get_response, get_shared_llm)
 
-llm = get_llm()
+# Bad prompt example. not knowing its audience and how much long answer should it be i.e no specificity
+BAD_PROMPT = "blockchain?"
+# Good prompt example
+GOOD_PROMPT = """Explain blockchain in 3 bullet points, using simple language, as if teaching a junior developer who has never heard of it before."""
 
 def good_bad_prompt():
-    
-    # Bad prompt example. not knowing its audience and how much long answer should it be i.e no specificity
-    bad_prompt = "blockchain?"
-    # Good prompt example
-    good_prompt = """Explain blockchain in 3 bullet points, using simple language, as if teaching a junior developer who has never heard of it before."""
+    bad_prompt = BAD_PROMPT
+    good_prompt = GOOD_PROMPT
 
     print("="*60)
     print(f"BAD PROMPT: '{bad_prompt}'")
     print("="*60)
     print("BAD PROMPT RESULT:")
-    get_response(llm, bad_prompt)
+    get_response(get_shared_llm(), bad_prompt)
     
     print("="*60)
     print(f"GOOD PROMPT: '{good_prompt}'")
     print("="*60)
     print("GOOD PROMPT RESULT:")
-    get_response(llm, good_prompt)
+    get_response(get_shared_llm(), good_prompt)
     
 
 
+def sweep_good_bad_prompt(max_samples=40):
+    # One sample each proves little at temperature 0.7: sample both until the difference is clear
+    from prompt_sweep import PromptSweep, bullet_count_grader, llm_judge_grader, print_sweep
+    sweep = PromptSweep(
+        {"bad": BAD_PROMPT, "good": GOOD_PROMPT},
+        [bullet_count_grader(3),
+         llm_judge_grader("Explains what a blockchain is in simple language a junior developer new to it would follow")],
+        max_samples=max_samples,
+    )
+    sweep.run()
+    print_sweep(sweep)
+
+
 if __name__ == "__main__":
-    good_bad_prompt()
+    import sys
+    if "--sweep" in sys.argv:
+        sweep_good_bad_prompt()
+    else:
+        good_bad_prompt()
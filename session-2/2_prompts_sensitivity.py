@@ -1,21 +1,13 @@
-from helpers import (get_llm, get_response)
+from helpers import (get_response, get_shared_llm)
 
-llm = get_llm()
+# Extremely vague prompt - will get useless generic advice
+VAGUE_PROMPT = "python help"
 
-def demo_sensitivity_to_phrasing():
-    
-    # Extremely vague prompt - will get useless generic advice
-    prompt1 = "python help"
-    print(f"Prompt 1: '{prompt1}'")
-    get_response(llm, prompt1)
-    
-    # Specific error but no context - will get some help but not actionable
-    prompt2 = "KeyError: 'email' in python"
-    print(f"\nPrompt 2: '{prompt2}'")
-    get_response(llm, prompt2)
-    
-    # Highly specific with context and structure
-    prompt3 = """I'm debugging a Python function that processes user data from a JSON API. Here's the exact error and context:
+# Specific error but no context - will get some help but not actionable
+ERROR_ONLY_PROMPT = "KeyError: 'email' in python"
+
+# Highly specific with context and structure
+DETAILED_PROMPT = """I'm debugging a Python function that processes user data from a JSON API. Here's the exact error and context:
 
 ERROR: KeyError: 'email'
 File: /app/user_processor.py, line 23, in process_user
@@ -35,9 +27,38 @@ REQUIREMENTS:
 5. Return processed user dict
 
 Please provide a complete solution with error handling."""
+
+def demo_sensitivity_to_phrasing():
+    
+    prompt1 = VAGUE_PROMPT
+    print(f"Prompt 1: '{prompt1}'")
+    get_response(get_shared_llm(), prompt1)
+    
+    prompt2 = ERROR_ONLY_PROMPT
+    print(f"\nPrompt 2: '{prompt2}'")
+    get_response(get_shared_llm(), prompt2)
+    
+    prompt3 = DETAILED_PROMPT
     print(f"\nPrompt 3: '{prompt3}'")
-    get_response(llm, prompt3)
+    get_response(get_shared_llm(), prompt3)
+
+
+def sweep_sensitivity_to_phrasing(max_samples=40):
+    # Many samples per phrasing, scored for an actionable fix; clear losers stop early
+    from prompt_sweep import PromptSweep, contains_grader, llm_judge_grader, print_sweep
+    sweep = PromptSweep(
+        {"vague": VAGUE_PROMPT, "error_only": ERROR_ONLY_PROMPT, "detailed": DETAILED_PROMPT},
+        [contains_grader([r"\.get\(", r"except KeyError|'email' in "], name="safe_lookup"),
+         llm_judge_grader("Gives a concrete, working fix for a Python KeyError caused by a missing 'email' key")],
+        max_samples=max_samples,
+    )
+    sweep.run()
+    print_sweep(sweep)
 
 
 if __name__ == "__main__":
-    demo_sensitivity_to_phrasing()
+    import sys
+    if "--sweep" in sys.argv:
+        sweep_sensitivity_to_phrasing()
+    else:
+        demo_sensitivity_to_phrasing()
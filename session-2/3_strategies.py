@@ -1,17 +1,23 @@
-from helpers import (get_llm, get_response, get_response_with_system)
+import os
 
-llm = get_llm()
+from helpers import (DATA_DIR, get_response, get_response_with_system, get_shared_llm)
 
-def demo_shot_prompting():
-    # can trigger
-    # llm = get_llm("meta-llama/llama-3.3-8b-instruct:free")
-    task = "Classify the sentiment of this text: 'I absolutely love this new restaurant!'"
+SENTIMENT_LABELS = ["Positive", "Negative", "Neutral"]
+
+FEW_SHOT_EXAMPLES = [
+    ("This movie was terrible and boring.", "Negative"),
+    ("The weather is okay today.", "Neutral"),
+    ("I'm thrilled with my new car!", "Positive"),
+    ("The service was disappointing.", "Negative"),
+]
 
-    zero_shot_prompt = f"Task: {task}"
-    get_response(llm, zero_shot_prompt)
-    
 
-    one_shot_prompt = f"""
+def zero_shot_prompt(text):
+    return f"Task: Classify the sentiment of this text: '{text}'"
+
+
+def one_shot_prompt(text):
+    return f"""
     Task: Classify text sentiment as Positive, Negative, or Neutral.
     
     Example:
@@ -19,34 +25,81 @@ def demo_shot_prompting():
     Sentiment: Negative
     
     Now classify:
-    Text: "I absolutely love this new restaurant!"
+    Text: "{text}"
     Sentiment:
     """
-    get_response(llm, one_shot_prompt)
-    
 
-    few_shot_prompt = f"""
+
+def few_shot_prompt(text, examples=FEW_SHOT_EXAMPLES):
+    shots = "".join(f"""
+    Text: "{example}"
+    Sentiment: {label}
+    """ for example, label in examples)
+    return f"""
     Task: Classify text sentiment as Positive, Negative, or Neutral.
     
-    Examples:
-    Text: "This movie was terrible and boring."
-    Sentiment: Negative
-    
-    Text: "The weather is okay today."
-    Sentiment: Neutral
-    
-    Text: "I'm thrilled with my new car!"
-    Sentiment: Positive
-    
-    Text: "The service was disappointing."
-    Sentiment: Negative
-    
+    Examples:{shots}
     Now classify:
-    Text: "I absolutely love this new restaurant!"
+    Text: "{text}"
     Sentiment:
     """
 
-    get_response(llm, few_shot_prompt)
+
+_example_store = None
+
+
+def dynamic_few_shot_prompt(text, k=4, token_budget=120):
+    # Same prompt as few_shot_prompt, but with the k examples most similar to `text`
+    global _example_store
+    if _example_store is None:
+        from example_store import ExampleStore  # numpy; only needed by this strategy
+        _example_store = ExampleStore.from_jsonl(os.path.join(DATA_DIR, "sentiment_examples.jsonl"))
+    examples = _example_store.select(text, k=k, token_budget=token_budget) or FEW_SHOT_EXAMPLES
+    return few_shot_prompt(text, examples)
+
+
+def chain_of_thought_prompt(text):
+    return f"""
+Classify the sentiment of this text step by step, showing your reasoning:
+
+Text: "{text}"
+
+1. Note the words that carry emotion
+2. Decide whether they are positive, negative or neither
+3. End with a line "Sentiment: Positive", "Sentiment: Negative" or "Sentiment: Neutral"
+
+Step-by-step solution:
+"""
+
+
+def role_prompt(text):
+    # (system, user) pair, sent with get_response_with_system
+    system = "You are an experienced customer-feedback analyst who labels the sentiment of reviews precisely."
+    user = f"Label the sentiment of this text as Positive, Negative, or Neutral. Answer with the label only.\n\nText: \"{text}\""
+    return system, user
+
+
+# Every prompting strategy in this file, as text -> prompt builders (used by evaluate.py)
+SENTIMENT_STRATEGIES = {
+    "zero_shot": zero_shot_prompt,
+    "one_shot": one_shot_prompt,
+    "few_shot": few_shot_prompt,
+    "dynamic_few_shot": dynamic_few_shot_prompt,
+    "chain_of_thought": chain_of_thought_prompt,
+    "role": role_prompt,
+}
+
+
+def demo_shot_prompting():
+    # can trigger
+    # llm = get_llm("meta-llama/llama-3.3-8b-instruct:free")
+    text = "I absolutely love this new restaurant!"
+
+    get_response(get_shared_llm(), zero_shot_prompt(text))
+    
+    get_response(get_shared_llm(), one_shot_prompt(text))
+    
+    get_response(get_shared_llm(), few_shot_prompt(text))
 
 
 def demo_chain_of_thought():
@@ -55,7 +108,7 @@ def demo_chain_of_thought():
     # Without Chain-of-Thought
     print("🔸 WITHOUT Chain-of-Thought (Direct Answer)")
     direct_prompt = f"{tricky_problem}"
-    get_response(llm, direct_prompt)
+    get_response(get_shared_llm(), direct_prompt)
     
     # With Chain-of-Thought
     print("\n🔸 WITH Chain-of-Thought (Step-by-Step)")
@@ -74,14 +127,14 @@ Let's work through this systematically:
 
 Step-by-step solution:
 """
-    get_response(llm, cot_prompt)
+    get_response(get_shared_llm(), cot_prompt)
 
 
 def demo_role_based_prompting():
     topic = "the impact of remote work on team productivity in 3 bullet points each max 50 words"
     
     generic_prompt = f"Write about {topic}."
-    get_response(llm, generic_prompt)
+    get_response(get_shared_llm(), generic_prompt)
     print(("\n" + "-"*60))
     print("\n")
 
@@ -93,7 +146,7 @@ def demo_role_based_prompting():
     print(f"User: '{hr_user}'")
     print("="*60)
     print("\n")
-    get_response_with_system(llm, hr_system, hr_user)
+    get_response_with_system(get_shared_llm(), hr_system, hr_user)
     print("\n")
     # WITH ROLE - TPM
     tpm_system = "You are an experienced Technical Program Manager with 8 years of experience in cross-functional coordination, project delivery, and process optimization. You focus on timeline management, stakeholder alignment, and delivery excellence."
@@ -103,7 +156,7 @@ def demo_role_based_prompting():
     print(f"User: '{tpm_user}'")
     print("="*60)
     print("\n")
-    get_response_with_system(llm, tpm_system, tpm_user)
+    get_response_with_system(get_shared_llm(), tpm_system, tpm_user)
     print("\n")
 
 def run_strategies_demo():
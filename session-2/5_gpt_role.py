@@ -1,6 +1,6 @@
 #!/usr/bin/env python3
 
-from helpers import get_llm, get_response
+from helpers import get_llm, get_response, get_hedged_llm
 
 gpt_5 = "openai/gpt-5-nano"
 gpt_5_mini="openai/gpt-5-mini"
@@ -14,5 +14,13 @@ def which_model():
     except Exception as e:
         print(e)
 
+def hedged_models():
+    # gpt_4 answers unless it's slower than its own p95, then gpt_5 races it
+    llm = get_hedged_llm(primary=gpt_4, secondary=gpt_5, hedge_percentile=95)
+    prompt = "Explain what a hedged request is in one sentence."
+    for _ in range(3):
+        get_response(llm, prompt)
+    print(f"Stats: {llm.stats}, current hedge delay: {llm.hedge_delay():.2f}s")
+
 if __name__ == "__main__":
     which_model()
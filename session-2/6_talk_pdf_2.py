@@ -1,24 +1,84 @@
-from langchain_community.document_loaders import PyPDFLoader
-from helpers import get_llm
+import argparse
+import os
 
-# 1. LOAD PDF
-loader = PyPDFLoader("pdfs/nelson.pdf")
-pages = loader.load()
-document = "\n\n".join([page.page_content for page in pages])
+from helpers import SESSION_DIR, get_shared_llm
+
+PDF_PATH = os.path.join(SESSION_DIR, "pdfs", "nelson.pdf")
+
+# 1. LOAD PDF (on the first question, so importing this module stays cheap)
+def get_paged_document():
+    # Page texts in a memory-mapped file; decoded only while a prompt needs them
+    from paged_document import open_document
+    return open_document(PDF_PATH)
+
+_paged_llm = None
+
+def get_paged_llm():
+    # The shared client without the LLM cache and the coalescer: both would copy the
+    # whole document into a key (the cache also stores it again per question)
+    global _paged_llm
+    if _paged_llm is None:
+        _paged_llm = get_shared_llm().model_copy(update={"cache": False, "coalesce": False})
+    return _paged_llm
 
 # 2. ASK QUESTIONS
-llm = get_llm()
 
 def ask(question):
-    prompt = f"Document: {document}\n\nQuestion: {question}"
-    response = llm.invoke(prompt)
+    with get_paged_document().prompt(question) as messages:
+        response = get_paged_llm().invoke(messages)
     return response.content
 
-# 3. INTERACTIVE CHAT
-print("Ask questions about the document (type 'quit' to exit):")
-while True:
-    question = input("\nQuestion: ")
-    if question.lower() == 'quit':
-        break
-    answer = ask(question)
-    print(f"Answer: {answer}")
+def ask_stream(question):
+    # Same as ask, but yields the answer as it is generated. The prompt's budget is
+    # held until the generator finishes: a caller that stops early should close() it
+    with get_paged_document().prompt(question) as messages:
+        for chunk in get_paged_llm().stream(messages):
+            yield chunk.content
+
+# 3. MEMORY PROFILE: where the memory of one question goes, whole string vs paged
+def profile_memory(question, pdf_path=PDF_PATH):
+    from corpus_qa import load_pages_incremental
+    from memory_profile import MemoryProfiler
+    import paged_document
+    llm = get_shared_llm()  # import the client stack first so it doesn't show up in a stage
+    paged_llm = get_paged_llm()
+
+    with MemoryProfiler() as profiler:
+        with profiler.stage("load"):
+            pages, _ = load_pages_incremental(pdf_path)
+        with profiler.stage("join"):
+            document = "\n\n".join([text for _, text in pages])
+        with profiler.stage("prompt build"):
+            prompt = f"Document: {document}\n\nQuestion: {question}"
+        with profiler.stage("response"):
+            llm.invoke(prompt)
+        del pages, document, prompt
+
+        with profiler.stage("paged load"):
+            paged = paged_document.open_document(pdf_path)
+        with profiler.stage("paged prompt"):
+            messages = paged.messages(question)
+        with profiler.stage("paged response"):
+            paged_llm.invoke(messages)
+    print(profiler.report())
+
+# 4. INTERACTIVE CHAT
+def main():
+    parser = argparse.ArgumentParser(description="Chat with a PDF")
+    parser.add_argument("--profile-memory", metavar="QUESTION", help="profile memory per stage for one question")
+    parser.add_argument("--pdf", default=PDF_PATH, help="PDF to profile")
+    args = parser.parse_args()
+    if args.profile_memory:
+        profile_memory(args.profile_memory, args.pdf)
+        return
+
+    print("Ask questions about the document (type 'quit' to exit):")
+    while True:
+        question = input("\nQuestion: ")
+        if question.lower() == 'quit':
+            break
+        answer = ask(question)
+        print(f"Answer: {answer}")
+
+if __name__ == "__main__":
+    main()
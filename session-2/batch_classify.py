@@ -0,0 +1,149 @@
+"""
+Packed Batch Classification
+
+Classifying one sentence per call resends the same instructions and examples
+every time. Here N sentences go into one request as numbered items and the
+model answers with a JSON object mapping item number -> label. Items missing
+from (or garbled in) the answer are split into smaller packs and retried.
+
+Usage:
+    python batch_classify.py data/sentiment.jsonl
+"""
+
+import importlib
+import json
+import os
+import re
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from helpers import DATA_DIR, get_llm
+
+strategies_module = importlib.import_module("3_strategies")
+
+LABELS = strategies_module.SENTIMENT_LABELS
+_JSON_RE = re.compile(r"\{.*\}", re.DOTALL)
+
+
+def _estimate_tokens(text):
+    return len(text) // 4 + 1
+
+
+def build_packed_prompt(texts, examples=None):
+    examples = strategies_module.FEW_SHOT_EXAMPLES if examples is None else examples
+    shots = "\n".join(f'Text: "{text}"\nSentiment: {label}' for text, label in examples)
+    items = "\n".join(f'{i}. "{text}"' for i, text in enumerate(texts, start=1))
+    return f"""Task: Classify the sentiment of each numbered text as {", ".join(LABELS)}.
+
+Examples:
+{shots}
+
+Texts:
+{items}
+
+Answer with JSON only, mapping every item number to its label, e.g. {{"1": "Positive", "2": "Neutral"}}."""
+
+
+def parse_packed_response(content, n):
+    """Return {item_index (0-based): label} for the items that parsed cleanly."""
+    match = _JSON_RE.search(content or "")
+    if not match:
+        return {}
+    try:
+        data = json.loads(match.group(0))
+    except ValueError:
+        return {}
+    if not isinstance(data, dict):
+        return {}
+    labels = {}
+    for key, label in data.items():
+        label = str(label).strip().capitalize()
+        if str(key).isdigit() and 1 <= int(key) <= n and label in LABELS:
+            labels[int(key) - 1] = label
+    return labels
+
+
+def plan_packs(texts, token_budget=1500, max_items=50, examples=None):
+    """Split texts into packs whose prompt + expected answer fit in `token_budget`."""
+    overhead = _estimate_tokens(build_packed_prompt([], examples))
+    packs, current, used = [], [], overhead
+    for index, text in enumerate(texts):
+        # item line in the prompt plus its '"12": "Negative",' entry in the answer
+        cost = _estimate_tokens(text) + 4 + 8
+        if current and (used + cost > token_budget or len(current) >= max_items):
+            packs.append(current)
+            current, used = [], overhead
+        current.append(index)
+        used += cost
+    if current:
+        packs.append(current)
+    return packs
+
+
+class PackedClassifier:
+    """Classifies many texts with few requests; tracks how many requests it made."""
+
+    def __init__(self, llm=None, token_budget=1500, max_items=50, examples=None):
+        self.llm = llm or get_llm()
+        self.token_budget = token_budget
+        self.max_items = max_items
+        self.examples = examples
+        self.stats = {"items": 0, "requests": 0, "retried_items": 0}
+        self._lock = threading.Lock()
+
+    def _count(self, key, amount=1):
+        with self._lock:
+            self.stats[key] += amount
+
+    def _classify_pack(self, texts):
+        self._count("requests")
+        # API errors (transport, auth, 429) propagate: they were already retried with
+        # backoff by the client or the shared limiter, and splitting the pack would
+        # only multiply the failing requests. Only answers that don't parse are split.
+        response = self.llm.invoke(build_packed_prompt(texts, self.examples))
+        labels = parse_packed_response(response.content, len(texts))
+
+        missing = [i for i in range(len(texts)) if i not in labels]
+        if not missing:
+            return [labels[i] for i in range(len(texts))]
+        if len(texts) == 1:
+            return [None]
+
+        # Retry the failed items in two smaller packs
+        self._count("retried_items", len(missing))
+        half = max(1, len(missing) // 2)
+        for group in (missing[:half], missing[half:]):
+            if group:
+                for i, label in zip(group, self._classify_pack([texts[i] for i in group])):
+                    labels[i] = label
+        return [labels.get(i) for i in range(len(texts))]
+
+    def classify(self, texts, concurrency=4):
+        """Return one label per text (None if it never parsed)."""
+        self._count("items", len(texts))
+        packs = plan_packs(texts, self.token_budget, self.max_items, self.examples)
+        results = [None] * len(texts)
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            for pack, labels in zip(packs, pool.map(lambda p: self._classify_pack([texts[i] for i in p]), packs)):
+                for index, label in zip(pack, labels):
+                    results[index] = label
+        return results
+
+
+def main():
+    path = sys.argv[1] if len(sys.argv) > 1 else os.path.join(DATA_DIR, "sentiment.jsonl")
+    with open(path) as f:
+        rows = [json.loads(line) for line in f if line.strip()]
+
+    classifier = PackedClassifier()
+    labels = classifier.classify([row["text"] for row in rows])
+    correct = sum(label == row["label"] for label, row in zip(labels, rows))
+    for row, label in zip(rows, labels):
+        print(f"{label or '?':<10}{row['text']}")
+    print(f"\nAccuracy: {correct}/{len(rows)}, requests: {classifier.stats['requests']} "
+          f"for {classifier.stats['items']} items")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,435 @@
+"""
+Offline Bulk Jobs with the Batch API
+
+Interactive calls (`llm.invoke`) are the expensive, rate-limited path. For
+work nobody waits on, such as classifying a whole dataset overnight, the
+OpenAI-style batch API is cheaper (about half price) and has its own, much
+larger limits: requests are written to a JSONL file, uploaded, processed
+within the completion window and downloaded as one output file.
+
+A job here is a list of prompts (built with the same helpers the scripts use).
+Its state lives in a local SQLite database, so submitting, polling and
+collecting can happen in different processes, days apart:
+
+- every prompt is a request row with its position and a custom_id
+- pending requests are split into batch files (within the API's size limits)
+  and uploaded; each file's requests are claimed for it before its batch is
+  created, so a crash in between never submits (and bills) them twice: the
+  next `submit` or `poll` adopts the batch the API has for that file (found by
+  its metadata) or creates it then; if the API rejects the file, the
+  reservation is marked failed and its requests go back to pending
+- polling downloads the output and error files of finished batches and stores
+  each result against its request; requests of expired or cancelled batches
+  (no result, or a batch_expired / batch_cancelled error) go back to pending
+  and are submitted again by the next `submit`
+- results come back in the order of the original prompts
+
+The batch endpoint is taken from BATCH_API_BASE / BATCH_API_KEY, falling back
+to OPENROUTER_BASE / OPENROUTER_API_KEY. standin/server.py implements the
+same endpoints for local testing.
+
+Usage:
+    python batch_jobs.py submit data/sentiment.jsonl --strategy few_shot
+    python batch_jobs.py status
+    python batch_jobs.py wait <job_id>
+    python batch_jobs.py results <job_id>
+"""
+
+import argparse
+import importlib
+import io
+import json
+import os
+import sqlite3
+import time
+import uuid
+from contextlib import closing
+from typing import Dict, List, Optional
+
+from helpers import CACHE_DIR, DATA_DIR
+
+ENDPOINT = "/v1/chat/completions"
+# Per batch file limits of the API (requests and bytes), with some headroom
+MAX_BATCH_REQUESTS = 50000
+MAX_BATCH_BYTES = 190 * 1024 * 1024
+
+_TERMINAL = ("completed", "failed", "expired", "cancelled")
+# Per-request errors meaning the request never ran: it is resubmitted, not failed
+_NOT_RUN = ("batch_expired", "batch_cancelled")
+
+
+def get_batch_client():
+    """An OpenAI client for the batch endpoints."""
+    from dotenv import load_dotenv
+    from openai import OpenAI
+
+    load_dotenv()
+    return OpenAI(base_url=os.getenv("BATCH_API_BASE") or os.getenv("OPENROUTER_BASE"),
+                  api_key=os.getenv("BATCH_API_KEY") or os.getenv("OPENROUTER_API_KEY"))
+
+
+def _messages(prompt):
+    """A prompt string, a (system, user) tuple or a message list -> a message list."""
+    if isinstance(prompt, str):
+        return [{"role": "user", "content": prompt}]
+    if isinstance(prompt, tuple):
+        system, user = prompt
+        return [{"role": "system", "content": system}, {"role": "user", "content": user}]
+    return prompt
+
+
+# ============================================================================
+# Job Database
+# ============================================================================
+
+class BatchJobStore:
+    """Jobs, their requests and the batches they were submitted in, in one SQLite file."""
+
+    def __init__(self, path=os.path.join(CACHE_DIR, "batch_jobs.db")):
+        self.path = path
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with closing(self._connect()) as conn, conn:
+            conn.execute("""CREATE TABLE IF NOT EXISTS jobs (
+                job_id TEXT PRIMARY KEY, name TEXT, model TEXT, created REAL)""")
+            # status: pending | submitted | done | failed
+            conn.execute("""CREATE TABLE IF NOT EXISTS requests (
+                job_id TEXT, position INTEGER, custom_id TEXT UNIQUE, body TEXT, status TEXT,
+                batch_id TEXT, attempts INTEGER, output TEXT, error TEXT, usage TEXT,
+                PRIMARY KEY (job_id, position))""")
+            conn.execute("""CREATE TABLE IF NOT EXISTS batches (
+                batch_id TEXT PRIMARY KEY, job_id TEXT, input_file_id TEXT, status TEXT,
+                requests INTEGER, submitted REAL, updated REAL)""")
+
+    def _connect(self):
+        return sqlite3.connect(self.path, timeout=30)
+
+    def create_job(self, bodies: List[dict], name: str, model: str) -> str:
+        job_id = f"job-{uuid.uuid4().hex[:12]}"
+        with closing(self._connect()) as conn, conn:
+            conn.execute("INSERT INTO jobs VALUES (?, ?, ?, ?)", (job_id, name, model, time.time()))
+            conn.executemany(
+                "INSERT INTO requests VALUES (?, ?, ?, ?, 'pending', NULL, 0, NULL, NULL, NULL)",
+                [(job_id, position, f"{job_id}-{position}", json.dumps(body)) for position, body in enumerate(bodies)])
+        return job_id
+
+    def list_jobs(self) -> List[dict]:
+        with closing(self._connect()) as conn:
+            jobs = conn.execute("SELECT job_id, name, model, created FROM jobs ORDER BY created").fetchall()
+        return [{"job_id": job_id, "name": name, "model": model, "created": created, **self.counts(job_id)}
+                for job_id, name, model, created in jobs]
+
+    def counts(self, job_id: str) -> Dict[str, int]:
+        with closing(self._connect()) as conn:
+            rows = conn.execute("SELECT status, COUNT(*) FROM requests WHERE job_id = ? GROUP BY status",
+                                (job_id,)).fetchall()
+        counts = {"pending": 0, "submitted": 0, "done": 0, "failed": 0}
+        counts.update(dict(rows))
+        return counts
+
+    def pending(self, job_id: str) -> List[tuple]:
+        """(custom_id, body) of the requests not yet submitted, in order."""
+        with closing(self._connect()) as conn:
+            return conn.execute("SELECT custom_id, body FROM requests WHERE job_id = ? AND status = 'pending' "
+                                "ORDER BY position", (job_id,)).fetchall()
+
+    def reserve_batch(self, job_id: str, input_file_id: str, custom_ids: List[str]) -> str:
+        """Claim requests for a batch about to be created from `input_file_id`; returns its provisional ID.
+
+        Written before the batch is created: the requests are no longer pending,
+        and the batch row (status 'creating') says which file they went into.
+        """
+        intent_id = f"creating-{input_file_id}"
+        now = time.time()
+        with closing(self._connect()) as conn, conn:
+            conn.execute("INSERT INTO batches VALUES (?, ?, ?, 'creating', ?, ?, ?)",
+                         (intent_id, job_id, input_file_id, len(custom_ids), now, now))
+            conn.executemany("UPDATE requests SET status = 'submitted', batch_id = ?, attempts = attempts + 1 "
+                             "WHERE custom_id = ?", [(intent_id, custom_id) for custom_id in custom_ids])
+        return intent_id
+
+    def confirm_batch(self, intent_id: str, batch_id: str):
+        """The batch for a reservation exists: move its rows over to the real batch ID."""
+        with closing(self._connect()) as conn, conn:
+            conn.execute("UPDATE batches SET batch_id = ?, status = 'validating', updated = ? WHERE batch_id = ?",
+                         (batch_id, time.time(), intent_id))
+            conn.execute("UPDATE requests SET batch_id = ? WHERE batch_id = ?", (batch_id, intent_id))
+
+    def creating_batches(self, job_id: str) -> List[tuple]:
+        """(intent_id, input_file_id, submitted) of reservations whose batch may not exist yet."""
+        with closing(self._connect()) as conn:
+            return conn.execute("SELECT batch_id, input_file_id, submitted FROM batches "
+                                "WHERE job_id = ? AND status = 'creating'", (job_id,)).fetchall()
+
+    def open_batches(self, job_id: str) -> List[str]:
+        with closing(self._connect()) as conn:
+            rows = conn.execute("SELECT batch_id FROM batches WHERE job_id = ? AND status NOT IN (?, ?, ?, ?, ?)",
+                                (job_id, "creating", *_TERMINAL)).fetchall()
+        return [batch_id for (batch_id,) in rows]
+
+    def update_batch(self, batch_id: str, status: str):
+        with closing(self._connect()) as conn, conn:
+            conn.execute("UPDATE batches SET status = ?, updated = ? WHERE batch_id = ?", (status, time.time(), batch_id))
+
+    def record_results(self, results: List[tuple]):
+        """(custom_id, status, output, error, usage) per request; only submitted requests are updated.
+
+        A 'pending' status puts the request back for the next submit.
+        """
+        with closing(self._connect()) as conn, conn:
+            conn.executemany("UPDATE requests SET status = ?, output = ?, error = ?, usage = ?, "
+                             "batch_id = CASE WHEN ? = 'pending' THEN NULL ELSE batch_id END "
+                             "WHERE custom_id = ? AND status = 'submitted'",
+                             [(status, output, error, usage, status, custom_id)
+                              for custom_id, status, output, error, usage in results])
+
+    def release_batch(self, batch_id: str) -> int:
+        """Requests of a finished batch that got no result go back to pending; returns how many."""
+        with closing(self._connect()) as conn, conn:
+            return conn.execute("UPDATE requests SET status = 'pending', batch_id = NULL "
+                                "WHERE batch_id = ? AND status = 'submitted'", (batch_id,)).rowcount
+
+    def fail_batch(self, batch_id: str, error: str) -> int:
+        """Requests of a batch that was rejected as a whole are failed (resubmitting wouldn't help)."""
+        with closing(self._connect()) as conn, conn:
+            return conn.execute("UPDATE requests SET status = 'failed', error = ? "
+                                "WHERE batch_id = ? AND status = 'submitted'", (error, batch_id)).rowcount
+
+    def reject_batch(self, intent_id: str, error: str, max_attempts=3) -> int:
+        """The API refused to create a reserved batch: mark it failed and release its requests.
+
+        Requests already tried `max_attempts` times are failed instead, so a file
+        that is rejected every time isn't resubmitted forever. Returns how many
+        went back to pending.
+        """
+        with closing(self._connect()) as conn, conn:
+            conn.execute("UPDATE batches SET status = 'failed', updated = ? WHERE batch_id = ?",
+                         (time.time(), intent_id))
+            conn.execute("UPDATE requests SET status = 'failed', error = ? "
+                         "WHERE batch_id = ? AND status = 'submitted' AND attempts >= ?",
+                         (error, intent_id, max_attempts))
+            return conn.execute("UPDATE requests SET status = 'pending', batch_id = NULL "
+                                "WHERE batch_id = ? AND status = 'submitted'", (intent_id,)).rowcount
+
+    def retry_failed(self, job_id: str, max_attempts=3) -> int:
+        with closing(self._connect()) as conn, conn:
+            return conn.execute("UPDATE requests SET status = 'pending', batch_id = NULL, error = NULL "
+                                "WHERE job_id = ? AND status = 'failed' AND attempts < ?",
+                                (job_id, max_attempts)).rowcount
+
+    def results(self, job_id: str) -> List[dict]:
+        with closing(self._connect()) as conn:
+            rows = conn.execute("SELECT position, status, output, error, usage FROM requests WHERE job_id = ? "
+                                "ORDER BY position", (job_id,)).fetchall()
+        return [{"position": position, "status": status, "output": output, "error": error,
+                 "usage": json.loads(usage) if usage else None}
+                for position, status, output, error, usage in rows]
+
+
+# ============================================================================
+# Submit, Poll, Collect
+# ============================================================================
+
+def _chunks(lines, max_requests, max_bytes):
+    chunk, size = [], 0
+    for custom_id, line in lines:
+        line_bytes = len(line.encode("utf-8"))  # the limit is on the uploaded bytes, not characters
+        if chunk and (len(chunk) >= max_requests or size + line_bytes > max_bytes):
+            yield chunk
+            chunk, size = [], 0
+        chunk.append((custom_id, line))
+        size += line_bytes
+    if chunk:
+        yield chunk
+
+
+def _parse_result(record):
+    """One line of an output or error file -> (custom_id, status, output, error, usage)."""
+    response = record.get("response") or {}
+    body = response.get("body") or {}
+    if (record.get("error") or {}).get("code") in _NOT_RUN:
+        return record["custom_id"], "pending", None, None, None
+    if record.get("error") or response.get("status_code") != 200:
+        error = record.get("error") or body.get("error") or {"status_code": response.get("status_code")}
+        return record["custom_id"], "failed", None, json.dumps(error), None
+    usage = body.get("usage")
+    return (record["custom_id"], "done", body["choices"][0]["message"]["content"], None,
+            json.dumps(usage) if usage else None)
+
+
+class BatchRunner:
+    """Runs jobs through the batch API, keeping all state in a BatchJobStore."""
+
+    def __init__(self, store: Optional[BatchJobStore] = None, client=None, model_name="openai/gpt-4.1-nano",
+                 temperature=0.7, completion_window="24h", max_batch_requests=MAX_BATCH_REQUESTS,
+                 max_batch_bytes=MAX_BATCH_BYTES):
+        self.store = store or BatchJobStore()
+        self.client = client or get_batch_client()
+        self.model_name = model_name
+        self.temperature = temperature
+        self.completion_window = completion_window
+        self.max_batch_requests = max_batch_requests
+        self.max_batch_bytes = max_batch_bytes
+
+    def create_job(self, prompts, name="job", **params) -> str:
+        """Store one request per prompt (string, (system, user) tuple or message list)."""
+        bodies = [{"model": self.model_name, "messages": _messages(prompt), "temperature": self.temperature, **params}
+                  for prompt in prompts]
+        return self.store.create_job(bodies, name, self.model_name)
+
+    def _create_batch(self, job_id, intent_id, input_file_id) -> Optional[str]:
+        """Create the batch for a reservation; None if the API rejects it (see reject_batch)."""
+        import openai
+
+        try:
+            batch = self.client.batches.create(input_file_id=input_file_id, endpoint=ENDPOINT,
+                                               completion_window=self.completion_window,
+                                               metadata={"job_id": job_id})
+        except (openai.BadRequestError, openai.NotFoundError, openai.UnprocessableEntityError) as e:
+            # e.g. the uploaded file expired or was deleted: retrying the same file can't succeed
+            self.store.reject_batch(intent_id, json.dumps({"batch_rejected": str(e)}))
+            return None
+        self.store.confirm_batch(intent_id, batch.id)
+        return batch.id
+
+    def resume(self, job_id: str) -> List[str]:
+        """Finish reservations whose batch creation was interrupted; returns their batch IDs.
+
+        A batch the API already has for the reserved file (tagged with the job's
+        ID) is adopted; only if there is none is it created now.
+        """
+        intended = self.store.creating_batches(job_id)
+        if not intended:
+            return []
+        since = min(submitted for _, _, submitted in intended) - 3600  # allow for clock skew
+        wanted = {input_file_id for _, input_file_id, _ in intended}
+        existing = {}
+        # newest first: stop at batches older than the earliest reservation
+        for batch in self.client.batches.list(limit=100):
+            if batch.created_at < since or wanted <= existing.keys():
+                break
+            if batch.input_file_id in wanted and (batch.metadata or {}).get("job_id") == job_id:
+                existing[batch.input_file_id] = batch.id
+        batch_ids = []
+        for intent_id, input_file_id, _ in intended:
+            batch_id = existing.get(input_file_id)
+            if batch_id is None:
+                batch_id = self._create_batch(job_id, intent_id, input_file_id)
+            else:
+                self.store.confirm_batch(intent_id, batch_id)
+            if batch_id is not None:
+                batch_ids.append(batch_id)
+        return batch_ids
+
+    def submit(self, job_id: str) -> List[str]:
+        """Upload the job's pending requests as batch files and start a batch for each."""
+        batch_ids = self.resume(job_id)
+        lines = [(custom_id, json.dumps({"custom_id": custom_id, "method": "POST", "url": ENDPOINT,
+                                         "body": json.loads(body)}) + "\n")
+                 for custom_id, body in self.store.pending(job_id)]
+        for chunk in _chunks(lines, self.max_batch_requests, self.max_batch_bytes):
+            data = "".join(line for _, line in chunk).encode("utf-8")
+            uploaded = self.client.files.create(file=(f"{job_id}.jsonl", io.BytesIO(data)), purpose="batch")
+            intent_id = self.store.reserve_batch(job_id, uploaded.id, [custom_id for custom_id, _ in chunk])
+            batch_id = self._create_batch(job_id, intent_id, uploaded.id)
+            if batch_id is not None:
+                batch_ids.append(batch_id)
+        return batch_ids
+
+    def _download(self, file_id):
+        if not file_id:
+            return []
+        text = self.client.files.content(file_id).text
+        return [json.loads(line) for line in text.splitlines() if line.strip()]
+
+    def poll(self, job_id: str) -> Dict[str, int]:
+        """Check the job's open batches once and store the results of finished ones."""
+        self.resume(job_id)
+        for batch_id in self.store.open_batches(job_id):
+            batch = self.client.batches.retrieve(batch_id)
+            if batch.status in _TERMINAL:
+                # expired and cancelled batches still return the results they finished
+                records = self._download(batch.output_file_id) + self._download(batch.error_file_id)
+                self.store.record_results([_parse_result(record) for record in records])
+                if batch.status == "failed":
+                    errors = batch.errors.model_dump() if batch.errors else {"status": "failed"}
+                    self.store.fail_batch(batch_id, json.dumps(errors))
+                else:
+                    self.store.release_batch(batch_id)
+            self.store.update_batch(batch_id, batch.status)
+        return self.store.counts(job_id)
+
+    def wait(self, job_id: str, interval=30.0, timeout=None, on_poll=None) -> Dict[str, int]:
+        """Poll (and resubmit requests released by expired batches) until nothing is outstanding."""
+        deadline = time.monotonic() + timeout if timeout else None
+        while True:
+            counts = self.poll(job_id)
+            if on_poll:
+                on_poll(counts)
+            if counts["pending"]:
+                self.submit(job_id)
+            elif not counts["submitted"]:
+                return counts
+            if deadline and time.monotonic() > deadline:
+                return counts
+            time.sleep(interval)
+
+    def results(self, job_id: str) -> List[Optional[str]]:
+        """Outputs in the order of the job's prompts (None where a request failed or is outstanding)."""
+        return [row["output"] for row in self.store.results(job_id)]
+
+
+# ============================================================================
+# Command Line: classify a dataset overnight
+# ============================================================================
+
+def _print_counts(counts):
+    print("  ".join(f"{status}={count}" for status, count in counts.items()))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bulk jobs through the batch API")
+    parser.add_argument("--db", default=os.path.join(CACHE_DIR, "batch_jobs.db"))
+    parser.add_argument("--model", default="openai/gpt-4.1-nano")
+    commands = parser.add_subparsers(dest="command", required=True)
+    submit = commands.add_parser("submit", help="classify a labelled dataset with one strategy")
+    submit.add_argument("dataset", nargs="?", default=os.path.join(DATA_DIR, "sentiment.jsonl"))
+    submit.add_argument("--strategy", default="few_shot")
+    commands.add_parser("status", help="list jobs")
+    for name in ("poll", "wait", "retry", "results"):
+        command = commands.add_parser(name)
+        command.add_argument("job_id")
+    commands.choices["wait"].add_argument("--interval", type=float, default=30.0)
+    args = parser.parse_args()
+
+    store = BatchJobStore(args.db)
+    if args.command == "status":
+        for job in store.list_jobs():
+            print(f"{job['job_id']}  {job['name']:<32}{job['model']:<24}"
+                  f"done={job['done']} failed={job['failed']} submitted={job['submitted']} pending={job['pending']}")
+        return
+
+    runner = BatchRunner(store, model_name=args.model)
+    if args.command == "submit":
+        evaluate = importlib.import_module("evaluate")
+        build_prompt = evaluate.strategies_module.SENTIMENT_STRATEGIES[args.strategy]
+        rows = evaluate.load_dataset(args.dataset)
+        job_id = runner.create_job([build_prompt(row["text"]) for row in rows],
+                                   name=f"{os.path.basename(args.dataset)}:{args.strategy}")
+        batch_ids = runner.submit(job_id)
+        print(f"{job_id}: {len(rows)} requests in {len(batch_ids)} batch(es)")
+    elif args.command == "poll":
+        _print_counts(runner.poll(args.job_id))
+    elif args.command == "wait":
+        _print_counts(runner.wait(args.job_id, args.interval, on_poll=_print_counts))
+    elif args.command == "retry":
+        print(f"{store.retry_failed(args.job_id)} failed requests resubmitted")
+        runner.submit(args.job_id)
+    elif args.command == "results":
+        from evaluate import parse_label
+        for row in store.results(args.job_id):
+            label = parse_label(row["output"]) if row["output"] else None
+            print(f"{row['position']:>5}  {row['status']:<10}{label or '?':<10}{row['error'] or ''}")
+
+
+if __name__ == "__main__":
+    main()
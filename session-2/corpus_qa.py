@@ -0,0 +1,345 @@
+"""
+Corpus Q&A with Query Routing
+
+6_talk_pdf_2.py pastes one whole PDF into every prompt. Here every PDF in
+pdfs/ becomes its own index shard of page passages, and a small routing index
+over per-document term statistics decides which shards a question goes to.
+Only those shards are searched; their hits are merged by score and the best
+passages (with their document and page) are sent to the LLM.
+
+The shard indexes are the hashed TF-IDF inverted indexes from example_store.py.
+The routing index has one row per document, so a question costs a lookup of
+its own terms there plus a search of the few shards it is routed to, however
+many documents are loaded.
+
+Text extraction is the slow part of loading a PDF, so extracted pages are kept
+in cache/pages/ under a fingerprint of each page's content stream and resources.
+When a PDF changes, only pages with new fingerprints are extracted again, the document's
+shard is rebuilt from the cached texts, and the new shard is swapped in while
+questions keep being answered from the old one.
+
+Usage:
+    python corpus_qa.py
+    python corpus_qa.py --show-hits
+"""
+
+import argparse
+import hashlib
+import json
+import math
+import os
+import threading
+from collections import Counter
+from dataclasses import dataclass
+from typing import List
+
+from example_store import ExampleStore, _features
+from helpers import CACHE_DIR, SESSION_DIR, get_shared_llm
+
+PAGES_DIR = os.path.join(CACHE_DIR, "pages")
+PDF_DIR = os.path.join(SESSION_DIR, "pdfs")
+
+
+@dataclass
+class Hit:
+    document: str
+    page: int
+    text: str
+    score: float
+
+
+# ============================================================================
+# Shards: one passage index per document
+# ============================================================================
+
+def split_passages(text, words_per_passage=180, overlap=30):
+    """Overlapping word windows, so an answer split across a boundary is still found."""
+    words = text.split()
+    step = words_per_passage - overlap
+    return [" ".join(words[i:i + words_per_passage]) for i in range(0, max(1, len(words) - overlap), step)]
+
+
+def load_pages(path):
+    """Page texts of a PDF (1-based page numbers)."""
+    from langchain_community.document_loaders import PyPDFLoader
+    return [(page.metadata.get("page", i) + 1, page.page_content) for i, page in enumerate(PyPDFLoader(path).load())]
+
+
+# ============================================================================
+# Page fingerprints: extract only the pages that changed
+# ============================================================================
+
+def _object_digest(obj, memo, resolving=()):
+    """sha256 of a PDF object with its references resolved; streams count by their data."""
+    from pypdf.generic import ArrayObject, DictionaryObject, IndirectObject, StreamObject
+
+    if isinstance(obj, IndirectObject):
+        key = (obj.idnum, obj.generation)
+        if key in resolving:
+            return b"cycle"
+        if key not in memo:
+            # fonts and images are shared by many pages: each is hashed once per reader
+            memo[key] = _object_digest(obj.get_object(), memo, resolving + (key,))
+        return memo[key]
+    digest = hashlib.sha256(type(obj).__name__.encode())
+    if isinstance(obj, StreamObject):
+        digest.update(obj.get_data())
+    if isinstance(obj, DictionaryObject):
+        for name in sorted(obj):
+            digest.update(name.encode() + _object_digest(obj.raw_get(name), memo, resolving))
+    elif isinstance(obj, ArrayObject):
+        for item in obj:
+            digest.update(_object_digest(item, memo, resolving))
+    else:
+        digest.update(repr(obj).encode())
+    return digest.digest()
+
+
+def page_fingerprints(reader):
+    """sha256 of what each page's text is extracted from; far cheaper than extracting it.
+
+    That is the content stream plus the resolved /Resources: a page whose content
+    is only `/Fm0 Do` gets its text from the form XObject, and fonts' ToUnicode
+    maps decide which characters come out.
+    """
+    memo = {}
+    fingerprints = []
+    for page in reader.pages:
+        contents = page.get_contents()
+        digest = hashlib.sha256(contents.get_data() if contents is not None else b"")
+        digest.update(repr((page.mediabox, page.get("/Rotate", 0))).encode())
+        resources = page.raw_get("/Resources") if "/Resources" in page else None
+        digest.update(_object_digest(resources, memo))
+        fingerprints.append(digest.hexdigest())
+    return fingerprints
+
+
+def page_store_name(path):
+    """Cache file stem for a PDF: its name plus a hash of its full path, so same-named files don't collide."""
+    name = os.path.splitext(os.path.basename(path))[0]
+    return f"{name}-{hashlib.sha256(os.path.abspath(path).encode()).hexdigest()[:12]}"
+
+
+def _file_hash(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def load_pages_incremental(path, cache_dir=PAGES_DIR):
+    """Like load_pages, but reuses the cached text of every page whose fingerprint is known.
+
+    Returns (pages, diff); diff lists the 1-based numbers of extracted pages
+    ("added", new or changed content), how many old pages are gone ("removed")
+    and how many were reused. The store is keyed by the PDF's full path and
+    records the file's hash: an unchanged file isn't even parsed.
+    """
+    from pypdf import PdfReader
+
+    store_path = os.path.join(cache_dir, f"{page_store_name(path)}.json")
+    store = {"file": None, "pages": [], "texts": {}}
+    if os.path.exists(store_path):
+        with open(store_path) as f:
+            store = json.load(f)
+    old = store["texts"]
+
+    file_hash = _file_hash(path)
+    if store["file"] == file_hash:
+        fingerprints = store["pages"]
+        return ([(number, old[fingerprint]) for number, fingerprint in enumerate(fingerprints, start=1)],
+                {"added": [], "removed": 0, "reused": len(fingerprints)})
+
+    reader = PdfReader(path)
+    fingerprints = page_fingerprints(reader)
+    texts, added = {}, []
+    for number, fingerprint in enumerate(fingerprints, start=1):
+        if fingerprint in old:
+            texts[fingerprint] = old[fingerprint]
+        elif fingerprint not in texts:
+            texts[fingerprint] = reader.pages[number - 1].extract_text()
+            added.append(number)
+
+    os.makedirs(cache_dir, exist_ok=True)
+    with open(store_path + ".tmp", "w") as f:
+        json.dump({"file": file_hash, "pages": fingerprints, "texts": texts}, f)
+    os.replace(store_path + ".tmp", store_path)
+
+    diff = {"added": added, "removed": len(set(old) - set(texts)), "reused": len(fingerprints) - len(added)}
+    return [(number, texts[fingerprint]) for number, fingerprint in enumerate(fingerprints, start=1)], diff
+
+
+class Shard:
+    """Passages of one document behind their own similarity index."""
+
+    def __init__(self, name, pages, words_per_passage=180, signature=None):
+        self.name = name
+        self.signature = signature  # (size, mtime) of the file it was built from
+        self.passages = [(number, passage) for number, text in pages
+                         for passage in split_passages(text, words_per_passage) if passage.strip()]
+        # The store's "label" slot holds the page number; max_df drops the
+        # vocabulary most passages of one document share
+        self.index = ExampleStore(((text, number) for number, text in self.passages), max_df=0.3)
+        # Document-level term counts for the routing index
+        self.term_counts = Counter()
+        for _, text in pages:
+            self.term_counts.update(_features(text))
+
+    def search(self, question, k):
+        """Top k passages as Hits; scores are cosines, comparable across shards."""
+        query = {f: (1 + math.log(tf)) * self.index.idf[f]
+                 for f, tf in _features(question).items() if f in self.index.idf}
+        norm = math.sqrt(sum(w * w for w in query.values())) or 1.0
+        return [Hit(self.name, self.passages[i][0], self.passages[i][1], score / norm)
+                for i, score in self.index.search(question, k)]
+
+
+# ============================================================================
+# Routing index: which documents are likely to hold the answer
+# ============================================================================
+
+class RoutingIndex:
+    """Inverted index over per-document TF-IDF vectors (one row per shard)."""
+
+    def __init__(self, shards):
+        n = len(shards)
+        df = Counter(f for shard in shards for f in shard.term_counts)
+        self.idf = {f: math.log((n + 1) / (count + 0.5)) for f, count in df.items()}
+        self.postings = {}
+        for shard_id, shard in enumerate(shards):
+            weights = {f: (1 + math.log(tf)) * self.idf[f] for f, tf in shard.term_counts.items()}
+            norm = math.sqrt(sum(w * w for w in weights.values())) or 1.0
+            for f, w in weights.items():
+                self.postings.setdefault(f, []).append((shard_id, w / norm))
+
+    def route(self, question, max_shards=2, min_ratio=0.5):
+        """Shard ids scoring at least `min_ratio` of the best one, at most `max_shards`."""
+        scores = Counter()
+        for f, tf in _features(question).items():
+            for shard_id, w in self.postings.get(f, ()):
+                scores[shard_id] += w * (1 + math.log(tf)) * self.idf[f]
+        ranked = scores.most_common()
+        if not ranked:
+            return []
+        best = ranked[0][1]
+        return [shard_id for shard_id, score in ranked[:max_shards] if score >= min_ratio * best]
+
+
+# ============================================================================
+# Corpus
+# ============================================================================
+
+def _file_signature(path):
+    stat = os.stat(path)
+    return stat.st_size, stat.st_mtime_ns
+
+
+class Corpus:
+    """All documents in a folder, one shard each, behind a routing index."""
+
+    def __init__(self, shards=(), folder=PDF_DIR):
+        self.folder = folder
+        shards = list(shards)
+        # Shards and router are replaced together in one assignment, so a
+        # question never sees a new shard with an old router
+        self._view = (shards, RoutingIndex(shards))
+        self._refresh_lock = threading.Lock()
+
+    @property
+    def shards(self):
+        return self._view[0]
+
+    @property
+    def router(self):
+        return self._view[1]
+
+    @classmethod
+    def from_folder(cls, folder=PDF_DIR):
+        corpus = cls(folder=folder)
+        corpus.refresh()
+        return corpus
+
+    def refresh(self):
+        """Rebuild the shards of PDFs that were added or changed; drop removed ones.
+
+        Returns {document: diff} for the documents that were (re)loaded.
+        """
+        with self._refresh_lock:
+            current = {shard.name: shard for shard in self.shards}
+            paths = sorted(os.path.join(self.folder, name) for name in os.listdir(self.folder)
+                           if name.endswith(".pdf"))
+            shards, changes = [], {}
+            for path in paths:
+                name = os.path.splitext(os.path.basename(path))[0]
+                signature = _file_signature(path)
+                shard = current.get(name)
+                if shard is None or shard.signature != signature:
+                    pages, changes[name] = load_pages_incremental(path)
+                    shard = Shard(name, pages, signature=signature)
+                shards.append(shard)
+            if changes or len(shards) != len(current):
+                self._view = (shards, RoutingIndex(shards))
+            return changes
+
+    def retrieve(self, question, k=5, max_shards=2) -> List[Hit]:
+        """Search only the routed shards and merge their hits by score."""
+        shards, router = self._view
+        shard_ids = router.route(question, max_shards) or range(len(shards))
+        hits = [hit for shard_id in shard_ids for hit in shards[shard_id].search(question, k)]
+        return sorted(hits, key=lambda hit: -hit.score)[:k]
+
+
+def build_prompt(question, hits):
+    excerpts = "\n\n".join(f"[{hit.document} p.{hit.page}]\n{hit.text}" for hit in hits)
+    return f"""Answer the question using only the excerpts below.
+Cite the excerpts you used like [document p.N]. If they don't contain the answer, say so.
+
+{excerpts}
+
+Question: {question}"""
+
+
+_corpus = None
+
+
+def get_corpus():
+    global _corpus
+    if _corpus is None:
+        _corpus = Corpus.from_folder(PDF_DIR)
+    return _corpus
+
+
+def ask(question, k=5):
+    response = get_shared_llm().invoke(build_prompt(question, get_corpus().retrieve(question, k)))
+    return response.content
+
+
+def ask_stream(question, k=5):
+    # Same as ask, but yields the answer as it is generated
+    for chunk in get_shared_llm().stream(build_prompt(question, get_corpus().retrieve(question, k))):
+        yield chunk.content
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Ask questions across all PDFs in pdfs/")
+    parser.add_argument("--show-hits", action="store_true", help="print the passages sent to the model")
+    args = parser.parse_args()
+
+    corpus = get_corpus()
+    print(f"Loaded {len(corpus.shards)} documents: {', '.join(shard.name for shard in corpus.shards)}")
+    print("Ask questions about the documents (type 'quit' to exit):")
+    while True:
+        question = input("\nQuestion: ")
+        if question.lower() == 'quit':
+            break
+        for name, diff in corpus.refresh().items():
+            print(f"  reloaded {name}: extracted pages {diff['added']}, reused {diff['reused']}")
+        if args.show_hits:
+            for hit in corpus.retrieve(question):
+                print(f"  {hit.score:.3f} [{hit.document} p.{hit.page}] {hit.text[:80]}...")
+        print(f"Answer: {ask(question)}")
+
+
+if __name__ == "__main__":
+    main()
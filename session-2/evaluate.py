@@ -0,0 +1,189 @@
+"""
+Prompt Strategy Evaluation
+
+Runs every sentiment strategy from 3_strategies.py over a labelled dataset,
+concurrently, and reports accuracy, latency percentiles and tokens per
+strategy. Finished calls are appended to a results file, so an interrupted
+run picks up where it stopped.
+
+Usage:
+    python evaluate.py data/sentiment.jsonl --concurrency 8
+"""
+
+import argparse
+import csv
+import hashlib
+import importlib
+import json
+import os
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from helpers import CACHE_DIR, DATA_DIR, get_llm
+
+strategies_module = importlib.import_module("3_strategies")
+
+_LABEL_RE = re.compile(r"\b(positive|negative|neutral)\b", re.IGNORECASE)
+
+RESULTS_PATH = os.path.join(CACHE_DIR, "eval_results.jsonl")
+
+
+def load_dataset(path):
+    """Load a labelled dataset from .jsonl or .csv with `text` and `label` fields."""
+    with open(path, newline="") as f:
+        if path.endswith(".csv"):
+            rows = list(csv.DictReader(f))
+        else:
+            rows = [json.loads(line) for line in f if line.strip()]
+    return [{"text": row["text"], "label": row["label"]} for row in rows]
+
+
+def parse_label(output):
+    """Take the last sentiment label mentioned (chain-of-thought ends with its answer)."""
+    matches = _LABEL_RE.findall(output or "")
+    return matches[-1].capitalize() if matches else None
+
+
+def _key(model_name, strategy, text, prompt):
+    # The rendered prompt is part of the key, so editing a strategy invalidates its old results
+    return hashlib.sha256(f"{model_name}|{strategy}|{text}|{json.dumps(prompt)}".encode()).hexdigest()
+
+
+def _load_results(results_path):
+    results = {}
+    if os.path.exists(results_path):
+        with open(results_path) as f:
+            for line in f:
+                if line.strip():
+                    record = json.loads(line)
+                    results[record["key"]] = record
+    return results
+
+
+def _render(build_prompt, text):
+    prompt = build_prompt(text)
+    if isinstance(prompt, tuple):
+        system, user = prompt
+        prompt = [{"role": "system", "content": system}, {"role": "user", "content": user}]
+    return prompt
+
+
+def _run_one(llm, strategy, prompt, item):
+    start = time.perf_counter()
+    response = llm.invoke(prompt)
+    latency = time.perf_counter() - start
+    usage = response.usage_metadata or {}
+    prediction = parse_label(response.content)
+    return {
+        "strategy": strategy,
+        "text": item["text"],
+        "label": item["label"],
+        "prediction": prediction,
+        "correct": prediction == item["label"],
+        "latency": latency,
+        "input_tokens": usage.get("input_tokens", 0),
+        "output_tokens": usage.get("output_tokens", 0),
+    }
+
+
+def run_evaluation(dataset, llm=None, strategies=None, concurrency=8, results_path=RESULTS_PATH):
+    """Run (strategy x item) calls concurrently, skipping ones already in `results_path`.
+
+    The LLM cache is bypassed: a cached answer takes ~0 ms and would distort the
+    latency comparison. Resuming is done with `results_path` instead.
+    """
+    llm = (llm or get_llm()).model_copy(update={"cache": False})
+    strategies = strategies or strategies_module.SENTIMENT_STRATEGIES
+    results = _load_results(results_path)
+    write_lock = threading.Lock()
+
+    todo, wanted = [], set()
+    for strategy, build_prompt in strategies.items():
+        for item in dataset:
+            prompt = _render(build_prompt, item["text"])
+            key = _key(llm.model_name, strategy, item["text"], prompt)
+            wanted.add(key)
+            if key not in results:
+                todo.append((key, strategy, prompt, item))
+    print(f"{len(todo)} calls to make, {len(results)} already done")
+
+    os.makedirs(os.path.dirname(results_path) or ".", exist_ok=True)
+    with open(results_path, "a") as out, ThreadPoolExecutor(max_workers=concurrency) as pool:
+        futures = {pool.submit(_run_one, llm, strategy, prompt, item): key
+                   for key, strategy, prompt, item in todo}
+        for future in as_completed(futures):
+            try:
+                record = {"key": futures[future], **future.result()}
+            except Exception as e:
+                print(f"Error: {e}")
+                continue
+            with write_lock:
+                out.write(json.dumps(record) + "\n")
+                out.flush()
+            results[record["key"]] = record
+
+    return [record for key, record in results.items() if key in wanted]
+
+
+def _percentile(values, p):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(p / 100 * (len(ordered) - 1))))]
+
+
+def summarize(records):
+    """Per-strategy accuracy, latency percentiles (ms) and average tokens."""
+    by_strategy = {}
+    for record in records:
+        by_strategy.setdefault(record["strategy"], []).append(record)
+
+    summary = {}
+    for strategy, rows in by_strategy.items():
+        latencies = [row["latency"] * 1000 for row in rows]
+        tokens = [row["input_tokens"] + row["output_tokens"] for row in rows]
+        accuracy = sum(row["correct"] for row in rows) / len(rows)
+        summary[strategy] = {
+            "n": len(rows),
+            "accuracy": accuracy,
+            "p50_ms": _percentile(latencies, 50),
+            "p95_ms": _percentile(latencies, 95),
+            "p99_ms": _percentile(latencies, 99),
+            "avg_tokens": sum(tokens) / len(tokens),
+            # quality per cost: accuracy points per second of p50 latency and per 1k tokens
+            "acc_per_s": accuracy / max(_percentile(latencies, 50) / 1000, 1e-9),
+            "acc_per_1k_tokens": accuracy / max(sum(tokens) / len(tokens) / 1000, 1e-9),
+        }
+    return summary
+
+
+def print_summary(summary):
+    print("=" * 100)
+    print(f"{'strategy':<18}{'n':>5}{'acc':>8}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}"
+          f"{'tokens':>9}{'acc/s':>9}{'acc/1k tok':>12}")
+    print("=" * 100)
+    for strategy, s in sorted(summary.items(), key=lambda item: -item[1]["accuracy"]):
+        print(f"{strategy:<18}{s['n']:>5}{s['accuracy']:>8.1%}{s['p50_ms']:>10.0f}{s['p95_ms']:>10.0f}"
+              f"{s['p99_ms']:>10.0f}{s['avg_tokens']:>9.0f}{s['acc_per_s']:>9.2f}{s['acc_per_1k_tokens']:>12.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Evaluate prompting strategies on a labelled dataset")
+    parser.add_argument("dataset", nargs="?", default=os.path.join(DATA_DIR, "sentiment.jsonl"))
+    parser.add_argument("--model", default="openai/gpt-4.1-nano")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--strategies", nargs="*", help="subset of strategy names (default: all)")
+    parser.add_argument("--results", default=RESULTS_PATH)
+    args = parser.parse_args()
+
+    strategies = strategies_module.SENTIMENT_STRATEGIES
+    if args.strategies:
+        strategies = {name: strategies[name] for name in args.strategies}
+
+    records = run_evaluation(load_dataset(args.dataset), get_llm(args.model), strategies,
+                             args.concurrency, args.results)
+    print_summary(summarize(records))
+
+
+if __name__ == "__main__":
+    main()
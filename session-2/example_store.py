@@ -0,0 +1,167 @@
+"""
+Dynamic Few-Shot Example Store
+
+Instead of pasting the same examples into every prompt, keep a pool of labelled
+examples behind a small local index and pick the k most similar ones for each
+input, within a token budget.
+
+The index is an inverted index over hashed word uni/bi-grams with TF-IDF
+weights, stored as flat NumPy arrays. A query only touches the postings of its
+own n-grams, so selection stays well under a millisecond for 100k examples.
+"""
+
+import json
+import math
+import re
+import zlib
+from collections import Counter
+
+import numpy as np
+
+_WORD_RE = re.compile(r"[a-z0-9']+")
+NUM_BUCKETS = 1 << 20
+
+
+def _features(text):
+    words = _WORD_RE.findall(text.lower())
+    grams = words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+    # crc32 rather than hash(): stable across processes, so a saved index stays valid
+    return Counter(zlib.crc32(gram.encode()) % NUM_BUCKETS for gram in grams)
+
+
+def _estimate_tokens(text):
+    return len(text) // 4 + 1
+
+
+class ExampleStore:
+    """Labelled (text, label) examples with a precomputed similarity index.
+
+    `max_df`, if given, drops n-grams found in more than that fraction of
+    examples, which have the longest postings. It is off by default: in a
+    sentiment pool the most frequent n-grams ("great", "not", "terrible") are
+    the signal, and IDF already weights down the ones found everywhere.
+    """
+
+    def __init__(self, examples, max_df=None):
+        self.examples = list(examples)
+        self.costs = np.array([_estimate_tokens(f"Text: \"{t}\"\nSentiment: {l}") for t, l in self.examples])
+        self._build(max_df)
+
+    def _build(self, max_df):
+        n = len(self.examples)
+        doc_features = [_features(text) for text, _ in self.examples]
+        df = Counter(f for features in doc_features for f in features)
+        max_count = max(1, int(max_df * n)) if max_df is not None and n > 100 else n
+        self.idf = {f: math.log((n + 1) / (count + 0.5)) for f, count in df.items() if count <= max_count}
+
+        postings = {}
+        for doc_id, features in enumerate(doc_features):
+            weights = {f: (1 + math.log(tf)) * self.idf[f] for f, tf in features.items() if f in self.idf}
+            norm = math.sqrt(sum(w * w for w in weights.values())) or 1.0
+            for f, w in weights.items():
+                postings.setdefault(f, []).append((doc_id, w / norm))
+
+        # Flatten to CSR-style arrays: postings of feature f live in [start, end)
+        self.offsets = {}
+        doc_ids, weights = [], []
+        for f, entries in postings.items():
+            self.offsets[f] = (len(doc_ids), len(doc_ids) + len(entries))
+            doc_ids.extend(doc_id for doc_id, _ in entries)
+            weights.extend(w for _, w in entries)
+        self.doc_ids = np.array(doc_ids, dtype=np.int32)
+        self.weights = np.array(weights, dtype=np.float32)
+
+    @classmethod
+    def from_jsonl(cls, path, **kwargs):
+        with open(path) as f:
+            rows = [json.loads(line) for line in f if line.strip()]
+        return cls([(row["text"], row["label"]) for row in rows], **kwargs)
+
+    def save(self, path):
+        """Write the built index to a .npz file so it doesn't have to be rebuilt."""
+        features = np.array(list(self.offsets), dtype=np.int64)
+        spans = np.array([self.offsets[f] for f in features], dtype=np.int64).reshape(-1, 2)
+        np.savez(
+            path,
+            examples=np.array(json.dumps(self.examples)),
+            features=features,
+            spans=spans,
+            idf=np.array([self.idf[f] for f in features], dtype=np.float64),
+            doc_ids=self.doc_ids,
+            weights=self.weights,
+            costs=self.costs,
+        )
+
+    @classmethod
+    def load(cls, path):
+        data = np.load(path)
+        store = cls.__new__(cls)
+        store.examples = [tuple(example) for example in json.loads(str(data["examples"]))]
+        features = data["features"].tolist()
+        store.offsets = {f: tuple(span) for f, span in zip(features, data["spans"].tolist())}
+        store.idf = dict(zip(features, data["idf"].tolist()))
+        store.doc_ids = data["doc_ids"]
+        store.weights = data["weights"]
+        store.costs = data["costs"]
+        return store
+
+    def _scores(self, text):
+        """(example indexes, scores) of the examples sharing an n-gram with `text`."""
+        ids, scores = [], []
+        for f, tf in _features(text).items():
+            span = self.offsets.get(f)
+            if span is None:
+                continue
+            start, end = span
+            ids.append(self.doc_ids[start:end])
+            scores.append(self.weights[start:end] * ((1 + math.log(tf)) * self.idf[f]))
+        if not ids:
+            return np.zeros(0, dtype=np.int32), np.zeros(0)
+        unique_ids, inverse = np.unique(np.concatenate(ids), return_inverse=True)
+        return unique_ids, np.bincount(inverse, weights=np.concatenate(scores))
+
+    def search(self, text, k=4):
+        """Return (example_index, score) pairs for the k most similar examples."""
+        unique_ids, totals = self._scores(text)
+        if len(totals) > k:
+            top = np.argpartition(-totals, k)[:k]
+        else:
+            top = np.arange(len(totals))
+        top = top[np.argsort(-totals[top])]
+        return [(int(unique_ids[i]), float(totals[i])) for i in top]
+
+    def _ranked(self, text, window):
+        """Example indexes, most similar first; those sharing no n-gram with `text` last, in pool order.
+
+        Only the top `window` matches are sorted up front; the rest only if the caller reads on.
+        """
+        unique_ids, totals = self._scores(text)
+        if len(totals) > window:
+            order = np.argpartition(-totals, window)
+            head, tail = order[:window], order[window:]
+        else:
+            head, tail = np.arange(len(totals)), np.arange(0)
+        yield from unique_ids[head[np.argsort(-totals[head], kind="stable")]].tolist()
+        yield from unique_ids[tail[np.argsort(-totals[tail], kind="stable")]].tolist()
+        matched = set(unique_ids.tolist())
+        yield from (index for index in range(len(self.examples)) if index not in matched)
+
+    def select(self, text, k=4, token_budget=200):
+        """The k most relevant examples for `text` that fit in `token_budget` tokens.
+
+        An example that doesn't fit is skipped for the next-ranked one, so
+        fewer than k come back only when no further example fits.
+        """
+        if not self.examples:
+            return []
+        chosen, spent = [], 0
+        cheapest = int(self.costs.min())
+        for index in self._ranked(text, 4 * k):
+            if len(chosen) == k or spent + cheapest > token_budget:
+                break
+            cost = int(self.costs[index])
+            if spent + cost > token_budget:
+                continue
+            chosen.append(self.examples[index])
+            spent += cost
+        return chosen
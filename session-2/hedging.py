@@ -0,0 +1,142 @@
+"""
+Hedged Requests
+
+Send a prompt to the primary model; if it hasn't answered after the hedge delay,
+send the same prompt to a secondary model and take whichever finishes first.
+The hedge delay follows a percentile of the primary's observed latencies.
+
+Only real requests are timed: answers served from the LLM cache take ~0 ms
+and would drag the percentile (and with it the hedge delay) toward zero.
+"""
+
+import asyncio
+import threading
+import time
+import uuid
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from helpers import from_cache
+
+_POOL = ThreadPoolExecutor(max_workers=32, thread_name_prefix="hedge")
+
+
+class LatencyHistogram:
+    """Rolling window of latencies (seconds) with percentile lookups."""
+
+    def __init__(self, window=500):
+        self.samples = deque(maxlen=window)
+        self.lock = threading.Lock()
+
+    def record(self, seconds):
+        with self.lock:
+            self.samples.append(seconds)
+
+    def percentile(self, p):
+        with self.lock:
+            ordered = sorted(self.samples)
+        if not ordered:
+            return None
+        index = min(len(ordered) - 1, int(round(p / 100 * (len(ordered) - 1))))
+        return ordered[index]
+
+    def __len__(self):
+        return len(self.samples)
+
+
+class HedgedLLM:
+    """Wraps two interchangeable chat models behind a single `invoke`.
+
+    `hedge_percentile` picks the delay from the primary's latency history once
+    `min_samples` calls have been seen; until then `initial_delay` is used.
+    """
+
+    def __init__(self, primary, secondary, hedge_percentile=95, initial_delay=2.0, min_samples=20):
+        self.primary = primary
+        self.secondary = secondary
+        self.hedge_percentile = hedge_percentile
+        self.initial_delay = initial_delay
+        self.min_samples = min_samples
+        self.latencies = {"primary": LatencyHistogram(), "secondary": LatencyHistogram()}
+        self.stats = {"calls": 0, "hedged": 0, "secondary_wins": 0}
+        self._lock = threading.Lock()
+
+    def _count(self, key):
+        with self._lock:
+            self.stats[key] += 1
+
+    def hedge_delay(self):
+        history = self.latencies["primary"]
+        if len(history) < self.min_samples:
+            return self.initial_delay
+        return history.percentile(self.hedge_percentile)
+
+    def _timed(self, name, llm, prompt, started=None, config=None, **kwargs):
+        if started is not None:
+            started.set()
+        run_id = uuid.uuid4()
+        start = time.perf_counter()
+        result = llm.invoke(prompt, config={**(config or {}), "run_id": run_id}, **kwargs)
+        if not from_cache(result, run_id):
+            self.latencies[name].record(time.perf_counter() - start)
+        return result
+
+    def invoke(self, prompt, **kwargs):
+        self._count("calls")
+        started = threading.Event()
+        primary = _POOL.submit(self._timed, "primary", self.primary, prompt, started, **kwargs)
+        # The hedge timer starts when the primary does, not while it waits for a pool thread
+        started.wait()
+        done, _ = wait([primary], timeout=self.hedge_delay())
+        if done and primary.exception() is None:
+            return primary.result()
+
+        # Primary is slow (or already failed): race it against the secondary
+        self._count("hedged")
+        secondary = _POOL.submit(self._timed, "secondary", self.secondary, prompt, **kwargs)
+        pending = {primary, secondary}
+        error = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    # The loser's thread finishes in the background; its result is dropped
+                    for other in pending:
+                        other.cancel()
+                    if future is secondary:
+                        self._count("secondary_wins")
+                    return future.result()
+                error = future.exception()
+        raise error
+
+    async def _atimed(self, name, llm, prompt, config=None, **kwargs):
+        run_id = uuid.uuid4()
+        start = time.perf_counter()
+        result = await llm.ainvoke(prompt, config={**(config or {}), "run_id": run_id}, **kwargs)
+        if not from_cache(result, run_id):
+            self.latencies[name].record(time.perf_counter() - start)
+        return result
+
+    async def ainvoke(self, prompt, **kwargs):
+        """Async version; the losing request is actually cancelled mid-flight."""
+        self._count("calls")
+        primary = asyncio.create_task(self._atimed("primary", self.primary, prompt, **kwargs))
+        done, _ = await asyncio.wait([primary], timeout=self.hedge_delay())
+        if done and primary.exception() is None:
+            return primary.result()
+
+        self._count("hedged")
+        secondary = asyncio.create_task(self._atimed("secondary", self.secondary, prompt, **kwargs))
+        pending = {primary, secondary}
+        error = None
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is None:
+                    for other in pending:
+                        other.cancel()
+                    if task is secondary:
+                        self._count("secondary_wins")
+                    return task.result()
+                error = task.exception()
+        raise error
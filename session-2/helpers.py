@@ -1,21 +1,74 @@
 import os
-from dotenv import load_dotenv
-from langchain_openai import ChatOpenAI
-from langchain_community.cache import SQLiteCache
-from langchain.globals import set_llm_cache
+import sys
+import threading
 
-# Load environment variables
-load_dotenv()
-set_llm_cache(SQLiteCache("cache/langchain_cache.db"))
+# Nothing heavy happens at import time: dotenv, the SQLite cache and the
+# langchain/OpenAI client stack are loaded the first time an LLM is built.
+# Paths are relative to this folder, not the working directory.
+SESSION_DIR = os.path.dirname(os.path.abspath(__file__))
+CACHE_DIR = os.path.join(SESSION_DIR, "cache")
+DATA_DIR = os.path.join(SESSION_DIR, "data")
 
-def get_llm(model_name="openai/gpt-4.1-nano"):
-    return ChatOpenAI(
+# rate_limit.py is shared with session-4 (one copy, one limiter) and lives in common/
+COMMON_DIR = os.path.join(os.path.dirname(SESSION_DIR), "common")
+if COMMON_DIR not in sys.path:
+    sys.path.append(COMMON_DIR)
+_setup_lock = threading.Lock()
+_setup_done = False
+
+def _setup():
+    global _setup_done
+    with _setup_lock:
+        if _setup_done:
+            return
+        from dotenv import load_dotenv
+        from langchain_community.cache import SQLiteCache
+        from langchain.globals import set_llm_cache
+
+        # Load environment variables
+        load_dotenv()
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        set_llm_cache(SQLiteCache(os.path.join(CACHE_DIR, "langchain_cache.db")))
+        _setup_done = True
+
+def get_llm(model_name="openai/gpt-4.1-nano", limiter=None):
+    # Shared across processes when OPENROUTER_RPM is set; retries are then ours, not the client's.
+    # Identical concurrent requests are coalesced into one upstream call.
+    _setup()
+    from rate_limit import get_shared_limiter
+    from singleflight import CoalescingChatOpenAI
+
+    limiter = limiter or get_shared_limiter()
+    return CoalescingChatOpenAI(
         base_url=os.getenv("OPENROUTER_BASE"),
         model_name=model_name,
         api_key=os.getenv("OPENROUTER_API_KEY"),
         temperature=0.7,
+        limiter=limiter,
+        max_retries=0 if limiter else 2,
     )
 
+def from_cache(message, run_id):
+    # True if `message` was served from the LLM cache set up above: a fresh answer gets
+    # an ID made from its call's run ID, a cached one keeps the ID of the run that produced it
+    return str(run_id) not in (getattr(message, "id", None) or "")
+
+_shared_llms = {}
+_shared_lock = threading.Lock()
+
+def get_shared_llm(model_name="openai/gpt-4.1-nano"):
+    # One client per model for the whole process, built on first use: the scripts call
+    # this where they used to build a module-level client at import time
+    with _shared_lock:
+        if model_name not in _shared_llms:
+            _shared_llms[model_name] = get_llm(model_name)
+        return _shared_llms[model_name]
+
+def get_hedged_llm(primary="openai/gpt-4.1-nano", secondary="openai/gpt-5-nano", hedge_percentile=95):
+    # Duplicates slow primary requests to the secondary model; first answer wins
+    from hedging import HedgedLLM
+    return HedgedLLM(get_llm(primary), get_llm(secondary), hedge_percentile=hedge_percentile)
+
 def get_response(llm, prompt):
     try:
         response = llm.invoke(prompt)
@@ -0,0 +1,75 @@
+"""
+Memory Profiling by Stage
+
+tracemalloc snapshots around each stage of a request (load, join, prompt build,
+response): how much each stage allocated and still holds, the peak reached
+inside it, and the source lines responsible. Only Python allocations are
+traced; a memory-mapped file shows up as (almost) nothing, which is the point.
+
+    with MemoryProfiler() as profiler:
+        with profiler.stage("load"):
+            pages = load_pages(path)
+    print(profiler.report())
+"""
+
+import contextlib
+import gc
+import tracemalloc
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+_IGNORE = [tracemalloc.Filter(False, tracemalloc.__file__), tracemalloc.Filter(False, __file__)]
+
+
+def _mb(size):
+    return f"{size / 1024 / 1024:9.2f} MB"
+
+
+class MemoryProfiler:
+    """Collects per-stage allocation stats while tracemalloc is running."""
+
+    def __init__(self, top=3, frames=1):
+        self.top = top
+        self.frames = frames
+        self.stages = []
+
+    def __enter__(self):
+        tracemalloc.start(self.frames)
+        return self
+
+    def __exit__(self, *exc):
+        tracemalloc.stop()
+
+    @contextlib.contextmanager
+    def stage(self, name):
+        before = tracemalloc.take_snapshot().filter_traces(_IGNORE)
+        tracemalloc.reset_peak()
+        start, _ = tracemalloc.get_traced_memory()
+        try:
+            yield
+        finally:
+            gc.collect()  # so "held" is what is still referenced, not garbage awaiting collection
+            current, peak = tracemalloc.get_traced_memory()
+            after = tracemalloc.take_snapshot().filter_traces(_IGNORE)
+            self.stages.append({
+                "stage": name,
+                "held": current - start,     # still allocated when the stage ended
+                "peak": peak - start,        # highest point above the start, inside the stage
+                "total": current,
+                "top": after.compare_to(before, "lineno")[:self.top],
+            })
+
+    def report(self) -> str:
+        lines = [f"{'stage':<16}{'held':>12}{'peak':>12}{'total':>12}"]
+        for stage in self.stages:
+            lines.append(f"{stage['stage']:<16}{_mb(stage['held'])}{_mb(stage['peak'])}{_mb(stage['total'])}")
+            for diff in stage["top"]:
+                frame = diff.traceback[0]
+                lines.append(f"    {diff.size_diff / 1024:+10.0f} KB  {frame.filename}:{frame.lineno}")
+        if resource is not None:
+            # ru_maxrss is KB on Linux
+            lines.append(f"max RSS of the process: {_mb(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024)}")
+        return "\n".join(lines)
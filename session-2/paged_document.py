@@ -0,0 +1,171 @@
+"""
+Bounded-Memory Documents
+
+6_talk_pdf_2.py used to keep the page list and the joined document string for
+the whole session, and build one more full copy of it per question. Here a
+document's page texts are written once to a plain UTF-8 file in cache/pages/
+and memory-mapped: between questions nothing of the text is held in Python
+objects, and the mapped pages live in the OS page cache, which is shared by
+every worker process serving the same document and can be reclaimed.
+
+For a question the text is decoded straight from the mapping into the
+message, once, without a joined copy or an f-string copy. A prompt budget
+caps how much document text the prompts in flight may hold together; further
+questions wait for a slot instead of growing memory with concurrency.
+"""
+
+import contextlib
+import json
+import mmap
+import os
+import threading
+
+from langchain_core.messages import HumanMessage
+
+from helpers import CACHE_DIR
+
+PAGES_DIR = os.path.join(CACHE_DIR, "pages")
+
+# Copies of a prompt alive during a call: the message text, the JSON request
+# body built by the client and its encoded bytes. That holds only for a client
+# that doesn't key or store the prompt: send these messages through one without
+# the LLM cache and the coalescer (6_talk_pdf_2.get_paged_llm)
+PROMPT_COPIES = 3
+
+
+class PromptBudget:
+    """Caps the bytes of document text held by prompts in flight; extra questions wait.
+
+    A single prompt larger than the budget still runs, but alone.
+    """
+
+    def __init__(self, max_bytes=64 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.in_flight = 0
+        self._cond = threading.Condition()
+        self.stats = {"prompts": 0, "waited": 0, "peak_bytes": 0}
+
+    @contextlib.contextmanager
+    def reserve(self, size):
+        with self._cond:
+            fits = lambda: self.in_flight == 0 or self.in_flight + size <= self.max_bytes
+            if not fits():
+                self.stats["waited"] += 1
+            self._cond.wait_for(fits)
+            self.in_flight += size
+            self.stats["prompts"] += 1
+            self.stats["peak_bytes"] = max(self.stats["peak_bytes"], self.in_flight)
+        try:
+            yield
+        finally:
+            with self._cond:
+                self.in_flight -= size
+                self._cond.notify_all()
+
+
+default_budget = PromptBudget()
+
+
+def _source_signature(path):
+    stat = os.stat(path)
+    return [stat.st_size, stat.st_mtime_ns]
+
+
+def build_page_file(pdf_path, cache_dir=PAGES_DIR):
+    """Write the PDF's page texts to `<name>-<path hash>.txt` (pages separated by a blank line).
+
+    Returns the path of the text file. Skipped when it is already up to date
+    with the PDF; otherwise only changed pages are extracted (see
+    corpus_qa.load_pages_incremental) and the page list is dropped once written.
+    """
+    from corpus_qa import load_pages_incremental, page_store_name
+
+    name = page_store_name(pdf_path)
+    text_path = os.path.join(cache_dir, f"{name}.txt")
+    meta_path = os.path.join(cache_dir, f"{name}.meta.json")
+    signature = _source_signature(pdf_path)
+    if os.path.exists(text_path) and os.path.exists(meta_path):
+        with open(meta_path) as f:
+            if json.load(f)["source"] == signature:
+                return text_path
+
+    pages, _ = load_pages_incremental(pdf_path, cache_dir)
+    offsets, position = [], 0
+    os.makedirs(cache_dir, exist_ok=True)
+    with open(text_path + ".tmp", "wb") as f:
+        for i, (_, text) in enumerate(pages):
+            data = (text if i == 0 else "\n\n" + text).encode("utf-8")
+            start = position + (0 if i == 0 else 2)
+            f.write(data)
+            position += len(data)
+            offsets.append([start, position])
+    os.replace(text_path + ".tmp", text_path)
+    with open(meta_path + ".tmp", "w") as f:
+        json.dump({"source": signature, "pages": offsets}, f)
+    os.replace(meta_path + ".tmp", meta_path)
+    return text_path
+
+
+class PagedDocument:
+    """A document's text in a memory-mapped file, decoded only while a prompt needs it."""
+
+    def __init__(self, pdf_path, cache_dir=PAGES_DIR, budget=None):
+        self.pdf_path = pdf_path
+        self.budget = budget or default_budget
+        text_path = build_page_file(pdf_path, cache_dir)
+        with open(os.path.splitext(text_path)[0] + ".meta.json") as f:
+            meta = json.load(f)
+        self.signature = meta["source"]
+        self.page_offsets = meta["pages"]
+        self.size = os.path.getsize(text_path)
+        self._map = None
+        if self.size:
+            with open(text_path, "rb") as f:
+                self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def _decode(self, start, end):
+        if self._map is None:
+            return ""
+        with memoryview(self._map) as view:
+            return str(view[start:end], "utf-8")
+
+    def text(self) -> str:
+        """The whole document as one new string (the caller owns the copy)."""
+        return self._decode(0, self.size)
+
+    def iter_pages(self):
+        """(page_number, text) one page at a time."""
+        for number, (start, end) in enumerate(self.page_offsets, start=1):
+            yield number, self._decode(start, end)
+
+    def messages(self, question):
+        """Messages asking `question` about the document.
+
+        The document text is its own content part, so the question is appended
+        without copying it again.
+        """
+        return [HumanMessage(content=[
+            {"type": "text", "text": "Document: "},
+            {"type": "text", "text": self.text()},
+            {"type": "text", "text": f"\n\nQuestion: {question}"},
+        ])]
+
+    @contextlib.contextmanager
+    def prompt(self, question):
+        """`messages(question)`, built once the prompt budget has room for them."""
+        with self.budget.reserve(self.size * PROMPT_COPIES):
+            yield self.messages(question)
+
+
+_documents = {}
+_documents_lock = threading.Lock()
+
+
+def open_document(pdf_path, cache_dir=PAGES_DIR) -> PagedDocument:
+    """The PagedDocument for `pdf_path`, reopened when the PDF has changed."""
+    with _documents_lock:
+        document = _documents.get(pdf_path)
+        if document is None or document.signature != _source_signature(pdf_path):
+            # a replaced mapping is unmapped once the prompts still using it are gone
+            document = _documents[pdf_path] = PagedDocument(pdf_path, cache_dir)
+        return document
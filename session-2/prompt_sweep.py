@@ -0,0 +1,290 @@
+"""
+Prompt Variant Sweeps with Early Stopping
+
+One sample per prompt at temperature 0.7 says little about which phrasing is
+better. Here every variant is sampled many times, concurrently, and each
+output is scored by pluggable graders (functions output -> score in [0, 1]).
+
+Sampling runs in rounds and stops per variant as soon as the data decide it:
+each variant's mean score has a confidence interval that stays valid however
+often it is checked (Hoeffding, with a union bound over variants and looks),
+and a variant stops being sampled once its interval is entirely below another
+variant's ("worse") or entirely above all others ("best"). The remaining
+variants are declared tied once, for every pair, the interval on the
+difference of their means lies within +-`min_effect`; variants still running
+at `max_samples` are "undecided".
+So a clear difference costs a handful of samples, and only close calls use
+the full budget.
+
+Each sample uses its own seed (distinct from the LLM cache and from
+coalescing) and every graded sample is appended to a results file, so a
+sweep that is re-run, or extended with more variants, only pays for the
+samples it doesn't have yet. Samples are keyed by what the graders compute
+(their code and parameters), not only their names, so changing a grader
+re-scores.
+
+    sweep = PromptSweep(variants, [contains_grader([r"\\.get\\("])], max_samples=40)
+    sweep.run()
+    print_sweep(sweep)
+"""
+
+import hashlib
+import json
+import math
+import os
+import re
+import threading
+import types
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List
+
+from helpers import CACHE_DIR, get_llm
+
+
+# ============================================================================
+# Graders
+# ============================================================================
+
+def contains_grader(patterns: List[str], name="contains"):
+    """Fraction of the regex `patterns` found in the output."""
+    compiled = [re.compile(pattern, re.IGNORECASE) for pattern in patterns]
+
+    def grade(output):
+        return sum(bool(pattern.search(output)) for pattern in compiled) / len(compiled)
+    grade.__name__ = name
+    grade.params = {"patterns": list(patterns)}
+    return grade
+
+
+def bullet_count_grader(expected: int, name="bullets"):
+    """1 if the output has exactly `expected` bullet points, else 0."""
+    def grade(output):
+        bullets = re.findall(r"^\s*(?:[-*•]|\d+[.)])\s+", output, re.MULTILINE)
+        return float(len(bullets) == expected)
+    grade.__name__ = name
+    grade.params = {"expected": expected}
+    return grade
+
+
+def length_grader(max_words: int, name="length"):
+    """1 up to `max_words` words, falling linearly to 0 at twice that."""
+    def grade(output):
+        words = len(output.split())
+        return max(0.0, min(1.0, 2 - words / max_words))
+    grade.__name__ = name
+    grade.params = {"max_words": max_words}
+    return grade
+
+
+JUDGE_PROMPT = """Rate how well the response below meets this criterion, from 1 (not at all) to 10 (fully).
+Criterion: {criteria}
+
+Response:
+{output}
+
+Reply with the number only."""
+
+
+def llm_judge_grader(criteria: str, llm=None, name="judge"):
+    """An LLM rates the output 1-10 against `criteria` (mapped to 0-1), at temperature 0."""
+    judge = {}
+
+    def grade(output):
+        if "llm" not in judge:
+            judge["llm"] = llm or get_llm()
+        reply = judge["llm"].invoke(JUDGE_PROMPT.format(criteria=criteria, output=output), temperature=0).content
+        match = re.search(r"\b(10|[1-9])\b", reply)
+        return (int(match.group(1)) - 1) / 9 if match else 0.0
+    grade.__name__ = name
+    grade.params = {"criteria": criteria, "prompt": JUDGE_PROMPT, "model": getattr(llm, "model_name", None)}
+    return grade
+
+
+def _code_digest(code) -> str:
+    # Bytecode, names and constants, recursing into nested code (its repr has an address)
+    parts = [code.co_code.hex(), ",".join(code.co_names)]
+    parts += [_code_digest(const) if isinstance(const, types.CodeType) else repr(const) for const in code.co_consts]
+    return hashlib.sha256("|".join(parts).encode()).hexdigest()
+
+
+def _grader_key(grader) -> str:
+    """What a grader computes: its name, code and parameters.
+
+    The graders above carry their parameters in `params`; for other functions
+    the values they close over stand in (an unstable repr only costs re-scoring).
+    """
+    code = getattr(grader, "__code__", None)
+    if code is None:
+        return repr(grader)  # a callable object
+    params = getattr(grader, "params", None)
+    if params is None:
+        params = [cell.cell_contents for cell in grader.__closure__ or ()]
+    return f"{grader.__name__}:{_code_digest(code)}:{params!r}"
+
+
+# ============================================================================
+# Sequential test
+# ============================================================================
+
+def confidence_radius(n, look, num_variants, delta):
+    """Half-width of an interval for a mean of n scores in [0, 1], at the look-th check.
+
+    Hoeffding with a union bound over all variants and all looks (look j gets
+    delta * 6 / (pi^2 j^2)), so checking after every round doesn't inflate
+    the error rate.
+    """
+    return math.sqrt(math.log(num_variants * math.pi ** 2 * look * look / (3 * delta)) / (2 * n))
+
+
+@dataclass
+class VariantResult:
+    name: str
+    scores: List[float] = field(default_factory=list)
+    # running | best | worse | tied | undecided (out of samples before any call was clear)
+    status: str = "running"
+
+    @property
+    def n(self):
+        return len(self.scores)
+
+    @property
+    def mean(self):
+        return sum(self.scores) / self.n if self.scores else 0.0
+
+
+def _messages(prompt):
+    if isinstance(prompt, tuple):
+        system, user = prompt
+        return [{"role": "system", "content": system}, {"role": "user", "content": user}]
+    return prompt
+
+
+class PromptSweep:
+    """Samples prompt variants in rounds until each one is decided or out of budget.
+
+    `variants` maps names to prompts (a string, or a (system, user) tuple);
+    `graders` are functions output -> score in [0, 1], averaged per sample.
+    """
+
+    def __init__(self, variants: Dict[str, object], graders: List[Callable[[str], float]], llm=None,
+                 delta=0.05, min_effect=0.1, batch=4, min_samples=8, max_samples=50, concurrency=8,
+                 results_path=os.path.join(CACHE_DIR, "sweep_results.jsonl")):
+        self.variants = variants
+        self.graders = graders
+        self.llm = llm or get_llm()
+        self.delta = delta
+        self.min_effect = min_effect
+        self.batch = batch
+        self.min_samples = min_samples
+        self.max_samples = max_samples
+        self.concurrency = concurrency
+        self.results_path = results_path
+        self.results = {name: VariantResult(name) for name in variants}
+        self.stats = {"calls": 0, "cached": 0, "rounds": 0}
+        self._cache = self._load_cache()
+        self._lock = threading.Lock()
+
+    def _load_cache(self):
+        cache = {}
+        if os.path.exists(self.results_path):
+            with open(self.results_path) as f:
+                for line in f:
+                    if line.strip():
+                        record = json.loads(line)
+                        cache[record["key"]] = record
+        return cache
+
+    def _key(self, name, index):
+        graders = ",".join(_grader_key(grader) for grader in self.graders)
+        prompt = json.dumps(_messages(self.variants[name]))
+        return hashlib.sha256(f"{self.llm.model_name}|{prompt}|{index}|{graders}".encode()).hexdigest()
+
+    def _sample(self, name, index):
+        key = self._key(name, index)
+        record = self._cache.get(key)
+        if record is not None:
+            with self._lock:
+                self.stats["cached"] += 1
+            return record["score"]
+        # The seed makes each sample a distinct request (not served from the
+        # LLM cache or coalesced) and reproducible where the provider supports it
+        output = self.llm.invoke(_messages(self.variants[name]), seed=index).content
+        scores = {grader.__name__: grader(output) for grader in self.graders}
+        score = sum(scores.values()) / len(scores)
+        record = {"key": key, "variant": name, "index": index, "output": output, "scores": scores, "score": score}
+        with self._lock:
+            self.stats["calls"] += 1
+            self._cache[key] = record
+            os.makedirs(os.path.dirname(self.results_path) or ".", exist_ok=True)
+            with open(self.results_path, "a") as f:
+                f.write(json.dumps(record) + "\n")
+        return score
+
+    def _radius(self, result: VariantResult):
+        # Checks happen at min_samples, then every `batch` samples
+        look = max(1, math.ceil((result.n - self.min_samples) / self.batch) + 1)
+        return confidence_radius(result.n, look, len(self.results), self.delta)
+
+    def interval(self, result: VariantResult):
+        if not result.n:
+            return 0.0, 1.0
+        radius = self._radius(result)
+        return max(0.0, result.mean - radius), min(1.0, result.mean + radius)
+
+    def _decide(self):
+        running = [r for r in self.results.values() if r.status == "running"]
+        if any(r.n < self.min_samples for r in running):
+            return
+        contenders = [r for r in self.results.values() if r.status in ("running", "best")]
+        bounds = {r.name: self.interval(r) for r in contenders}
+        for r in running:
+            others = [bounds[o.name] for o in contenders if o.name != r.name]
+            if not others:
+                continue
+            lower, upper = bounds[r.name]
+            if upper < max(low for low, _ in others):
+                r.status = "worse"
+            elif lower > max(up for _, up in others):
+                r.status = "best"
+        running = [r for r in self.results.values() if r.status == "running"]
+        if len(running) == 1 and not any(r.status == "best" for r in self.results.values()):
+            running[0].status = "best"
+        elif len(running) > 1:
+            # Tied only if every pairwise difference is bounded within min_effect; the
+            # intervals hold jointly (union bound), so their radii add up for a difference
+            radii = {r.name: self._radius(r) for r in running}
+            if all(abs(a.mean - b.mean) + radii[a.name] + radii[b.name] <= self.min_effect
+                   for i, a in enumerate(running) for b in running[i + 1:]):
+                for r in running:
+                    r.status = "tied"
+
+    def run(self) -> Dict[str, VariantResult]:
+        with ThreadPoolExecutor(max_workers=self.concurrency) as pool:
+            while True:
+                running = [r for r in self.results.values() if r.status == "running" and r.n < self.max_samples]
+                if not running:
+                    break
+                self.stats["rounds"] += 1
+                jobs = [(r, index) for r in running
+                        for index in range(r.n, min(r.n + self.batch, self.max_samples))]
+                scores = list(pool.map(lambda job: self._sample(job[0].name, job[1]), jobs))
+                for (r, _), score in zip(jobs, scores):
+                    r.scores.append(score)
+                self._decide()
+        for r in self.results.values():
+            if r.status == "running":
+                r.status = "undecided"
+        return self.results
+
+
+def print_sweep(sweep: PromptSweep):
+    print("=" * 72)
+    print(f"{'variant':<22}{'n':>5}{'mean':>8}{'interval':>18}{'status':>12}")
+    print("=" * 72)
+    for r in sorted(sweep.results.values(), key=lambda r: -r.mean):
+        lower, upper = sweep.interval(r)
+        print(f"{r.name:<22}{r.n:>5}{r.mean:>8.2f}{f'[{lower:.2f}, {upper:.2f}]':>18}{r.status:>12}")
+    used = sum(r.n for r in sweep.results.values())
+    print(f"{used} samples instead of {sweep.max_samples * len(sweep.results)} "
+          f"({sweep.stats['calls']} calls, {sweep.stats['cached']} from {sweep.results_path})")
@@ -0,0 +1,132 @@
+"""
+Single-Flight Request Coalescing
+
+The SQLite cache only helps once a response has been written. When many
+workers send the same prompt at the same moment they all miss the cache and
+all go upstream. Here concurrent identical requests (same model, parameters
+and messages) wait on one in-flight call and share its result. Works for
+threads and asyncio tasks within one process.
+"""
+
+import asyncio
+import copy
+import hashlib
+import json
+import threading
+from concurrent.futures import Future
+
+from langchain_core.messages import message_to_dict
+
+from rate_limit import RateLimitedChatOpenAI
+
+
+class SingleFlight:
+    """Runs at most one call per key at a time; concurrent callers share its result.
+
+    Each caller gets its own deep copy of the result: LangChain sets the
+    message ID and response metadata on the returned object afterwards, and
+    callers must not see each other's.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+        self._acalls = {}
+        self.stats = {"calls": 0, "coalesced": 0}
+
+    def do(self, key, fn):
+        with self._lock:
+            self.stats["calls"] += 1
+            future = self._calls.get(key)
+            leader = future is None
+            if leader:
+                future = self._calls[key] = Future()
+            else:
+                self.stats["coalesced"] += 1
+        if not leader:
+            return copy.deepcopy(future.result())
+        try:
+            result = fn()
+            future.set_result(result)
+            return copy.deepcopy(result)
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+
+    async def ado(self, key, coro_fn):
+        loop = asyncio.get_running_loop()
+        # asyncio tasks belong to one loop, so coalesce per loop
+        loop_key = (id(loop), key)
+        with self._lock:
+            self.stats["calls"] += 1
+            flight = self._acalls.get(loop_key)
+            if flight is None:
+                # The call runs in its own task, owned by no caller: cancelling the
+                # caller that started it (HedgedLLM cancels the losing request)
+                # doesn't cancel it for the others
+                flight = self._acalls[loop_key] = {"task": loop.create_task(coro_fn()), "waiters": 0}
+                flight["task"].add_done_callback(lambda _: self._forget(loop_key, flight))
+            else:
+                self.stats["coalesced"] += 1
+            flight["waiters"] += 1
+        try:
+            result = await asyncio.shield(flight["task"])
+        except asyncio.CancelledError:
+            with self._lock:
+                flight["waiters"] -= 1
+                abandoned = flight["waiters"] == 0
+            if abandoned:
+                flight["task"].cancel()  # nobody is left waiting for it
+            raise
+        except BaseException:
+            with self._lock:
+                flight["waiters"] -= 1
+            raise
+        with self._lock:
+            flight["waiters"] -= 1
+        return copy.deepcopy(result)
+
+    def _forget(self, loop_key, flight):
+        with self._lock:
+            if self._acalls.get(loop_key) is flight:
+                del self._acalls[loop_key]
+
+
+_flights = SingleFlight()
+
+
+def request_key(model_params, messages, stop, kwargs):
+    payload = {
+        "params": model_params,
+        "messages": [message_to_dict(message) for message in messages],
+        "stop": stop,
+        "kwargs": kwargs,
+    }
+    return hashlib.sha256(json.dumps(payload, sort_keys=True, default=str).encode()).hexdigest()
+
+
+class CoalescingChatOpenAI(RateLimitedChatOpenAI):
+    """ChatOpenAI whose identical concurrent requests make a single upstream call."""
+
+    coalesce: bool = True
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        if not self.coalesce:
+            return super()._generate(messages, stop=stop, run_manager=run_manager, **kwargs)
+        key = request_key({**self._default_params, "base_url": self.openai_api_base}, messages, stop, kwargs)
+        return _flights.do(key, lambda: super(CoalescingChatOpenAI, self)._generate(
+            messages, stop=stop, run_manager=run_manager, **kwargs))
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs):
+        if not self.coalesce:
+            return await super()._agenerate(messages, stop=stop, run_manager=run_manager, **kwargs)
+        key = request_key({**self._default_params, "base_url": self.openai_api_base}, messages, stop, kwargs)
+        return await _flights.ado(key, lambda: super(CoalescingChatOpenAI, self)._agenerate(
+            messages, stop=stop, run_manager=run_manager, **kwargs))
+
+
+def coalescing_stats():
+    return dict(_flights.stats)
@@ -0,0 +1,175 @@
+"""
+Map-Reduce Summarization
+
+6_talk_pdf_2.py puts the whole PDF into one prompt, which doesn't fit for the
+larger documents. Here the pages are packed into token-budgeted chunks, each
+chunk is summarized (map) with a bounded number of calls in flight, and the
+partial summaries are combined level by level (reduce) until one is left.
+
+Every map and reduce call goes through the LLM cache (helpers.py), which keys
+it by the model and the prompt text. Chunk boundaries are picked by page
+content, so an edited page only changes the chunks around it: a re-run after a
+few pages changed recomputes those chunks and the reduce steps above them.
+Page texts come from load_pages_incremental, so only changed pages are
+extracted again too.
+
+Usage:
+    python summarize_pdf.py pdfs/ai_agents_vs_agentic_ai.pdf --concurrency 8
+    python summarize_pdf.py pdfs/tintash_handbook.pdf --instruction "List every policy about leave."
+"""
+
+import argparse
+import hashlib
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from corpus_qa import load_pages_incremental
+from helpers import from_cache, get_llm
+
+DEFAULT_INSTRUCTION = "Summarize the key points as a few short bullet points."
+
+# No part numbers or page ranges in the prompts: inserting a page elsewhere
+# must not change (and so invalidate) the prompt of an unchanged chunk
+MAP_PROMPT = """Below is an excerpt from the document "{name}".
+{instruction}
+
+Excerpt:
+{text}"""
+
+REDUCE_PROMPT = """Below are notes on consecutive parts of the document "{name}", in order.
+Combine them into one set of notes. {instruction}
+
+{notes}"""
+
+
+def _estimate_tokens(text):
+    return len(text) // 4 + 1
+
+
+def _cuts_after(text, cut_every):
+    digest = hashlib.sha256(text.encode()).digest()
+    return int.from_bytes(digest[:4], "big") % cut_every == 0
+
+
+def plan_chunks(pages, token_budget=3000, cut_every=4):
+    """Pack consecutive pages into chunks of at most `token_budget` tokens.
+
+    Chunks end on page boundaries chosen by content: after every page whose
+    hash falls on 1 in `cut_every`, and wherever the next page would not fit.
+    Those content cuts don't depend on the pages before them, so editing,
+    inserting or removing a page only moves the boundaries up to the next
+    cut; every later chunk (and its cache key) stays the same.
+    A page larger than the budget is split on word boundaries into chunks of its own.
+    """
+    chunks, current, used = [], [], 0
+
+    def flush():
+        nonlocal current, used
+        if current:
+            chunks.append("\n\n".join(current))
+            current, used = [], 0
+
+    for _, text in pages:
+        cost = _estimate_tokens(text)
+        if cost > token_budget:
+            flush()
+            words = text.split()
+            step = max(1, token_budget * 3 // 4)  # ~0.75 words per token
+            chunks.extend(" ".join(words[i:i + step]) for i in range(0, len(words), step))
+            continue
+        if used + cost > token_budget:
+            flush()
+        current.append(text)
+        used += cost
+        if _cuts_after(text, cut_every):
+            flush()
+    flush()
+    return chunks
+
+
+def plan_groups(notes, token_budget=3000, cut_every=3):
+    """Group consecutive notes for one reduce call each; at least two per group.
+
+    Like plan_chunks, groups also end after notes picked by content, so an
+    unchanged run of notes keeps its groups (and cached reduce calls).
+    """
+    groups, current, used = [], [], 0
+    for note in notes:
+        cost = _estimate_tokens(note)
+        if len(current) >= 2 and used + cost > token_budget:
+            groups.append(current)
+            current, used = [], 0
+        current.append(note)
+        used += cost
+        if len(current) >= 2 and _cuts_after(note, cut_every):
+            groups.append(current)
+            current, used = [], 0
+    if current:
+        if len(current) == 1 and groups:
+            groups[-1].append(current[0])
+        else:
+            groups.append(current)
+    return groups
+
+
+class MapReduceSummarizer:
+    """Summarizes documents of any length with at most `concurrency` calls in flight."""
+
+    def __init__(self, llm=None, token_budget=3000, concurrency=8):
+        self.llm = llm or get_llm()
+        self.token_budget = token_budget
+        self.concurrency = concurrency
+        self._stats_lock = threading.Lock()
+        self.stats = {"chunks": 0, "levels": 0, "calls": 0, "cached": 0}
+
+    def _count(self, name):
+        with self._stats_lock:
+            self.stats[name] += 1
+
+    def _complete(self, prompt):
+        run_id = uuid.uuid4()
+        response = self.llm.invoke(prompt, config={"run_id": run_id})
+        self._count("cached" if from_cache(response, run_id) else "calls")
+        return response.content
+
+    def summarize(self, name, pages, instruction=DEFAULT_INSTRUCTION):
+        """`pages` is a list of (page_number, text); returns the final summary."""
+        chunks = plan_chunks(pages, self.token_budget)
+        self.stats["chunks"] = len(chunks)
+        with ThreadPoolExecutor(max_workers=self.concurrency) as pool:
+            notes = list(pool.map(lambda text: self._complete(
+                MAP_PROMPT.format(name=name, instruction=instruction, text=text)), chunks))
+            # Reduce level by level; the groups within a level run in parallel
+            while len(notes) > 1:
+                self.stats["levels"] += 1
+                groups = plan_groups(notes, self.token_budget)
+                notes = list(pool.map(lambda group: self._complete(REDUCE_PROMPT.format(
+                    name=name, instruction=instruction, notes="\n\n---\n\n".join(group))), groups))
+        return notes[0] if notes else ""
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Summarize or analyse a whole PDF with map-reduce")
+    parser.add_argument("pdf")
+    parser.add_argument("--instruction", default=DEFAULT_INSTRUCTION)
+    parser.add_argument("--model", default="openai/gpt-4.1-nano")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--token-budget", type=int, default=3000, help="tokens of document text per call")
+    args = parser.parse_args()
+
+    name = os.path.splitext(os.path.basename(args.pdf))[0]
+    summarizer = MapReduceSummarizer(get_llm(args.model), args.token_budget, args.concurrency)
+    start = time.perf_counter()
+    pages, diff = load_pages_incremental(args.pdf)
+    summary = summarizer.summarize(name, pages, args.instruction)
+    print(summary)
+    print("=" * 60)
+    print(f"{summarizer.stats} in {time.perf_counter() - start:.1f}s "
+          f"({len(diff['added'])} pages extracted, {diff['reused']} reused)")
+
+
+if __name__ == "__main__":
+    main()
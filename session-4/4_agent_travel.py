@@ -1,29 +1,75 @@
-from langchain.agents import AgentExecutor, create_react_agent
-from langchain import hub
 from helpers import get_llm
-from tools import get_travel_tools
+from react_prompt import with_known_facts
+from deadline import Deadline, run_with_deadline
+from agent_log import configure_logging
+
+
+_react_prompt = None
+
+def pull_react_prompt():
+    """The official ReAct prompt from LangChain Hub, fetched once per process.
+
+    Call it before starting a `Deadline`, so the network fetch isn't charged to the run.
+    """
+    global _react_prompt
+    if _react_prompt is None:
+        from langchain import hub
+        _react_prompt = hub.pull("hwchase17/react")
+    return _react_prompt
+
+
+def create_travel_agent(deadline=None, session_cache=None, on_event=None, tool_k=None):
+    """Create a ReAct travel agent using the official LangChain Hub prompt.
+
+    Pass a `Deadline` to bound every LLM and tool call by the run's time budget.
+    Constant/session tools are resolved up front into the prompt; reuse the
+    same `session_cache` dict across agents built for one user session.
+    With `on_event`, tools are dispatched as soon as the streamed output holds a
+    complete Action Input (see streaming_react.py).
+    With `tool_k`, each step's prompt lists only the `tool_k` tools most
+    relevant to the question (see tool_registry.py).
+    """
+    # The agents stack, hub client and tools are slow to import; load them only when an agent is built
+    from langchain.agents import AgentExecutor, create_react_agent
+    from agent_log import LoggingCallbackHandler, with_logging
+    from deadline import with_deadline
+    from tools import get_travel_tools, inline_static_tools
 
-
-def create_travel_agent():
-    """Create a ReAct travel agent using the official LangChain Hub prompt."""
     # Get the LLM (strong model, deterministic)
-    llm = get_llm(model_name="openai/gpt-4o", temperature=0.0)
+    llm = get_llm(model_name="openai/gpt-4o", temperature=0.0, deadline=deadline)
     
     # Get all travel tools
     tools = get_travel_tools()
     
+    # Location and approved destinations never change: inline them instead of
+    # spending an LLM round-trip on each lookup
+    tools, known_facts = inline_static_tools(tools, session_cache)
+    if deadline is not None:
+        tools = with_deadline(tools, deadline)
+    # Steps and tool results go to the agent log instead of verbose stdout
+    log_handler = LoggingCallbackHandler()
+    tools = with_logging(tools, log_handler)
+    
     # Use the official ReAct prompt from LangChain Hub
-    prompt = hub.pull("hwchase17/react")
+    prompt = with_known_facts(pull_react_prompt(), known_facts)
     
     # Create the agent
-    agent = create_react_agent(llm, tools, prompt)
+    if tool_k is not None:
+        from tool_registry import ToolRegistry, create_tool_selecting_agent
+        agent = create_tool_selecting_agent(llm, ToolRegistry(tools), prompt, k=tool_k, on_event=on_event)
+    elif on_event is not None:
+        from streaming_react import create_streaming_react_agent
+        agent = create_streaming_react_agent(llm, tools, prompt, on_event=on_event)
+    else:
+        agent = create_react_agent(llm, tools, prompt)
     
     # Wrap in AgentExecutor
     agent_executor = AgentExecutor(
         agent=agent,
         tools=tools,
-        verbose=True,
+        callbacks=[log_handler],
         max_iterations=12,
+        max_execution_time=deadline.remaining() if deadline else None,
         handle_parsing_errors=True,
     )
     
@@ -81,12 +127,71 @@ def example_4_multi_step_query():
     print("Done: multi-step handled.")
 
 
+# ============================================================================
+# Example 5: Deadline-Bounded Query
+# ============================================================================
+
+def example_5_deadline_query():
+    pull_react_prompt()  # the budget starts after the prompt is fetched
+    deadline = Deadline(seconds=20)
+    agent = create_travel_agent(deadline=deadline)
+    result = run_with_deadline(agent, {
+        "input": "Plan a weekend trip for me. I have 3 days and want to travel up to 500km by road. I prefer cloudy weather."
+    }, deadline)
+    
+    print(result["output"])
+    if result["stopped_reason"]:
+        print(f"Stopped early: {result['stopped_reason']}")
+
+
+# ============================================================================
+# Example 6: Recurring Query Shapes (Trajectory Cache)
+# ============================================================================
+
+def example_6_trajectory_cache():
+    from trajectory_cache import TrajectoryCache, run_with_trajectory_cache
+    cache = TrajectoryCache()
+    # The first question runs the full loop; the others replay its tool plan
+    for destination in ["Murree", "Naran", "Swat"]:
+        result = run_with_trajectory_cache(create_travel_agent(), {
+            "input": f"What's the distance from Lahore to {destination}, and how long would it take to drive there?"
+        }, cache)
+        print(f"[{result['trajectory']}] {result['output']}")
+    print(cache.stats)
+
+
+# ============================================================================
+# Example 7: Resumable Run (Checkpoints)
+# ============================================================================
+
+def example_7_resumable(run_id=None):
+    from checkpoint import CheckpointStore, run_with_checkpoints
+    store = CheckpointStore()
+    # Pass the run_id printed by an interrupted run to pick it up where it stopped
+    result = run_with_checkpoints(create_travel_agent(), {
+        "input": "Plan a weekend trip for me. I have 3 days and want to travel up to 500km by road. I prefer cloudy weather."
+    }, store, run_id=run_id)
+    print(f"[run {result['run_id']}, {result['resumed_steps']} steps resumed] {result['output']}")
+
+
+# ============================================================================
+# Example 8: Only the Relevant Tools in the Prompt
+# ============================================================================
+
+def example_8_tool_selection():
+    agent = create_travel_agent(tool_k=2)
+    result = agent.invoke({"input": "How far is Naran from Lahore?"})
+    print(result["output"])
+    print(agent.agent.stats)
+
+
 # ============================================================================
 # Main Demo
 # ============================================================================
 
 def main():
     """Run examples"""
+    configure_logging("INFO")
     print("TRAVEL AGENT PLANNER")
     
     # Run examples
@@ -99,6 +204,18 @@ def main():
     # example_3_budget_query()
     # print("\n\n")
     
+    # example_5_deadline_query()
+    # print("\n\n")
+    
+    # example_6_trajectory_cache()
+    # print("\n\n")
+    
+    # example_7_resumable()
+    # print("\n\n")
+    
+    # example_8_tool_selection()
+    # print("\n\n")
+    
     example_4_multi_step_query()
 
 
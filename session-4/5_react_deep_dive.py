@@ -1,7 +1,6 @@
-from langchain.agents import AgentExecutor, create_react_agent
-from langchain_core.tools import Tool
-from helpers import get_llm
+from helpers import get_llm, get_cascade_llm
 from react_prompt import get_react_prompt
+from agent_log import configure_logging
 
 
 def calculator(expression: str) -> str:
@@ -31,33 +30,48 @@ def search_knowledge_base(query: str) -> str:
     return "No information found."
 
 
-tools = [
-    Tool(
-        name="calculator",
-        func=calculator,
-        description="Evaluates a mathematical expression. Input should be like '2 + 2' or '10 * 5'"
-    ),
-    Tool(
-        name="search",
-        func=search_knowledge_base,
-        description="Searches a knowledge base for information about topics like Python, LangChain, or agents"
-    )
-]
-
-
-def create_react_agent_demo():
-    """Create a ReAct agent for demonstration"""
-    llm = get_llm(model_name="openai/gpt-4o", temperature=0.0)
+def get_demo_tools():
+    from langchain_core.tools import Tool  # slow import, deferred to first use
+    return [
+        Tool(
+            name="calculator",
+            func=calculator,
+            description="Evaluates a mathematical expression. Input should be like '2 + 2' or '10 * 5'"
+        ),
+        Tool(
+            name="search",
+            func=search_knowledge_base,
+            description="Searches a knowledge base for information about topics like Python, LangChain, or agents"
+        )
+    ]
+
+
+def create_react_agent_demo(llm=None, on_event=None):
+    """Create a ReAct agent for demonstration
+
+    With `on_event`, the LLM output is parsed while it streams and each tool
+    is dispatched as soon as its Action Input is complete.
+    """
+    from langchain.agents import AgentExecutor, create_react_agent  # slow import, deferred to first use
+    from agent_log import LoggingCallbackHandler, with_logging
+    llm = llm or get_llm(model_name="openai/gpt-4o", temperature=0.0)
     prompt = get_react_prompt()
+    tools = get_demo_tools()
 
     # needs tool metadata for selection and prompt construction.
-    agent = create_react_agent(llm, tools, prompt) 
+    if on_event is not None:
+        from streaming_react import create_streaming_react_agent
+        agent = create_streaming_react_agent(llm, tools, prompt, on_event=on_event)
+    else:
+        agent = create_react_agent(llm, tools, prompt) 
 
     # executor needs the actual tool functions to run and manage the Thought → Action → Observation loop.
+    # Each step is logged (the full Thought at DEBUG) instead of printed by verbose=True.
+    log_handler = LoggingCallbackHandler()
     agent_executor = AgentExecutor(
         agent=agent,
-        tools=tools,
-        verbose=True,
+        tools=with_logging(tools, log_handler),
+        callbacks=[log_handler],
         max_iterations=5
     )
     
@@ -103,7 +117,32 @@ def example_mixed_tools():
     
     print(f"Final Answer: {result['output']}")
 
+def example_cascade():
+    
+    # gpt-4.1-nano handles each step unless its output isn't valid ReAct format
+    llm = get_cascade_llm(small="openai/gpt-4.1-nano", large="openai/gpt-4o")
+    agent = create_react_agent_demo(llm)
+    result = agent.invoke({
+        "input": "What is LangChain, and what is 10 * 5?"
+    })
+    
+    print(f"Final Answer: {result['output']}")
+    print(f"Escalation rate: {llm.escalation_rate():.0%} ({llm.stats})")
+
+def example_streaming_dispatch():
+    
+    # Tools start as soon as "Action Input: ..." is complete; the answer streams as it is written
+    from streaming_react import print_event
+    agent = create_react_agent_demo(on_event=print_event)
+    result = agent.invoke({
+        "input": "What is 20 + 10, then multiply by 2?"
+    })
+    
+    print(f"\nFinal Answer: {result['output']}")
+    print(f"Early dispatches: {agent.agent.stats}")
+
 def main():
+    configure_logging("DEBUG")  # DEBUG shows each Thought the model wrote
     example_simple_math()
     example_multi_step()
     example_information_retrieval()
@@ -0,0 +1,251 @@
+"""
+Structured Agent Logging
+
+`verbose=True` and the tools' print() calls write to stdout synchronously: under
+concurrent load every step waits on the stdout lock, and lines from different
+runs interleave with nothing to tell them apart. Here agent steps and tool
+results are log records with fields instead:
+
+- every record carries the correlation ID of the run it belongs to (set per
+  executor run, or by the caller with `run_context`)
+- the calling thread only puts the record on a queue; formatting and writing
+  happen on a background thread, and records are dropped (and counted) rather
+  than waited on if the queue is full
+- levels gate the work: below the configured level a call is one integer
+  comparison, no message or fields are built
+- the most recent records are kept in a ring buffer (`recent_traces`)
+
+Nothing is written until `configure_logging()` is called; scripts call it in
+main(), a service once at startup.
+"""
+
+import atexit
+import contextlib
+import contextvars
+import json
+import logging
+import logging.handlers
+import queue
+import sys
+import threading
+import time
+import uuid
+from collections import deque
+from typing import List, Optional
+
+logger = logging.getLogger("travel_agent")
+
+_run_id = contextvars.ContextVar("agent_run_id", default=None)
+
+
+def current_run_id() -> Optional[str]:
+    return _run_id.get()
+
+
+@contextlib.contextmanager
+def run_context(run_id: Optional[str] = None):
+    """Tag every record logged inside the block (in this thread/task) with `run_id`."""
+    token = _run_id.set(run_id or uuid.uuid4().hex[:8])
+    try:
+        yield _run_id.get()
+    finally:
+        _run_id.reset(token)
+
+
+def log_event(event: str, level: int = logging.INFO, **fields):
+    """Log a structured event; free when `level` is disabled."""
+    if logger.isEnabledFor(level):
+        logger.log(level, event, extra={"fields": fields})
+
+
+# ============================================================================
+# Handlers: queue on the calling thread, everything else in the background
+# ============================================================================
+
+class _NonBlockingQueueHandler(logging.handlers.QueueHandler):
+    """Enqueues without waiting; tags records with the run ID of the calling context."""
+
+    def __init__(self, q):
+        super().__init__(q)
+        self.dropped = 0
+
+    def prepare(self, record):
+        # Only cheap work here; the formatter runs on the listener thread
+        record.run_id = _run_id.get()
+        record.fields = getattr(record, "fields", {})
+        if record.args:
+            record.msg, record.args = record.getMessage(), None
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class RingBufferHandler(logging.Handler):
+    """Keeps the last `capacity` records as dicts."""
+
+    def __init__(self, capacity=1000):
+        super().__init__()
+        self.records = deque(maxlen=capacity)
+
+    def emit(self, record):
+        self.records.append(_as_dict(record))
+
+
+def _as_dict(record) -> dict:
+    return {"ts": record.created, "level": record.levelname, "run_id": getattr(record, "run_id", None),
+            "event": record.getMessage(), **getattr(record, "fields", {})}
+
+
+class StructuredFormatter(logging.Formatter):
+    """`12:00:01 INFO [3f2a9c1d] tool.end tool=get_weather ms=3` or one JSON object per line."""
+
+    def __init__(self, json_lines=False):
+        super().__init__()
+        self.json_lines = json_lines
+
+    def format(self, record):
+        if self.json_lines:
+            return json.dumps(_as_dict(record), default=str)
+        fields = " ".join(f"{key}={value!r}" if isinstance(value, str) and " " in value else f"{key}={value}"
+                          for key, value in getattr(record, "fields", {}).items())
+        stamp = time.strftime("%H:%M:%S", time.localtime(record.created))
+        return f"{stamp} {record.levelname} [{getattr(record, 'run_id', None) or '-'}] {record.getMessage()} {fields}".rstrip()
+
+
+_state = {}
+_configure_lock = threading.Lock()
+
+
+def configure_logging(level="INFO", stream=None, json_lines=False, ring_size=1000, queue_size=10000):
+    """Route agent logs through a background thread to `stream` (stderr) and a ring buffer.
+
+    Safe to call again: the old listener is flushed and replaced.
+    """
+    with _configure_lock:
+        _shutdown()
+        ring = RingBufferHandler(ring_size)
+        output = logging.StreamHandler(stream or sys.stderr)
+        output.setFormatter(StructuredFormatter(json_lines))
+        handler = _NonBlockingQueueHandler(queue.Queue(queue_size))
+        listener = logging.handlers.QueueListener(handler.queue, output, ring)
+        listener.start()
+        logger.addHandler(handler)
+        logger.setLevel(level)
+        logger.propagate = False
+        _state.update(handler=handler, listener=listener, ring=ring)
+
+
+def _shutdown():
+    if _state:
+        logger.removeHandler(_state["handler"])
+        _state["listener"].stop()  # writes what is still queued
+        _state.clear()
+
+
+atexit.register(_shutdown)
+
+
+def recent_traces(run_id: Optional[str] = None, limit: Optional[int] = None) -> List[dict]:
+    """Most recent records, oldest first, optionally of one run only."""
+    if not _state:
+        return []
+    records = [r for r in list(_state["ring"].records) if run_id is None or r["run_id"] == run_id]
+    return records[-limit:] if limit else records
+
+
+def dropped_records() -> int:
+    return _state["handler"].dropped if _state else 0
+
+
+# ============================================================================
+# Executor callbacks (replaces verbose=True)
+# ============================================================================
+
+class _LoggingCallbacks:
+    """Logs runs, agent actions and tool results as structured events.
+
+    A run without a correlation ID gets a fresh one for its duration, so tool
+    records logged inside it share it.
+    """
+
+    run_inline = True  # keep the run's context (and run ID) in async executors too
+
+    def __init__(self):
+        self._tokens = {}
+        self._started = {}
+        self._last = {}  # run -> end of its last tool call, to time the planning step
+        self._tools = {}
+
+    def on_chain_start(self, serialized, inputs, *, run_id, parent_run_id=None, **kwargs):
+        if parent_run_id is not None:
+            return
+        if _run_id.get() is None:
+            self._tokens[run_id] = _run_id.set(uuid.uuid4().hex[:8])
+        self._started[run_id] = self._last[run_id] = time.monotonic()
+        log_event("run.start", input=inputs.get("input") if isinstance(inputs, dict) else inputs)
+
+    def on_agent_action(self, action, *, run_id, **kwargs):
+        if logger.isEnabledFor(logging.INFO):
+            plan_ms = round((time.monotonic() - self._last.get(run_id, time.monotonic())) * 1000)
+            log_event("agent.action", tool=action.tool, tool_input=action.tool_input, plan_ms=plan_ms)
+            log_event("agent.thought", logging.DEBUG, log=action.log)
+
+    def on_tool_start(self, serialized, input_str, *, run_id, **kwargs):
+        self._tools[run_id] = ((serialized or {}).get("name") or kwargs.get("name"), time.monotonic())
+
+    def on_tool_end(self, output, *, run_id, parent_run_id=None, **kwargs):
+        now = time.monotonic()
+        name, started = self._tools.pop(run_id, (None, now))
+        if parent_run_id in self._last:
+            self._last[parent_run_id] = now
+        log_event("tool.end", tool=name, ms=round((now - started) * 1000), observation=str(output)[:200])
+
+    def on_tool_error(self, error, *, run_id, parent_run_id=None, **kwargs):
+        name, _ = self._tools.pop(run_id, (None, None))
+        if parent_run_id in self._last:
+            self._last[parent_run_id] = time.monotonic()
+        log_event("tool.error", logging.WARNING, tool=name, error=repr(error))
+
+    def on_agent_finish(self, finish, *, run_id, **kwargs):
+        log_event("agent.finish", output=finish.return_values.get("output"))
+
+    def _end(self, run_id, event, level, **fields):
+        started = self._started.pop(run_id, None)
+        if started is None:
+            return
+        self._last.pop(run_id, None)
+        log_event(event, level, ms=round((time.monotonic() - started) * 1000), **fields)
+        token = self._tokens.pop(run_id, None)
+        if token is not None:
+            _run_id.reset(token)
+
+    def on_chain_end(self, outputs, *, run_id, **kwargs):
+        self._end(run_id, "run.end", logging.INFO)
+
+    def on_chain_error(self, error, *, run_id, **kwargs):
+        self._end(run_id, "run.error", logging.ERROR, error=repr(error))
+
+
+_handler_class = None
+
+
+def __getattr__(name):
+    # LoggingCallbackHandler subclasses langchain's BaseCallbackHandler, which is slow
+    # to import; the class is made on first use so importing this module stays cheap
+    global _handler_class
+    if name != "LoggingCallbackHandler":
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    if _handler_class is None:
+        from langchain_core.callbacks import BaseCallbackHandler
+        _handler_class = type("LoggingCallbackHandler", (_LoggingCallbacks, BaseCallbackHandler),
+                              {"__module__": __name__, "__doc__": _LoggingCallbacks.__doc__})
+    return _handler_class
+
+
+def with_logging(tools, handler: "LoggingCallbackHandler"):
+    """Copies of `tools` reporting to `handler`; the executor's own callbacks aren't passed to tools."""
+    return [tool.model_copy(update={"callbacks": [handler]}) for tool in tools]
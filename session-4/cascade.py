@@ -0,0 +1,94 @@
+"""
+Model Cascade
+
+Try a small, fast model first and only escalate to the large model when the
+small model's output fails validation. Most agent steps are simple formatting
+work that the small model gets right.
+"""
+
+import json
+import threading
+
+from langchain.agents.output_parsers import ReActSingleInputOutputParser
+from langchain_core.runnables import Runnable
+
+
+# ============================================================================
+# Validators: take the model's output text, return True if it's good enough
+# ============================================================================
+
+_react_parser = ReActSingleInputOutputParser()
+
+
+def react_format_validator(text: str) -> bool:
+    """Output parses as a ReAct Action/Action Input or Final Answer."""
+    try:
+        _react_parser.parse(text)
+        return True
+    except Exception:
+        return False
+
+
+def json_validator(text: str) -> bool:
+    """Output is valid JSON (surrounding ``` fences are allowed)."""
+    cleaned = text.strip().removeprefix("```json").removeprefix("```").removesuffix("```")
+    try:
+        json.loads(cleaned)
+        return True
+    except ValueError:
+        return False
+
+
+def label_validator(labels):
+    """Output is exactly one of `labels` (case-insensitive)."""
+    allowed = {label.lower() for label in labels}
+    return lambda text: text.strip().strip(".").lower() in allowed
+
+
+# ============================================================================
+# Cascade
+# ============================================================================
+
+class CascadeLLM(Runnable):
+    """Runnable chat model that escalates small -> large on validation failure.
+
+    Works anywhere a chat model does, including create_react_agent (which
+    binds a stop sequence; bound kwargs are passed to both models).
+    """
+
+    def __init__(self, small, large, validator=react_format_validator):
+        self.small = small
+        self.large = large
+        self.validator = validator
+        self.stats = {"calls": 0, "escalations": 0, "small_errors": 0}
+        self._lock = threading.Lock()
+
+    def _count(self, key):
+        with self._lock:
+            self.stats[key] += 1
+
+    def invoke(self, input, config=None, **kwargs):
+        self._count("calls")
+        try:
+            result = self.small.invoke(input, config, **kwargs)
+            if self.validator(result.content):
+                return result
+        except Exception:
+            self._count("small_errors")
+        self._count("escalations")
+        return self.large.invoke(input, config, **kwargs)
+
+    async def ainvoke(self, input, config=None, **kwargs):
+        self._count("calls")
+        try:
+            result = await self.small.ainvoke(input, config, **kwargs)
+            if self.validator(result.content):
+                return result
+        except Exception:
+            self._count("small_errors")
+        self._count("escalations")
+        return await self.large.ainvoke(input, config, **kwargs)
+
+    def escalation_rate(self) -> float:
+        calls = self.stats["calls"]
+        return self.stats["escalations"] / calls if calls else 0.0
@@ -0,0 +1,260 @@
+"""
+Checkpoint and Resume for Agent Runs
+
+An AgentExecutor run that dies at iteration 9 of 12 (timeout, crash, deploy)
+normally starts over and pays for every LLM call again. Here each step is
+written to a local SQLite store as it happens: the LLM output and parsed
+action as soon as the agent has planned, the observation once the tool has
+run. A run can then be resumed by its ID from the last completed step.
+
+Tools with side effects (tool.metadata = {"side_effects": True}) also get an
+idempotency marker per call: a call that already completed returns its stored
+result, and one that was started but never recorded (the process died during
+it) is not repeated blindly.
+"""
+
+import functools
+import json
+import os
+import sqlite3
+import time
+import uuid
+from contextlib import closing
+from typing import Any, List, Optional
+
+from langchain.agents import BaseSingleActionAgent
+from langchain_core.agents import AgentAction
+from langchain_core.tools import BaseTool
+
+from deadline import _STOPPED_OUTPUT
+
+# Relative to this folder, not the working directory
+CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "cache")
+
+
+class CheckpointStore:
+    """Runs, their steps and side-effect markers in one SQLite file."""
+
+    def __init__(self, path=os.path.join(CACHE_DIR, "checkpoints.db")):
+        self.path = path
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with closing(self._connect()) as conn, conn:
+            conn.execute("""CREATE TABLE IF NOT EXISTS runs (
+                run_id TEXT PRIMARY KEY, inputs TEXT, status TEXT, output TEXT, updated REAL)""")
+            conn.execute("""CREATE TABLE IF NOT EXISTS steps (
+                run_id TEXT, idx INTEGER, tool TEXT, tool_input TEXT, log TEXT, observation TEXT,
+                PRIMARY KEY (run_id, idx))""")
+            conn.execute("CREATE TABLE IF NOT EXISTS tool_calls (key TEXT PRIMARY KEY, status TEXT, result TEXT)")
+
+    def _connect(self):
+        return sqlite3.connect(self.path, timeout=30)
+
+    # -- runs ----------------------------------------------------------------
+
+    def start_run(self, inputs: dict) -> str:
+        run_id = uuid.uuid4().hex
+        with closing(self._connect()) as conn, conn:
+            conn.execute("INSERT INTO runs VALUES (?, ?, 'running', NULL, ?)", (run_id, json.dumps(inputs), time.time()))
+        return run_id
+
+    def get_run(self, run_id: str) -> Optional[dict]:
+        with closing(self._connect()) as conn:
+            row = conn.execute("SELECT inputs, status, output FROM runs WHERE run_id = ?", (run_id,)).fetchone()
+        if row is None:
+            return None
+        return {"inputs": json.loads(row[0]), "status": row[1], "output": row[2]}
+
+    def finish_run(self, run_id: str, status: str, output: str):
+        with closing(self._connect()) as conn, conn:
+            conn.execute("UPDATE runs SET status = ?, output = ?, updated = ? WHERE run_id = ?",
+                         (status, output, time.time(), run_id))
+
+    def list_runs(self, status: Optional[str] = None) -> List[tuple]:
+        query = "SELECT run_id, status, updated FROM runs"
+        with closing(self._connect()) as conn:
+            if status:
+                return conn.execute(query + " WHERE status = ? ORDER BY updated", (status,)).fetchall()
+            return conn.execute(query + " ORDER BY updated").fetchall()
+
+    # -- steps ---------------------------------------------------------------
+
+    def record_action(self, run_id: str, idx: int, action: AgentAction):
+        with closing(self._connect()) as conn, conn:
+            conn.execute("INSERT OR REPLACE INTO steps VALUES (?, ?, ?, ?, ?, NULL)",
+                         (run_id, idx, action.tool, json.dumps(action.tool_input), action.log))
+
+    def record_observation(self, run_id: str, idx: int, observation):
+        with closing(self._connect()) as conn, conn:
+            conn.execute("UPDATE steps SET observation = ? WHERE run_id = ? AND idx = ?",
+                         (str(observation), run_id, idx))
+
+    def load_steps(self, run_id: str):
+        """(completed (action, observation) pairs, planned actions still waiting for their tools)."""
+        with closing(self._connect()) as conn:
+            rows = conn.execute("SELECT tool, tool_input, log, observation FROM steps WHERE run_id = ? ORDER BY idx",
+                                (run_id,)).fetchall()
+        steps, pending = [], []
+        for tool, tool_input, log, observation in rows:
+            action = AgentAction(tool, json.loads(tool_input), log)
+            if observation is None or pending:
+                pending.append(action)  # observations are recorded in order: the rest are unrun too
+            else:
+                steps.append((action, observation))
+        return steps, pending
+
+    # -- side-effect markers ---------------------------------------------------
+
+    def claim_call(self, key: str):
+        """None if this call may run now; otherwise (status, result) of an earlier attempt."""
+        with closing(self._connect()) as conn, conn:
+            row = conn.execute("SELECT status, result FROM tool_calls WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                conn.execute("INSERT INTO tool_calls VALUES (?, 'started', NULL)", (key,))
+            return row
+
+    def release_call(self, key: str):
+        with closing(self._connect()) as conn, conn:
+            conn.execute("DELETE FROM tool_calls WHERE key = ?", (key,))
+
+    def complete_call(self, key: str, result):
+        with closing(self._connect()) as conn, conn:
+            conn.execute("UPDATE tool_calls SET status = 'done', result = ? WHERE key = ?", (str(result), key))
+
+
+# ============================================================================
+# Idempotent side-effect tools
+# ============================================================================
+
+def _has_side_effects(tool: BaseTool) -> bool:
+    return bool((tool.metadata or {}).get("side_effects"))
+
+
+def _idempotent_tool(tool: BaseTool, store: CheckpointStore, run_id: str) -> BaseTool:
+    func = getattr(tool, "func", None)
+    if func is None or not _has_side_effects(tool):
+        return tool
+
+    @functools.wraps(func)
+    def once(*args, **kwargs):
+        key = json.dumps([run_id, tool.name, args, kwargs], sort_keys=True, default=str)
+        earlier = store.claim_call(key)
+        if earlier is not None:
+            status, result = earlier
+            if status == "done":
+                return result
+            return f"Error: an earlier attempt of {tool.name} with this input may have completed; not repeating it."
+        try:
+            result = func(*args, **kwargs)
+        except Exception:
+            store.release_call(key)  # failed cleanly, so a retry is safe
+            raise
+        store.complete_call(key, result)
+        return result
+
+    # functools.wraps keeps the signature, so the rendered {tools} block is unchanged
+    return tool.model_copy(update={"func": once})
+
+
+def with_idempotency(tools: List[BaseTool], store: CheckpointStore, run_id: str) -> List[BaseTool]:
+    """Wrap side-effect tools so each distinct call happens at most once per run."""
+    return [_idempotent_tool(tool, store, run_id) for tool in tools]
+
+
+# ============================================================================
+# Running
+# ============================================================================
+
+class _ResumedAgent(BaseSingleActionAgent):
+    """Plans with `agent`, seeing the steps of earlier attempts before this attempt's own."""
+
+    agent: Any
+    earlier: list = []
+    pending: list = []  # planned before the interruption, tools not run yet
+
+    @property
+    def input_keys(self) -> List[str]:
+        return self.agent.input_keys
+
+    @property
+    def return_values(self) -> List[str]:
+        return self.agent.return_values
+
+    def _planned(self):
+        # Run the interrupted actions' tools without asking the LLM again
+        pending, self.pending = self.pending, []
+        return pending[0] if len(pending) == 1 else pending
+
+    def plan(self, intermediate_steps, callbacks=None, **kwargs):
+        if self.pending:
+            return self._planned()
+        return self.agent.plan(self.earlier + intermediate_steps, callbacks=callbacks, **kwargs)
+
+    async def aplan(self, intermediate_steps, callbacks=None, **kwargs):
+        if self.pending:
+            return self._planned()
+        return await self.agent.aplan(self.earlier + intermediate_steps, callbacks=callbacks, **kwargs)
+
+    def return_stopped_response(self, early_stopping_method, intermediate_steps, **kwargs):
+        return self.agent.return_stopped_response(early_stopping_method, self.earlier + intermediate_steps, **kwargs)
+
+    def tool_run_logging_kwargs(self):
+        return self.agent.tool_run_logging_kwargs()
+
+
+def run_with_checkpoints(agent_executor, inputs: Optional[dict] = None, store: Optional[CheckpointStore] = None,
+                         run_id: Optional[str] = None) -> dict:
+    """Run (or, given `run_id`, resume) an agent with every step checkpointed.
+
+    Runs through AgentExecutor.iter() with yield_actions on, so each action is
+    recorded as soon as it is planned and its observation once its tool has
+    run. max_iterations counts the whole run (resumed steps included),
+    max_execution_time this attempt; handle_parsing_errors and return_direct
+    tools behave as usual. Returns the usual result dict plus `run_id` and
+    `resumed_steps`.
+    """
+    store = store or CheckpointStore()
+    if run_id is None:
+        run_id = store.start_run(inputs)
+    else:
+        run = store.get_run(run_id)
+        if run is None:
+            raise KeyError(f"Unknown run: {run_id}")
+        inputs = run["inputs"]
+        if run["status"] == "finished":
+            steps, _ = store.load_steps(run_id)
+            return {**inputs, "output": run["output"], "intermediate_steps": steps,
+                    "run_id": run_id, "resumed_steps": len(steps)}
+
+    steps, pending = store.load_steps(run_id)
+    resumed = len(steps)
+    max_iterations = agent_executor.max_iterations
+    executor = agent_executor.model_copy(update={
+        "agent": _ResumedAgent(agent=agent_executor.agent, earlier=list(steps), pending=pending),
+        "tools": with_idempotency(agent_executor.tools, store, run_id),
+        "max_iterations": None if max_iterations is None else max(0, max_iterations - resumed),
+    })
+
+    # Every action gets its own index, also when one step plans several
+    planned = []  # indexes of recorded actions whose observations are still to come
+    next_index = len(steps)
+    output = _STOPPED_OUTPUT
+    iterator = executor.iter(inputs)
+    iterator.yield_actions = True  # each action as it is planned, each step once its tool has run
+    for chunk in iterator:
+        for action in chunk.get("actions", []):
+            store.record_action(run_id, next_index, action)
+            planned.append(next_index)
+            next_index += 1
+        for step in chunk.get("steps", []):
+            if step.action.tool == "_Exception":  # parsing error: there was no action to record before
+                store.record_action(run_id, next_index, step.action)
+                planned.append(next_index)
+                next_index += 1
+            store.record_observation(run_id, planned.pop(0), step.observation)
+            steps.append((step.action, step.observation))
+        if "output" in chunk:
+            output = chunk["output"]
+
+    status = "stopped" if output == _STOPPED_OUTPUT else "finished"
+    store.finish_run(run_id, status, output)
+    return {**inputs, "output": output, "intermediate_steps": steps, "run_id": run_id, "resumed_steps": resumed}
@@ -6,6 +6,8 @@ from langchain_core.prompts import PromptTemplate
 from langchain_core.tools import Tool
 from helpers import get_llm
 from react_prompt import get_react_prompt
+from prompt_profiler import count_tokens, profile_prompt, print_profile
+from tools import get_travel_tools
 
 
 def show_react_prompt_anatomy():
@@ -63,12 +65,12 @@ def show_prompt_variations():
     # Base prompt
     base_prompt = get_react_prompt()
     print("1. Base Prompt (verbose):")
-    print(f"   Length: {len(base_prompt.template)} characters")
+    print(f"   Length: {len(base_prompt.template)} characters, {count_tokens(base_prompt.template)} tokens")
     
     # Concise prompt
     concise_prompt = get_react_prompt(concise=True)
     print("2. Concise Prompt:")
-    print(f"   Length: {len(concise_prompt.template)} characters")
+    print(f"   Length: {len(concise_prompt.template)} characters, {count_tokens(concise_prompt.template)} tokens")
     
     # Custom prompt
     custom_prompt = PromptTemplate.from_template("""
@@ -81,7 +83,23 @@ Question: {input}
 Thought: {agent_scratchpad}
 """)
     print("3. Custom Prompt:")
-    print(f"   Length: {len(custom_prompt.template)} characters")
+    print(f"   Length: {len(custom_prompt.template)} characters, {count_tokens(custom_prompt.template)} tokens")
+
+
+def show_token_profile():
+    """Show where the tokens of a fully rendered prompt go"""
+    print("\nTOKEN PROFILE (travel tools, 5 iterations)")
+    
+    tools = get_travel_tools()
+    question = "Plan a weekend trip for me. I have 3 days and want to travel up to 500km by road."
+    
+    print_profile("Base Prompt", profile_prompt(get_react_prompt(), tools, question))
+    print_profile("Concise Prompt", profile_prompt(get_react_prompt(concise=True), tools, question))
+    
+    try:
+        print_profile("Hub Prompt", profile_prompt(hub.pull("hwchase17/react"), tools, question))
+    except Exception as e:
+        print(f"Could not load from LangChain Hub: {e}")
 
 
 def show_langchain_hub_prompt():
@@ -155,6 +173,7 @@ def main():
     show_react_prompt_anatomy()
     show_tool_injection()
     show_prompt_variations()
+    show_token_profile()
     show_langchain_hub_prompt()
     create_agent_with_custom_prompt()
     
@@ -0,0 +1,133 @@
+"""
+Execution Deadlines
+
+A per-request time budget that is handed down to every LLM call (as the HTTP
+request timeout, see rate_limit.RateLimitedChatOpenAI) and every tool call, so
+a single agent run can never hold a worker longer than its deadline.
+"""
+
+import contextvars
+import functools
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FuturesTimeout
+from typing import TYPE_CHECKING, List
+
+if TYPE_CHECKING:  # langchain_core is slow to import and only needed for the annotations
+    from langchain_core.tools import BaseTool
+
+# Shared pool for tool calls. A timed-out tool keeps running in its thread
+# (Python threads can't be killed) but nobody waits for it any more.
+_TOOL_POOL = ThreadPoolExecutor(max_workers=16, thread_name_prefix="tool")
+
+
+# What AgentExecutor returns when max_iterations / max_execution_time stop it
+_STOPPED_OUTPUT = "Agent stopped due to iteration limit or time limit."
+
+
+class DeadlineExceeded(Exception):
+    """Raised when a call is attempted after the run's deadline has passed."""
+
+
+class Deadline:
+    """Absolute point in time by which an agent run must finish."""
+
+    def __init__(self, seconds: float):
+        self.seconds = seconds
+        self.expires_at = time.monotonic() + seconds
+
+    def remaining(self) -> float:
+        return max(0.0, self.expires_at - time.monotonic())
+
+    def expired(self) -> bool:
+        return self.remaining() <= 0
+
+    def check(self, what: str = "call", needed: float = 0.0) -> float:
+        """Return the remaining seconds, or raise if no more than `needed` are left."""
+        remaining = self.remaining()
+        if remaining <= needed:
+            if remaining > 0:
+                raise DeadlineExceeded(f"{what} needs {needed:.1f}s, only {remaining:.1f}s of "
+                                       f"the {self.seconds}s deadline left")
+            raise DeadlineExceeded(f"Deadline of {self.seconds}s exceeded before {what}")
+        return remaining
+
+
+def _guard_tool(tool: "BaseTool", deadline: Deadline) -> "BaseTool":
+    func = getattr(tool, "func", None)
+    if func is None:
+        return tool
+
+    @functools.wraps(func)
+    def guarded(*args, **kwargs):
+        remaining = deadline.remaining()
+        if remaining <= 0:
+            return f"Error: deadline exceeded before {tool.name} could run."
+        # in the caller's context, so the run ID (agent_log) tags the tool's log records
+        future = _TOOL_POOL.submit(contextvars.copy_context().run, func, *args, **kwargs)
+        try:
+            return future.result(timeout=remaining)
+        except FuturesTimeout:
+            future.cancel()
+            return f"Error: {tool.name} did not finish before the deadline."
+
+    # functools.wraps keeps the signature, so the rendered {tools} block is unchanged
+    return tool.model_copy(update={"func": guarded})
+
+
+def with_deadline(tools: List["BaseTool"], deadline: Deadline) -> List["BaseTool"]:
+    """Wrap function-based tools so each call is bounded by the deadline."""
+    return [_guard_tool(tool, deadline) for tool in tools]
+
+
+def _partial_answer(steps, reason: str) -> str:
+    if not steps:
+        return f"No answer: {reason}."
+    observations = "\n".join(f"- {action.tool}: {observation}" for action, observation in steps)
+    return f"Partial answer ({reason}). What I found so far:\n{observations}"
+
+
+def iter_with_deadline(agent_executor, inputs: dict, deadline: Deadline):
+    """AgentExecutor.iter() that stops cleanly at the deadline.
+
+    Yields the executor's step chunks as they come, then one result dict: the
+    usual result plus `stopped_reason`, which is None when the agent reached a
+    Final Answer in time. A deadline hit inside a step (DeadlineExceeded from
+    the LLM client or limiter, or the request timeout firing) ends the run with
+    the partial answer instead of an exception.
+    """
+    steps = []
+    reason = None
+    try:
+        for chunk in agent_executor.iter(inputs):
+            if "output" in chunk:
+                if chunk["output"] == _STOPPED_OUTPUT:
+                    reason = "time or iteration limit reached"
+                    break
+                yield {**chunk, "intermediate_steps": steps, "stopped_reason": None}
+                return
+            steps.extend(chunk.get("intermediate_step", []))
+            yield chunk
+            if deadline.expired():
+                reason = "deadline exceeded"
+                break
+    except DeadlineExceeded:
+        reason = "deadline exceeded"
+    except Exception as e:
+        # openai raises APITimeoutError when the request timeout fires mid-call
+        if not deadline.expired():
+            raise
+        reason = f"deadline exceeded during {type(e).__name__}"
+
+    yield {
+        **inputs,
+        "output": _partial_answer(steps, reason),
+        "intermediate_steps": steps,
+        "stopped_reason": reason,
+    }
+
+
+def run_with_deadline(agent_executor, inputs: dict, deadline: Deadline) -> dict:
+    """Run an AgentExecutor step by step and stop cleanly at the deadline (see iter_with_deadline)."""
+    for chunk in iter_with_deadline(agent_executor, inputs, deadline):
+        if "stopped_reason" in chunk:
+            return chunk
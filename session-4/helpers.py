@@ -1,19 +1,56 @@
 import os
-from dotenv import load_dotenv
-from langchain_openai import ChatOpenAI
-from langchain_community.cache import SQLiteCache
-from langchain.globals import set_llm_cache
+import sys
+import threading
 
-load_dotenv()
+# rate_limit.py is shared with session-2 (one copy, one limiter) and lives in common/
+COMMON_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "common")
+if COMMON_DIR not in sys.path:
+    sys.path.append(COMMON_DIR)
+
+# The langchain/OpenAI client stack is imported the first time an LLM is built,
+# so scripts that only render prompts or list tools start quickly.
+_env_lock = threading.Lock()
+_env_loaded = False
+
+def _load_env():
+    global _env_loaded
+    with _env_lock:
+        if not _env_loaded:
+            from dotenv import load_dotenv
+            load_dotenv()
+            _env_loaded = True
+
+# from langchain_community.cache import SQLiteCache
+# from langchain.globals import set_llm_cache
 # cache_dir = os.path.join(os.path.dirname(__file__), "cache")
 # os.makedirs(cache_dir, exist_ok=True)
 # cache_path = os.path.join(cache_dir, "langchain_cache.db")
 # set_llm_cache(SQLiteCache(cache_path))
 
-def get_llm(model_name="openai/gpt-4o", temperature: float = 0.0):
-    return ChatOpenAI(
+def get_llm(model_name="openai/gpt-4o", temperature: float = 0.0, deadline=None, limiter=None):
+    _load_env()
+    from rate_limit import RateLimitedChatOpenAI, get_shared_limiter
+    # Shared across processes when OPENROUTER_RPM is set; retries are then ours, not the client's.
+    # With a deadline every call gets the remaining budget as its timeout, and the
+    # client's own retries (which would overrun it) are off.
+    limiter = limiter or get_shared_limiter()
+    return RateLimitedChatOpenAI(
         base_url=os.getenv("OPENROUTER_BASE"),
         model_name=model_name,
         api_key=os.getenv("OPENROUTER_API_KEY"),
         temperature=temperature,
+        limiter=limiter,
+        deadline=deadline,
+        max_retries=0 if limiter or deadline else 2,
     )
+
+
+def get_cascade_llm(small="openai/gpt-4.1-nano", large="openai/gpt-4o", validator=None,
+                    temperature: float = 0.0):
+    """Small model first; escalate to the large model only when `validator` rejects the output.
+
+    `validator` defaults to the ReAct format check.
+    """
+    from cascade import CascadeLLM, react_format_validator
+    validator = validator or react_format_validator
+    return CascadeLLM(get_llm(small, temperature), get_llm(large, temperature), validator=validator)
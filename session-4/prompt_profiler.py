@@ -0,0 +1,94 @@
+"""
+Prompt Token Profiler
+
+Measures ReAct prompts in tokens (not characters), split into the parts that
+make up every request: instructions, tools, input and scratchpad.
+"""
+
+from typing import List
+
+from langchain_core.tools import BaseTool
+from langchain_core.tools.render import render_text_description
+
+# A typical Thought/Action/Observation step, used when no scratchpad is given
+SAMPLE_STEP = """ I need to check the weather first.
+Action: get_weather
+Action Input: Naran
+Observation: Weather in Naran: partly cloudy
+Thought:"""
+
+_encoders = {}
+
+
+def _get_encoder(model_name: str):
+    if model_name not in _encoders:
+        try:
+            import tiktoken
+            try:
+                _encoders[model_name] = tiktoken.encoding_for_model(model_name.split("/")[-1])
+            except KeyError:
+                _encoders[model_name] = tiktoken.get_encoding("o200k_base")
+        except Exception:
+            # tiktoken missing, or its encoding files can't be downloaded
+            _encoders[model_name] = None
+    return _encoders[model_name]
+
+
+def count_tokens(text: str, model_name: str = "openai/gpt-4o") -> int:
+    """Count tokens with the model's local tokenizer (~4 chars/token fallback)."""
+    encoder = _get_encoder(model_name)
+    if encoder is None:
+        return (len(text) + 3) // 4
+    return len(encoder.encode(text))
+
+
+# ============================================================================
+# Profiler
+# ============================================================================
+
+def profile_prompt(prompt, tools: List[BaseTool], question: str, scratchpad: str = "",
+                   iterations: int = 5, model_name: str = "openai/gpt-4o") -> dict:
+    """Break down the tokens of a fully rendered ReAct prompt.
+
+    Projects the total over `iterations` LLM calls: instructions, tools and input
+    are resent on every call while the scratchpad grows by one step each time.
+    """
+    tools_block = render_text_description(list(tools))
+    tool_names = ", ".join(t.name for t in tools)
+    values = {"tools": tools_block, "tool_names": tool_names, "input": question, "agent_scratchpad": scratchpad}
+    empty = {key: "" for key in values}
+
+    full = prompt.format(**values)
+    sections = {
+        "instructions": count_tokens(prompt.format(**empty), model_name),
+        "tools": count_tokens(tools_block, model_name) + count_tokens(tool_names, model_name),
+        "input": count_tokens(question, model_name),
+        "scratchpad": count_tokens(scratchpad, model_name),
+    }
+    fixed = sections["instructions"] + sections["tools"] + sections["input"]
+    step = count_tokens(scratchpad or SAMPLE_STEP, model_name)
+    projected = sum(fixed + step * i for i in range(iterations))
+
+    per_tool = sorted(
+        ((t.name, count_tokens(render_text_description([t]), model_name)) for t in tools),
+        key=lambda item: item[1],
+        reverse=True,
+    )
+    return {
+        "total": count_tokens(full, model_name),
+        "sections": sections,
+        "per_tool": per_tool,
+        "iterations": iterations,
+        "projected_total": projected,
+    }
+
+
+def print_profile(name: str, profile: dict):
+    """Pretty-print a profile_prompt() result."""
+    print(f"{name}: {profile['total']} tokens per call")
+    for section, tokens in profile["sections"].items():
+        print(f"   {section:<13}{tokens:>6}")
+    print(f"   Over {profile['iterations']} iterations: ~{profile['projected_total']} tokens")
+    print("   Most expensive tools:")
+    for tool_name, tokens in profile["per_tool"][:3]:
+        print(f"      {tool_name:<28}{tokens:>6}")
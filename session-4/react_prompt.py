@@ -5,10 +5,8 @@ This module contains the standard ReAct prompt template used across all agent ex
 The ReAct pattern requires a specific format for the LLM to follow.
 """
 
-from langchain_core.prompts import PromptTemplate
-
 # Standard ReAct prompt template
-REACT_PROMPT = PromptTemplate.from_template("""
+REACT_TEMPLATE = """
 Answer the following questions as best you can. You have access to the following tools:
 
 {tools}
@@ -28,10 +26,10 @@ Begin!
 
 Question: {input}
 Thought: {agent_scratchpad}
-""")
+"""
 
 # Concise ReAct prompt (for simpler examples)
-REACT_PROMPT_CONCISE = PromptTemplate.from_template("""
+REACT_TEMPLATE_CONCISE = """
 You are a helpful assistant. Use tools only when needed.
 
 Tools:
@@ -41,7 +39,7 @@ Format:
 Question: <user question>
 Thought: think about what to do
 Action: one of [{tool_names}]
-Action Input: {"key": "value"} (valid JSON, no quotes around the whole thing)
+Action Input: {{"key": "value"}} (valid JSON, no quotes around the whole thing)
 Observation: result of the action
 ... (repeat as needed)
 Thought: I now know the final answer
@@ -51,7 +49,26 @@ Begin!
 
 Question: {input}
 Thought: {agent_scratchpad}
-""")
+"""
+
+# Built on first use: langchain_core is slow to import
+_prompts = {}
 
 def get_react_prompt(concise=False):
-    return REACT_PROMPT_CONCISE if concise else REACT_PROMPT
+    if concise not in _prompts:
+        from langchain_core.prompts import PromptTemplate
+        _prompts[concise] = PromptTemplate.from_template(REACT_TEMPLATE_CONCISE if concise else REACT_TEMPLATE)
+    return _prompts[concise]
+
+
+def with_known_facts(prompt, known_facts):
+    """Prepend pre-resolved tool results so the agent doesn't spend actions on them."""
+    if not known_facts:
+        return prompt
+    from langchain_core.prompts import PromptTemplate
+    template = (
+        "Known facts (already looked up for you, do not use tools for these):\n"
+        "{known_facts}\n"
+        + prompt.template
+    )
+    return PromptTemplate.from_template(template).partial(known_facts=known_facts)
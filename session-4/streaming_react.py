@@ -0,0 +1,244 @@
+"""
+Streaming ReAct with Early Tool Dispatch
+
+The stock ReAct agent waits for the whole completion before parsing
+`Action:` / `Action Input:`. Here the LLM output is parsed token by token: as
+soon as a complete Action and Action Input have arrived, the stream is closed
+(which stops generation) and the action goes straight to the AgentExecutor to
+run the tool. When the model starts a `Final Answer:` that is reported too,
+and its text is passed on as it arrives.
+
+The agent reports the LLM run to the callbacks itself: `llm.stream()` would
+report a stream closed early as an error, so here the run ends with
+`on_llm_end` and the text generated up to the dispatch.
+
+The `Observation` stop sequence is applied here rather than sent to the API:
+the API withholds the newline that ends the Action Input until it knows the
+stop sequence doesn't follow, which would delay detection to the end of the
+stream.
+
+Drop-in for create_react_agent:
+
+    agent = create_streaming_react_agent(llm, tools, prompt, on_event=print_event)
+    executor = AgentExecutor(agent=agent, tools=tools, handle_parsing_errors=True)
+"""
+
+import json
+import re
+import time
+from typing import Any, Callable, List, Optional, Sequence, Union
+
+from langchain.agents import BaseSingleActionAgent
+from langchain.agents.format_scratchpad import format_log_to_str
+from langchain.agents.output_parsers import ReActSingleInputOutputParser
+from langchain_core.agents import AgentAction, AgentFinish
+from langchain_core.callbacks import AsyncCallbackManager, CallbackManager
+from langchain_core.outputs import LLMResult
+from langchain_core.outputs.chat_generation import merge_chat_generation_chunks
+from langchain_core.prompts import BasePromptTemplate
+from langchain_core.tools import BaseTool
+from langchain_core.tools.render import render_text_description
+
+FINAL_ANSWER = "Final Answer:"
+
+# Same pattern as ReActSingleInputOutputParser
+_ACTION_RE = re.compile(r"Action\s*\d*\s*:[\s]*(.*?)[\s]*Action\s*\d*\s*Input\s*\d*\s*:[\s]*(.*)", re.DOTALL)
+
+_decoder = json.JSONDecoder()
+
+
+# ============================================================================
+# Incremental parser
+# ============================================================================
+
+def _input_end(action_input: str) -> Optional[int]:
+    """Where a complete Action Input ends, or None if more tokens are needed.
+
+    Plain inputs end at the end of their line; JSON inputs once they parse.
+    """
+    stripped = action_input.lstrip(" ")
+    if stripped[:1] in ("{", "["):
+        try:
+            _, end = _decoder.raw_decode(stripped)
+        except ValueError:
+            return None
+        return len(action_input) - len(stripped) + end
+    end = action_input.find("\n")
+    return end if end > 0 else None
+
+
+class StreamingReActParser:
+    """Feed LLM text as it streams; returns an AgentAction once one is complete.
+
+    `stopped` is set when a stop sequence shows up; the text is cut there and
+    the caller should stop reading and call finish().
+    """
+
+    def __init__(self, stop: Sequence[str] = ("\nObservation",)):
+        self.stop = stop
+        self.text = ""
+        self.final_answer_started = False
+        self.stopped = False
+
+    def feed(self, piece: str) -> Optional[AgentAction]:
+        self.text += piece
+        for sequence in self.stop:
+            index = self.text.find(sequence)
+            if index != -1:
+                self.text = self.text[:index]
+                self.stopped = True
+        if self.final_answer_started:
+            return None
+        match = _ACTION_RE.search(self.text)
+        if match is None:
+            # Only once no action is in progress: a Final Answer after an
+            # Action is the parser error case and is left to finish()
+            if FINAL_ANSWER in self.text:
+                self.final_answer_started = True
+            return None
+        end = _input_end(match.group(2))
+        if end is None:
+            return None
+        tool_input = match.group(2)[:end].strip(" ").strip('"')
+        log = self.text[:match.start(2) + end]
+        return AgentAction(match.group(1).strip(), tool_input, log)
+
+    def final_answer_text(self) -> str:
+        return self.text.split(FINAL_ANSWER)[-1] if self.final_answer_started else ""
+
+    def finish(self) -> Union[AgentAction, AgentFinish]:
+        """Parse the complete output exactly like the stock ReAct parser."""
+        return ReActSingleInputOutputParser().parse(self.text)
+
+
+# ============================================================================
+# Agent
+# ============================================================================
+
+class StreamingReActAgent(BaseSingleActionAgent):
+    """ReAct agent that hands the tool call to the executor mid-stream.
+
+    `on_event(name, data)` is called with:
+      - "action": {"tool", "tool_input", "elapsed"} when an action is dispatched
+      - "final_answer": {"elapsed"} when a Final Answer begins
+      - "final_answer_token": {"text"} for each piece of the answer after that
+    """
+
+    llm: Any
+    prompt: BasePromptTemplate
+    stop: List[str] = ["\nObservation"]
+    on_event: Optional[Callable[[str, dict], None]] = None
+    stats: dict = {}
+
+    def model_post_init(self, __context):
+        self.stats = {"steps": 0, "early_dispatches": 0, "final_answers": 0}
+
+    @property
+    def input_keys(self) -> List[str]:
+        return [key for key in self.prompt.input_variables if key != "agent_scratchpad"]
+
+    def _messages(self, intermediate_steps, kwargs):
+        prompt = self.prompt.invoke({**kwargs, "agent_scratchpad": format_log_to_str(intermediate_steps)})
+        return prompt.to_messages()
+
+    def _start_run(self, manager_class, callbacks, messages):
+        # What BaseChatModel.stream() does before streaming
+        manager = manager_class.configure(callbacks, self.llm.callbacks, self.llm.verbose,
+                                          None, self.llm.tags, None, self.llm.metadata)
+        return manager.on_chat_model_start(self.llm._serialized, [messages],
+                                           invocation_params=self.llm._get_invocation_params(), batch_size=1)
+
+    def _emit(self, name, data):
+        if self.on_event is not None:
+            self.on_event(name, data)
+
+    def _on_piece(self, parser, piece, start):
+        """Feed one streamed piece; returns an action to dispatch, if complete."""
+        was_final = parser.final_answer_started
+        action = parser.feed(piece)
+        if action is not None:
+            self.stats["early_dispatches"] += 1
+            self._emit("action", {"tool": action.tool, "tool_input": action.tool_input,
+                                  "elapsed": time.monotonic() - start})
+        elif parser.final_answer_started and not was_final:
+            self.stats["final_answers"] += 1
+            self._emit("final_answer", {"elapsed": time.monotonic() - start})
+            self._emit("final_answer_token", {"text": parser.final_answer_text()})
+        elif was_final:
+            self._emit("final_answer_token", {"text": piece})
+        return action
+
+    def plan(self, intermediate_steps, callbacks=None, **kwargs):
+        self.stats["steps"] += 1
+        parser = StreamingReActParser(self.stop)
+        start = time.monotonic()
+        messages = self._messages(intermediate_steps, kwargs)
+        run_manager = self._start_run(CallbackManager, callbacks, messages)[0]
+        chunks, action = [], None
+        stream = self.llm._stream(messages)
+        try:
+            for chunk in stream:
+                run_manager.on_llm_new_token(chunk.text, chunk=chunk)
+                chunks.append(chunk)
+                action = self._on_piece(parser, chunk.text, start)
+                if action is not None or parser.stopped:
+                    break
+        except BaseException as e:
+            run_manager.on_llm_error(e, response=_result(chunks))
+            raise
+        finally:
+            stream.close()  # closing the stream drops the connection and stops generation
+        run_manager.on_llm_end(_result(chunks))
+        return action or parser.finish()
+
+    async def aplan(self, intermediate_steps, callbacks=None, **kwargs):
+        self.stats["steps"] += 1
+        parser = StreamingReActParser(self.stop)
+        start = time.monotonic()
+        messages = self._messages(intermediate_steps, kwargs)
+        run_manager = (await self._start_run(AsyncCallbackManager, callbacks, messages))[0]
+        chunks, action = [], None
+        stream = self.llm._astream(messages)
+        try:
+            async for chunk in stream:
+                await run_manager.on_llm_new_token(chunk.text, chunk=chunk)
+                chunks.append(chunk)
+                action = self._on_piece(parser, chunk.text, start)
+                if action is not None or parser.stopped:
+                    break
+        except BaseException as e:
+            await run_manager.on_llm_error(e, response=_result(chunks))
+            raise
+        finally:
+            await stream.aclose()
+        await run_manager.on_llm_end(_result(chunks))
+        return action or parser.finish()
+
+
+def _result(chunks) -> LLMResult:
+    """The generation streamed so far, as reported to on_llm_end."""
+    return LLMResult(generations=[[merge_chat_generation_chunks(chunks)]] if chunks else [[]])
+
+
+def create_streaming_react_agent(llm, tools: Sequence[BaseTool], prompt: BasePromptTemplate,
+                                 tools_renderer=render_text_description, on_event=None) -> StreamingReActAgent:
+    """Same arguments and prompt requirements as langchain's create_react_agent."""
+    missing = {"tools", "tool_names", "agent_scratchpad"}.difference(
+        prompt.input_variables + list(prompt.partial_variables))
+    if missing:
+        raise ValueError(f"Prompt missing required variables: {missing}")
+    prompt = prompt.partial(
+        tools=tools_renderer(list(tools)),
+        tool_names=", ".join(tool.name for tool in tools),
+    )
+    return StreamingReActAgent(llm=llm, prompt=prompt, on_event=on_event)
+
+
+def print_event(name, data):
+    """on_event handler for scripts: show dispatch timing and stream the answer."""
+    if name == "action":
+        print(f"\n[dispatch {data['tool']}({data['tool_input']!r}) after {data['elapsed']:.2f}s]")
+    elif name == "final_answer":
+        print(f"\n[final answer started after {data['elapsed']:.2f}s]")
+    elif name == "final_answer_token":
+        print(data["text"], end="", flush=True)
@@ -0,0 +1,171 @@
+"""
+Tool Registry with Retrieval-Based Selection
+
+Every ReAct step renders all tools into {tools}, so the prompt grows with the
+catalogue even though a question needs only a few of them. Here the tools sit
+behind a small TF-IDF index over their names, descriptions and argument
+schemas, and each question gets only its top k tools in {tools} and
+{tool_names}.
+
+The selection is widened during a run rather than fixed up front:
+- tools the agent has already used stay in the prompt
+- when the agent asks for a tool that isn't in the registry, the words of its
+  request (tool name and thought) are searched and the best matches are
+  added for the next step
+
+The AgentExecutor still gets the whole catalogue, so an action naming a
+registered tool that wasn't shown still runs.
+"""
+
+import math
+import re
+from collections import Counter
+from typing import Any, Callable, Dict, List, Sequence, Tuple
+
+from langchain.agents import BaseSingleActionAgent, create_react_agent
+from langchain_core.prompts import BasePromptTemplate
+from langchain_core.tools import BaseTool
+from langchain_core.tools.render import render_text_description
+
+_WORD_RE = re.compile(r"[a-z0-9]+")
+
+# Skipped by the index: they'd match every tool description
+_STOPWORDS = {"a", "an", "the", "and", "or", "of", "to", "for", "in", "on", "is", "are", "be", "this", "that",
+              "with", "use", "tool", "only", "returns", "get", "e", "g", "input", "any", "as", "from", "it"}
+
+
+def _terms(text: str) -> Counter:
+    # Crude plural stripping so "distances" finds "distance"
+    words = (word[:-1] if len(word) > 3 and word.endswith("s") and not word.endswith("ss") else word
+             for word in _WORD_RE.findall(text.lower().replace("_", " ")))
+    return Counter(word for word in words if word not in _STOPWORDS)
+
+
+def tool_text(tool: BaseTool) -> str:
+    """What a tool is indexed by: name, description, argument names and descriptions."""
+    parts = [tool.name, tool.description or ""]
+    for name, schema in (tool.args or {}).items():
+        parts.append(f"{name} {schema.get('description', '')}")
+    parts.extend((tool.metadata or {}).get("keywords", []))
+    return "\n".join(parts)
+
+
+class ToolRegistry:
+    """All tools of an agent behind an index; `select` picks the few a question needs."""
+
+    def __init__(self, tools: Sequence[BaseTool]):
+        self.tools = list(tools)
+        self.by_name = {tool.name: tool for tool in self.tools}
+        doc_terms = [_terms(tool_text(tool)) for tool in self.tools]
+        n = len(self.tools)
+        df = Counter(term for terms in doc_terms for term in terms)
+        self.idf = {term: math.log((n + 1) / (count + 0.5)) for term, count in df.items()}
+        self.postings: Dict[str, List[Tuple[int, float]]] = {}
+        for tool_id, terms in enumerate(doc_terms):
+            weights = {term: (1 + math.log(tf)) * self.idf[term] for term, tf in terms.items()}
+            norm = math.sqrt(sum(w * w for w in weights.values())) or 1.0
+            for term, w in weights.items():
+                self.postings.setdefault(term, []).append((tool_id, w / norm))
+
+    def search(self, text: str, k: int) -> List[BaseTool]:
+        """Top k tools by cosine similarity; tools sharing no term with `text` are left out."""
+        scores = Counter()
+        for term, tf in _terms(text).items():
+            for tool_id, w in self.postings.get(term, ()):
+                scores[tool_id] += w * (1 + math.log(tf)) * self.idf[term]
+        # Ties keep registry order
+        ranked = sorted(scores, key=lambda tool_id: (-scores[tool_id], tool_id))
+        return [self.tools[tool_id] for tool_id in ranked[:k]]
+
+    def select(self, question: str, intermediate_steps=(), k: int = 4, expand_k: int = 2) -> List[BaseTool]:
+        """Tools to show for the next step of a run, in registry order.
+
+        The question's top k (padded in registry order when fewer match), the
+        tools used so far, and `expand_k` matches for each unknown tool the
+        agent asked for. Depends only on its arguments, so a resumed run sees
+        the same tools.
+        """
+        chosen = {tool.name for tool in self.search(question, k)}
+        for tool in self.tools:
+            if len(chosen) >= min(k, len(self.tools)):
+                break
+            chosen.add(tool.name)
+        for action, _ in intermediate_steps:
+            if action.tool in self.by_name:
+                chosen.add(action.tool)
+            elif action.tool != "_Exception":  # parsing errors aren't tool requests
+                # Its name and the thought before it describe the capability; the input is just data
+                request = f"{action.tool} {action.log.split('Action:')[0]}"
+                chosen.update(tool.name for tool in self.search(request, expand_k))
+        return [tool for tool in self.tools if tool.name in chosen]
+
+
+# ============================================================================
+# Agent
+# ============================================================================
+
+class ToolSelectingAgent(BaseSingleActionAgent):
+    """Delegates each step to a ReAct agent built for the tools selected for it.
+
+    One inner agent is built per distinct tool subset and reused, so the
+    {tools} block of a subset is rendered once.
+    """
+
+    registry: Any
+    make_agent: Callable[[List[BaseTool]], Any]
+    prompt_keys: List[str]
+    k: int = 4
+    expand_k: int = 2
+    agents: dict = {}
+    stats: dict = {}
+
+    def model_post_init(self, __context):
+        self.agents = {}
+        self.stats = {"steps": 0, "tools_shown": 0, "expanded_steps": 0}
+
+    @property
+    def input_keys(self) -> List[str]:
+        return self.prompt_keys
+
+    def _inner(self, intermediate_steps, kwargs):
+        tools = self.registry.select(kwargs["input"], intermediate_steps, self.k, self.expand_k)
+        self.stats["steps"] += 1
+        self.stats["tools_shown"] += len(tools)
+        if any(action.tool not in self.registry.by_name and action.tool != "_Exception"
+               for action, _ in intermediate_steps):
+            self.stats["expanded_steps"] += 1
+        key = tuple(tool.name for tool in tools)
+        if key not in self.agents:
+            self.agents[key] = self.make_agent(tools)
+        return self.agents[key]
+
+    def plan(self, intermediate_steps, callbacks=None, **kwargs):
+        inner = self._inner(intermediate_steps, kwargs)
+        if isinstance(inner, BaseSingleActionAgent):
+            return inner.plan(intermediate_steps, callbacks=callbacks, **kwargs)
+        return inner.invoke({**kwargs, "intermediate_steps": intermediate_steps}, {"callbacks": callbacks})
+
+    async def aplan(self, intermediate_steps, callbacks=None, **kwargs):
+        inner = self._inner(intermediate_steps, kwargs)
+        if isinstance(inner, BaseSingleActionAgent):
+            return await inner.aplan(intermediate_steps, callbacks=callbacks, **kwargs)
+        return await inner.ainvoke({**kwargs, "intermediate_steps": intermediate_steps}, {"callbacks": callbacks})
+
+
+def create_tool_selecting_agent(llm, registry: ToolRegistry, prompt: BasePromptTemplate, k: int = 4,
+                                tools_renderer=render_text_description, on_event=None,
+                                expand_k: int = 2) -> ToolSelectingAgent:
+    """Like create_react_agent, but {tools} holds only the tools selected per step.
+
+    Give the AgentExecutor `registry.tools`. With `on_event`, each step streams
+    through streaming_react's agent instead.
+    """
+    def make_agent(tools):
+        if on_event is not None:
+            from streaming_react import create_streaming_react_agent
+            return create_streaming_react_agent(llm, tools, prompt, tools_renderer, on_event)
+        return create_react_agent(llm, tools, prompt, tools_renderer=tools_renderer)
+
+    prompt_keys = [key for key in prompt.input_variables if key not in ("tools", "tool_names", "agent_scratchpad")]
+    return ToolSelectingAgent(registry=registry, make_agent=make_agent, prompt_keys=prompt_keys,
+                              k=k, expand_k=expand_k)
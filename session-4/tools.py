@@ -1,8 +1,10 @@
-from typing import Type, Dict, List
+from typing import Type, Dict, List, Optional
 from pydantic import BaseModel, Field
 from langchain_core.tools import BaseTool, tool
 import random
 
+from agent_log import log_event
+
 # Pre-approved destinations from Lahore
 APPROVED_DESTINATIONS = ["Hunza", "Naran", "Skardu", "Murree", "Swat", "Gilgit"]
 APPROVED_DESTINATIONS_STR = ", ".join(APPROVED_DESTINATIONS[:-1]) + f", or {APPROVED_DESTINATIONS[-1]}"
@@ -71,7 +73,9 @@ COSTS_PER_DAY: Dict[str, int] = {
 def _validate_destination(destination: str) -> str:
     """Validate that destination is in approved list. Returns error message if invalid, empty string if valid."""
     if destination not in APPROVED_DESTINATIONS:
-        return f"Error: {destination} is not an approved destination. Use get_approved_destinations to see available options."
+        # The list itself, not a pointer to get_approved_destinations: that tool is inlined
+        # into the prompt (inline_static_tools) and isn't callable by the agent
+        return f"Error: {destination} is not an approved destination. Choose one of: {APPROVED_DESTINATIONS_STR}."
     return ""
 
 @tool
@@ -99,7 +103,7 @@ def get_weather(destination: str) -> str:
         return error
     
     weather = WEATHER_PATTERNS.get(destination.lower(), "cloudy")
-    print(f"🌤️  Weather in {destination}: {weather}")
+    log_event("tool.weather", destination=destination, weather=weather)
     # Keep output minimal and exact so the agent can’t reinterpret it
     return f"Weather in {destination}: {weather}"
 
@@ -123,7 +127,7 @@ def calculate_distance(input: str) -> str:
     distance = DISTANCES.get((origin, destination))
     if distance is None:
         return f"Error: No distance data for {origin} to {destination}"
-    print(f"📏 Distance from {origin} to {destination}: {distance} km")
+    log_event("tool.distance", origin=origin, destination=destination, km=distance)
     return f"{distance} km"
 
 
@@ -148,7 +152,7 @@ def get_travel_time(input: str) -> str:
         return f"Error: Air travel is only available to Hunza and Skardu. {destination} only supports road travel."
     import random as _r
     time_hours = _r.randint(2, 12) if mode == "road" else _r.randint(1, 6)
-    print(f"⏱️  Travel time from {origin} to {destination} by {mode}: {time_hours} hours")
+    log_event("tool.travel_time", origin=origin, destination=destination, mode=mode, hours=time_hours)
     return f"{time_hours} hours"
 
 
@@ -210,7 +214,7 @@ class CalculateDistanceTool(BaseTool):
         if not distance:
             return f"Error: No distance data for {origin} to {destination}"
         
-        print(f"📏 Distance from {origin} to {destination}: {distance} km")
+        log_event("tool.distance", origin=origin, destination=destination, km=distance)
         return f"{distance} km"
 
 
@@ -233,7 +237,7 @@ class GetTravelTimeTool(BaseTool):
         else:  # air (only for Hunza and Skardu)
             time_hours = random.randint(1, 6)
         
-        print(f"⏱️  Travel time from {origin} to {destination} by {mode}: {time_hours} hours")
+        log_event("tool.travel_time", origin=origin, destination=destination, mode=mode, hours=time_hours)
         return f"{time_hours} hours"
 
 
@@ -253,10 +257,50 @@ class CheckBudgetTool(BaseTool):
         affordable = total_cost <= budget
         status = "affordable" if affordable else "over budget"
         
-        print(f"💰 Budget check for {destination}: ${total_cost} for {days} days - {status}")
+        log_event("tool.budget", destination=destination, days=days, cost=total_cost, status=status)
         return f"Cost: ${total_cost} for {days} days, {status}"
 
 
+# ============================================================================
+# Static Tools: resolved once and inlined into the prompt instead of offered
+# as actions, saving an LLM round-trip per lookup
+# ============================================================================
+
+# "constant": same result for the whole process; "session": same result for
+# one agent/session (e.g. the user's location)
+get_user_location.metadata = {"static": "session"}
+get_approved_destinations.metadata = {"static": "constant"}
+
+_CONSTANT_RESULTS: Dict[str, str] = {}
+
+
+def _static_scope(t: BaseTool) -> str:
+    return (t.metadata or {}).get("static", "")
+
+
+def inline_static_tools(tools: List[BaseTool], session_cache: Optional[Dict[str, str]] = None):
+    """Resolve constant/session tools ahead of time.
+
+    Returns (remaining_tools, known_facts) where known_facts is a text block with
+    one line per resolved tool, ready to be put into the prompt context.
+    """
+    session_cache = {} if session_cache is None else session_cache
+    remaining, facts = [], []
+    for t in tools:
+        scope = _static_scope(t)
+        if scope == "constant":
+            cache = _CONSTANT_RESULTS
+        elif scope == "session":
+            cache = session_cache
+        else:
+            remaining.append(t)
+            continue
+        if t.name not in cache:
+            cache[t.name] = str(t.invoke({}))
+        facts.append(f"- {t.name}: {cache[t.name]}")
+    return remaining, "\n".join(facts)
+
+
 def get_travel_tools():
     """Get all travel planning tools - mixing both approaches"""
     return [
@@ -0,0 +1,264 @@
+"""
+Agent Trajectory Cache
+
+Repeat and templated questions ("distance from Lahore to X?") make the agent
+reason its way to the same tool calls every time, one LLM call per step. Here
+the tool plan of a successful run is stored under a signature of the question
+with places and numbers replaced by slots. On a hit the tools are re-run with
+the new slot values (tools are cheap, LLM calls are not) and the observations
+are checked against the stored ones:
+
+- same shape as before (only numbers differ): the stored answer is re-filled
+  with the new values, no LLM call at all, when it can be written that way
+- no new errors, but different content: one LLM call writes the Final Answer
+  from the replayed steps
+- anything else: the plan no longer fits, run the full agent loop
+"""
+
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+from contextlib import closing
+from typing import Dict, List, Tuple
+
+from langchain_core.agents import AgentAction, AgentFinish
+from langchain_core.exceptions import OutputParserException
+
+from deadline import _STOPPED_OUTPUT
+from tools import APPROVED_DESTINATIONS, DISTANCES
+
+# Relative to this folder, not the working directory
+CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "cache")
+
+TRAVEL_ENTITIES = sorted(set(APPROVED_DESTINATIONS) | {origin for origin, _ in DISTANCES})
+
+_NUMBER_RE = re.compile(r"\d+(?:\.\d+)?")
+_SLOT_RE = re.compile(r"\{(place\d+|num\d+|obs\d+_\d+)\}")
+
+# Words that don't change which tools a question needs
+_FILLER = {"a", "an", "the", "is", "s", "are", "what", "whats", "please", "can", "could", "you", "me", "tell", "i",
+           "would", "like", "know", "and", "of"}
+
+
+# ============================================================================
+# Query signatures
+# ============================================================================
+
+def normalize_query(question: str, entities: List[str] = TRAVEL_ENTITIES) -> Tuple[str, Dict[str, str]]:
+    """('What's the distance from {place1} to {place2}', {'place1': 'Lahore', ...}).
+
+    Slots are numbered in order of appearance, so "A to B" and "B to A" differ.
+    """
+    matches = []
+    for entity in entities:
+        for match in re.finditer(rf"\b{re.escape(entity)}\b", question, re.IGNORECASE):
+            matches.append((match.start(), match.end(), "place", entity))
+    for match in _NUMBER_RE.finditer(question):
+        if not any(start <= match.start() < end for start, end, _, _ in matches):
+            matches.append((match.start(), match.end(), "num", match.group()))
+    matches.sort()
+
+    slots, counts, parts, position = {}, {"place": 0, "num": 0}, [], 0
+    for start, end, kind, value in matches:
+        counts[kind] += 1
+        name = f"{kind}{counts[kind]}"
+        slots[name] = value
+        parts.append(question[position:start] + "{" + name + "}")
+        position = end
+    parts.append(question[position:])
+    words = re.sub(r"[^\w{}\s]", " ", "".join(parts).lower()).split()
+    return " ".join(word for word in words if word not in _FILLER), slots
+
+
+def _templatize(text: str, slots: Dict[str, str]) -> str:
+    # Longest values first so "3" doesn't eat part of "30"
+    for name, value in sorted(slots.items(), key=lambda item: -len(item[1])):
+        text = re.sub(rf"(?<![\w.]){re.escape(value)}(?![\w]|\.\d)", "{" + name + "}", text, flags=re.IGNORECASE)
+    return text
+
+
+def _fill(template: str, values: Dict[str, str]) -> str:
+    return _SLOT_RE.sub(lambda match: values.get(match.group(1), match.group(0)), template)
+
+
+def _shape(observation: str, slots: Dict[str, str]) -> str:
+    """Observation with slot values and numbers masked: what must match on replay."""
+    return _NUMBER_RE.sub("#", _templatize(observation, slots))
+
+
+def _is_error(observation: str) -> bool:
+    return str(observation).startswith("Error")
+
+
+def _answer_template(output: str, slots: Dict[str, str], observations: List[str]):
+    """The answer with slot values and observation numbers as placeholders.
+
+    None if any number in it can't be traced back to a slot or an observation:
+    then the answer depends on more than the values we can re-fill.
+    """
+    template = _templatize(output, slots)
+    numbers = {}
+    for i, observation in enumerate(observations):
+        for j, number in enumerate(_NUMBER_RE.findall(observation)):
+            numbers.setdefault(number, f"obs{i}_{j}")
+
+    def replace(match):
+        return "{" + numbers[match.group()] + "}" if match.group() in numbers else match.group()
+
+    # the digit closing a placeholder ("{place1}") is followed by "}" and left alone
+    template = re.sub(r"(?<![{\d.])\d+(?:\.\d+)?(?![\d}])", replace, template)
+    return None if _NUMBER_RE.search(_SLOT_RE.sub("", template)) else template
+
+
+# ============================================================================
+# Store
+# ============================================================================
+
+class TrajectoryCache:
+    """Tool plans of successful runs in SQLite, keyed by plan version, tool set and query signature."""
+
+    def __init__(self, path=os.path.join(CACHE_DIR, "trajectories.db"), entities: List[str] = TRAVEL_ENTITIES):
+        self.path = path
+        self.entities = entities
+        self.stats = {"hits": 0, "templated": 0, "one_call": 0, "diverged": 0, "misses": 0}
+        self._stats_lock = threading.Lock()
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with closing(self._connect()) as conn, conn:
+            conn.execute("CREATE TABLE IF NOT EXISTS trajectories (key TEXT PRIMARY KEY, data TEXT)")
+
+    def _connect(self):
+        return sqlite3.connect(self.path, timeout=30)
+
+    def count(self, name):
+        with self._stats_lock:
+            self.stats[name] += 1
+
+    @staticmethod
+    def _key(version, tool_names, signature):
+        return json.dumps([version, sorted(tool_names), signature])
+
+    def get(self, version, tool_names, signature):
+        with closing(self._connect()) as conn:
+            row = conn.execute("SELECT data FROM trajectories WHERE key = ?",
+                               (self._key(version, tool_names, signature),)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def put(self, version, tool_names, question, steps, output):
+        signature, slots = normalize_query(question, self.entities)
+        observations = [str(observation) for _, observation in steps]
+        data = {
+            "signature": signature,
+            "steps": [{
+                "tool": action.tool,
+                "tool_input": _templatize(str(action.tool_input), slots),
+                "log": _templatize(action.log, slots),
+                "shape": _shape(observation, slots),
+                "error": _is_error(observation),
+            } for (action, _), observation in zip(steps, observations)],
+            "answer": _answer_template(output, slots, observations),
+        }
+        with closing(self._connect()) as conn, conn:
+            conn.execute("INSERT OR REPLACE INTO trajectories (key, data) VALUES (?, ?)",
+                         (self._key(version, tool_names, signature), json.dumps(data)))
+
+
+# ============================================================================
+# Running an agent through the cache
+# ============================================================================
+
+def plan_version(agent_executor) -> str:
+    """Hash of the model(s) and prompt the agent plans with.
+
+    Part of the cache key: a plan stored for one model or prompt (including
+    its rendered tools and known facts) is never replayed for another.
+    """
+    agent = agent_executor.agent
+    if hasattr(agent, "make_agent"):  # tool_registry's agent keeps its model and prompt in the inner agents
+        agent = agent.make_agent(agent_executor.tools)
+    runnable = getattr(agent, "runnable", None)
+    parts = [type(agent).__name__]
+    for part in [*getattr(runnable, "steps", [runnable]), getattr(agent, "llm", None), getattr(agent, "prompt", None)]:
+        part = getattr(part, "bound", part)
+        if getattr(part, "model_name", None):
+            parts.append(f"{part.model_name} temperature={getattr(part, 'temperature', None)}")
+        if getattr(part, "template", None):
+            parts.append(part.template)
+            parts.append(json.dumps(getattr(part, "partial_variables", {}), sort_keys=True, default=str))
+    return hashlib.sha256("\n".join(parts).encode()).hexdigest()[:16]
+
+
+def _replay(agent_executor, entry, slots):
+    """Re-run the stored tool calls; returns (steps, same_shape) or None if they diverge."""
+    tools = {tool.name: tool for tool in agent_executor.tools}
+    steps, same_shape = [], True
+    for step in entry["steps"]:
+        tool = tools.get(step["tool"])
+        if tool is None:
+            return None
+        tool_input = _fill(step["tool_input"], slots)
+        observation = str(tool.invoke(tool_input))
+        if _is_error(observation) != step["error"]:
+            return None
+        same_shape = same_shape and _shape(observation, slots) == step["shape"]
+        steps.append((AgentAction(step["tool"], tool_input, _fill(step["log"], slots)), observation))
+    return steps, same_shape
+
+
+def _fill_answer(template, slots, steps):
+    values = dict(slots)
+    for i, (_, observation) in enumerate(steps):
+        for j, number in enumerate(_NUMBER_RE.findall(observation)):
+            values[f"obs{i}_{j}"] = number
+    return _fill(template, values)
+
+
+def run_with_trajectory_cache(agent_executor, inputs: dict, cache: TrajectoryCache) -> dict:
+    """Like agent_executor.invoke, but replays a cached tool plan when one fits.
+
+    The result has `trajectory`: "templated" (no LLM call), "one_call",
+    "diverged" (fell back to the full loop) or "full" (no cached plan).
+    """
+    question = inputs["input"]
+    version = plan_version(agent_executor)
+    tool_names = [tool.name for tool in agent_executor.tools]
+    signature, slots = normalize_query(question, cache.entities)
+    entry = cache.get(version, tool_names, signature)
+
+    if entry is not None:
+        cache.count("hits")
+        replayed = _replay(agent_executor, entry, slots)
+        if replayed is not None:
+            steps, same_shape = replayed
+            if same_shape and entry["answer"] is not None:
+                cache.count("templated")
+                return {**inputs, "output": _fill_answer(entry["answer"], slots, steps),
+                        "intermediate_steps": steps, "trajectory": "templated"}
+            # One planning call with the replayed steps in the scratchpad
+            try:
+                decision = agent_executor.agent.plan(steps, **inputs)
+            except OutputParserException:
+                decision = None
+            if isinstance(decision, AgentFinish):
+                cache.count("one_call")
+                return {**inputs, "output": decision.return_values["output"],
+                        "intermediate_steps": steps, "trajectory": "one_call"}
+        cache.count("diverged")
+        trajectory = "diverged"
+    else:
+        cache.count("misses")
+        trajectory = "full"
+
+    steps = []
+    for chunk in agent_executor.iter(inputs):
+        steps.extend(chunk.get("intermediate_step", []))
+        if "output" in chunk:
+            result = {**chunk, "intermediate_steps": steps, "trajectory": trajectory}
+            break
+    # Only clean runs are worth replaying: at least one tool call, no parsing errors,
+    # stopped by a Final Answer. A run without steps is just an answer, not a plan
+    if steps and result["output"] != _STOPPED_OUTPUT and all(action.tool in tool_names for action, _ in steps):
+        cache.put(version, tool_names, question, steps, result["output"])
+    return result
@@ -0,0 +1,131 @@
+"""
+Import-Time Benchmark
+
+Reports how long each session module takes to import in a fresh interpreter,
+using `python -X importtime`, and which of its direct imports cost the most.
+Each module is imported from its own session folder, the way the scripts run.
+
+Usage:
+    python standin/import_bench.py
+    python standin/import_bench.py --repeat 5 --top 5
+    python standin/import_bench.py session-4:4_agent_travel session-2:evaluate
+"""
+
+import argparse
+import os
+import re
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+DEFAULT_MODULES = [
+    "session-2:helpers",
+    "session-2:1_prompt",
+    "session-2:2_prompts_sensitivity",
+    "session-2:3_strategies",
+    "session-2:5_gpt_role",
+    "session-2:6_talk_pdf_2",
+    "session-2:evaluate",
+    "session-2:batch_classify",
+    "session-4:helpers",
+    "session-4:tools",
+    "session-4:react_prompt",
+    "session-4:prompt_profiler",
+    "session-4:4_agent_travel",
+    "session-4:5_react_deep_dive",
+]
+
+# "import time:       212 |       4043 |   helpers"
+_LINE_RE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \| (\s*)(\S+)")
+
+
+def parse_importtime(stderr):
+    """-X importtime output -> list of (depth, module, self_us, cumulative_us)."""
+    rows = []
+    for line in stderr.splitlines():
+        match = _LINE_RE.match(line)
+        if match:
+            self_us, cumulative_us, indent, name = match.groups()
+            rows.append((len(indent) // 2, name, int(self_us), int(cumulative_us)))
+    return rows
+
+
+def measure(session, module):
+    """Import `module` in a fresh interpreter; return (wall seconds, importtime rows)."""
+    code = f"__import__({module!r})"  # importlib.import_module bypasses -X importtime
+    start = time.perf_counter()
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", code],
+                            cwd=os.path.join(ROOT, session), capture_output=True, text=True)
+    wall = time.perf_counter() - start
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1])
+    return wall, parse_importtime(result.stderr)
+
+
+def module_cost(rows, module, top):
+    """Cumulative import time of `module` and its `top` most expensive direct imports."""
+    # Children are printed before their parent, one indent level deeper
+    for index, (depth, name, _, cumulative) in enumerate(rows):
+        if name == module and depth == 0:
+            children = []
+            for child_depth, child, _, child_cumulative in reversed(rows[:index]):
+                if child_depth == 0:
+                    break
+                if child_depth == 1:
+                    children.append((child, child_cumulative))
+            children.sort(key=lambda item: -item[1])
+            return cumulative, children[:top]
+    return 0, []
+
+
+def run_bench(targets, repeat=3, top=3):
+    results = []
+    for target in targets:
+        session, _, module = target.partition(":")
+        walls, cumulatives, heaviest = [], [], []
+        try:
+            for _ in range(repeat):
+                wall, rows = measure(session, module)
+                cumulative, heaviest = module_cost(rows, module, top)
+                walls.append(wall)
+                cumulatives.append(cumulative)
+        except RuntimeError as e:
+            results.append({"target": target, "error": str(e)})
+            continue
+        results.append({
+            "target": target,
+            "import_ms": statistics.median(cumulatives) / 1000,
+            "process_ms": statistics.median(walls) * 1000,
+            "heaviest": [(name, us / 1000) for name, us in heaviest],
+        })
+    return results
+
+
+def print_report(results):
+    print("=" * 78)
+    print(f"{'module':<34} {'import':>10} {'process':>10}   heaviest direct imports")
+    print("=" * 78)
+    for result in results:
+        if "error" in result:
+            print(f"{result['target']:<34} failed: {result['error']}")
+            continue
+        heaviest = ", ".join(f"{name} {ms:.0f}ms" for name, ms in result["heaviest"])
+        print(f"{result['target']:<34} {result['import_ms']:>8.0f}ms {result['process_ms']:>8.0f}ms   {heaviest}")
+    print("=" * 78)
+    print("import = the module's cumulative -X importtime; process = whole interpreter run")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Import time per session module")
+    parser.add_argument("targets", nargs="*", default=DEFAULT_MODULES, help="session:module (default: all scripts)")
+    parser.add_argument("--repeat", type=int, default=3, help="fresh interpreters per module (median is shown)")
+    parser.add_argument("--top", type=int, default=3, help="direct imports to list per module")
+    args = parser.parse_args()
+    print_report(run_bench(args.targets, args.repeat, args.top))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,143 @@
+"""
+Load Generator
+
+Drives the session-2 helpers or the session-4 agents at a target concurrency
+against an OpenAI-compatible endpoint (normally standin/server.py) and reports
+throughput and latency percentiles.
+
+Both sessions have their own `helpers` module, so one run targets one session.
+
+Usage:
+    python standin/server.py &
+    python standin/loadgen.py chat --concurrency 32 --requests 500
+    python standin/loadgen.py react --concurrency 8 --requests 50
+"""
+
+import argparse
+import contextlib
+import importlib
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _use_session(name):
+    path = os.path.join(ROOT, name)
+    sys.path.insert(0, path)
+    os.chdir(path)  # the sessions use paths relative to their own folder (cache/, pdfs/, data/)
+
+
+def make_chat_target(model):
+    """session-2: get_llm().invoke on a distinct prompt per request (so the cache doesn't answer)."""
+    _use_session("session-2")
+    os.makedirs("cache", exist_ok=True)
+    helpers = importlib.import_module("helpers")
+    llm = helpers.get_llm(model)
+    from langchain.globals import set_llm_cache
+    set_llm_cache(None)  # after get_llm, which installs the SQLite cache on first use
+    counter = iter(range(10 ** 9))
+    lock = threading.Lock()
+
+    def run():
+        with lock:
+            n = next(counter)
+        return llm.invoke(f"Explain blockchain in 3 bullet points. (request {n})").content
+    return run
+
+
+def make_react_target(model):
+    """session-4: the calculator/search ReAct agent from 5_react_deep_dive.py."""
+    _use_session("session-4")
+    helpers = importlib.import_module("helpers")
+    demo = importlib.import_module("5_react_deep_dive")
+
+    def run():
+        agent = demo.create_react_agent_demo(helpers.get_llm(model))
+        return agent.invoke({"input": "What is 20 + 10, then multiply by 2?"})["output"]
+    return run
+
+
+def make_travel_target(model):
+    """session-4: the travel agent (pulls its prompt from LangChain Hub once)."""
+    _use_session("session-4")
+    travel = importlib.import_module("4_agent_travel")
+
+    def run():
+        agent = travel.create_travel_agent()
+        return agent.invoke({"input": "What's the distance from Lahore to Murree?"})["output"]
+    return run
+
+
+TARGETS = {"chat": make_chat_target, "react": make_react_target, "travel": make_travel_target}
+
+
+def _percentile(values, p):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(p / 100 * (len(ordered) - 1))))]
+
+
+def run_load(run, requests, concurrency):
+    latencies, errors = [], []
+    lock = threading.Lock()
+
+    def one(_):
+        start = time.perf_counter()
+        try:
+            run()
+        except Exception as e:
+            with lock:
+                errors.append(type(e).__name__)
+            return
+        with lock:
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(one, range(requests)))
+    elapsed = time.perf_counter() - start
+    return latencies, errors, elapsed
+
+
+def print_report(latencies, errors, elapsed, concurrency):
+    print("=" * 60)
+    print(f"Concurrency:  {concurrency}")
+    print(f"Completed:    {len(latencies)}  Errors: {len(errors)}")
+    print(f"Elapsed:      {elapsed:.2f}s")
+    print(f"Throughput:   {len(latencies) / elapsed:.2f} req/s")
+    if latencies:
+        for p in (50, 90, 95, 99):
+            print(f"p{p}:          {_percentile(latencies, p) * 1000:.0f} ms")
+        print(f"max:          {max(latencies) * 1000:.0f} ms")
+    if errors:
+        counts = {name: errors.count(name) for name in set(errors)}
+        print(f"Error types:  {counts}")
+    print("=" * 60)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load-test the sessions against an OpenAI-compatible endpoint")
+    parser.add_argument("target", choices=sorted(TARGETS))
+    parser.add_argument("--base-url", default="http://127.0.0.1:8800/v1")
+    parser.add_argument("--model", default="openai/gpt-4.1-nano")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--show-output", action="store_true", help="don't silence agent verbose output")
+    args = parser.parse_args()
+
+    # helpers read these through load_dotenv, which doesn't override existing variables
+    os.environ["OPENROUTER_BASE"] = args.base_url
+    os.environ.setdefault("OPENROUTER_API_KEY", "standin")
+
+    run = TARGETS[args.target](args.model)
+    quiet = contextlib.nullcontext() if args.show_output else contextlib.redirect_stdout(open(os.devnull, "w"))
+    with quiet:
+        latencies, errors, elapsed = run_load(run, args.requests, args.concurrency)
+    print_report(latencies, errors, elapsed, args.concurrency)
+
+
+if __name__ == "__main__":
+    main()
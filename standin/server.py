@@ -0,0 +1,366 @@
+"""
+OpenAI-Compatible Stand-In Server
+
+A local fake of the chat completions endpoint, for load-testing the sessions
+without spending real tokens. Point the scripts at it with:
+
+    OPENROUTER_BASE=http://127.0.0.1:8800/v1 OPENROUTER_API_KEY=x python 4_agent_travel.py
+
+Configurable latency distribution, generation speed, error injection and
+scripted responses. ReAct prompts get a plausible Thought/Action sequence that
+uses the tools listed in the prompt and ends with a Final Answer.
+
+The batch API is emulated too (/v1/files, /v1/batches): an uploaded JSONL
+file is answered line by line after --batch-delay seconds, with the error rate
+applied per line (failed lines go to the error file). With --batch-expire-rate
+some batches expire instead: only the first half of their lines is answered,
+the rest get `batch_expired` errors. Batches cancelled while in progress end
+the same way with `batch_cancelled`.
+
+Usage:
+    python standin/server.py --latency lognormal:300,0.5 --tokens-per-second 80 --error-rate 0.02
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import random
+import re
+import time
+import uuid
+
+from aiohttp import web
+
+_TOOL_NAMES_RE = re.compile(r"one of \[([^\]]*)\]")
+
+
+# ============================================================================
+# Latency and Errors
+# ============================================================================
+
+def parse_latency(spec):
+    """'fixed:200', 'uniform:100,500' or 'lognormal:300,0.5' (median ms, sigma) -> sampler."""
+    kind, _, args = spec.partition(":")
+    values = [float(v) for v in args.split(",") if v]
+    if kind == "fixed":
+        return lambda: values[0] / 1000
+    if kind == "uniform":
+        return lambda: random.uniform(values[0], values[1]) / 1000
+    if kind == "lognormal":
+        median, sigma = values
+        return lambda: random.lognormvariate(math.log(median), sigma) / 1000
+    raise ValueError(f"Unknown latency spec: {spec}")
+
+
+def _error_response(status):
+    headers = {"retry-after": "1"} if status == 429 else {}
+    message = "Rate limit exceeded" if status == 429 else "Internal server error"
+    return web.json_response({"error": {"message": message, "type": "standin_error"}}, status=status, headers=headers)
+
+
+# ============================================================================
+# Scripted Responses
+# ============================================================================
+
+def _count_tokens(text):
+    return max(1, len(text) // 4)
+
+
+def _content_text(content):
+    if isinstance(content, list):  # content parts
+        return "".join(part.get("text", "") for part in content if isinstance(part, dict))
+    return str(content)
+
+
+def _prompt_text(messages):
+    return "\n".join(_content_text(message.get("content", "")) for message in messages)
+
+
+def scripted_reply(messages, script):
+    """Pick a reply: first matching script rule, then ReAct emulation, then a canned answer."""
+    prompt = _prompt_text(messages)
+    for rule in script:
+        if re.search(rule["match"], prompt, re.IGNORECASE | re.DOTALL):
+            return rule["response"]
+
+    tool_names = _TOOL_NAMES_RE.search(prompt)
+    if tool_names and "Thought:" in prompt:
+        tools = [name.strip() for name in tool_names.group(1).split(",") if name.strip()]
+        observations = prompt.count("Observation:") - 1  # one is in the format instructions
+        if tools and observations < min(2, len(tools)):
+            tool = tools[observations % len(tools)]
+            # like a real model, keep going with a made-up observation unless stopped
+            return (f" I should use {tool} next.\nAction: {tool}\nAction Input: Lahore to Murree"
+                    "\nObservation: (imagined) It is about 270 km.\nThought: I now know the final answer"
+                    "\nFinal Answer: About 270 km.")
+        return " I now know the final answer\nFinal Answer: This is a stand-in answer based on the observations."
+
+    return "This is a stand-in response from the local test server."
+
+
+def _apply_stop(text, stop):
+    for sequence in ([stop] if isinstance(stop, str) else stop or []):
+        index = text.find(sequence)
+        if index != -1:
+            text = text[:index]
+    return text
+
+
+# ============================================================================
+# Endpoints
+# ============================================================================
+
+def _completion(model, content, prompt_tokens, completion_tokens):
+    return {
+        "id": f"chatcmpl-{uuid.uuid4().hex}",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": model,
+        "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+        "usage": {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens,
+        },
+    }
+
+
+async def chat_completions(request):
+    config = request.app["config"]
+    body = await request.json()
+    request.app["stats"]["requests"] += 1
+
+    if random.random() < config.error_rate:
+        request.app["stats"]["errors"] += 1
+        return _error_response(random.choice(config.error_codes))
+
+    model = body.get("model", "standin")
+    messages = body.get("messages", [])
+    content = _apply_stop(scripted_reply(messages, config.script), body.get("stop"))
+    prompt_tokens = _count_tokens(_prompt_text(messages))
+    completion_tokens = _count_tokens(content)
+
+    # time to first token, then generation at the configured token rate
+    await asyncio.sleep(config.latency())
+    if not body.get("stream"):
+        await asyncio.sleep(completion_tokens / config.tokens_per_second)
+        return web.json_response(_completion(model, content, prompt_tokens, completion_tokens))
+
+    response = web.StreamResponse(headers={"Content-Type": "text/event-stream", "Cache-Control": "no-cache"})
+    await response.prepare(request)
+    chunk_id = f"chatcmpl-{uuid.uuid4().hex}"
+    pieces = re.findall(r"\S+\s*|\s+", content) or [""]
+    for i, piece in enumerate(pieces):
+        delta = {"role": "assistant", "content": piece} if i == 0 else {"content": piece}
+        chunk = {"id": chunk_id, "object": "chat.completion.chunk", "created": int(time.time()), "model": model,
+                 "choices": [{"index": 0, "delta": delta, "finish_reason": None}]}
+        await response.write(f"data: {json.dumps(chunk)}\n\n".encode())
+        await asyncio.sleep(_count_tokens(piece) / config.tokens_per_second)
+    final = {"id": chunk_id, "object": "chat.completion.chunk", "created": int(time.time()), "model": model,
+             "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}],
+             "usage": {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens,
+                       "total_tokens": prompt_tokens + completion_tokens}}
+    await response.write(f"data: {json.dumps(final)}\n\ndata: [DONE]\n\n".encode())
+    await response.write_eof()
+    return response
+
+
+# ============================================================================
+# Batch API
+# ============================================================================
+
+def _file_object(file_id, filename, data, purpose):
+    return {"id": file_id, "object": "file", "bytes": len(data), "created_at": int(time.time()),
+            "filename": filename, "purpose": purpose, "status": "processed"}
+
+
+def _store_file(app, filename, data, purpose):
+    file_id = f"file-{uuid.uuid4().hex[:24]}"
+    app["files"][file_id] = (_file_object(file_id, filename, data, purpose), data)
+    return file_id
+
+
+async def upload_file(request):
+    form = await request.post()
+    upload = form["file"]
+    data = upload.file.read()
+    file_id = _store_file(request.app, upload.filename, data, form.get("purpose", "batch"))
+    return web.json_response(request.app["files"][file_id][0])
+
+
+async def get_file(request):
+    entry = request.app["files"].get(request.match_info["file_id"])
+    if entry is None:
+        return web.json_response({"error": {"message": "No such file"}}, status=404)
+    return web.json_response(entry[0])
+
+
+async def file_content(request):
+    entry = request.app["files"].get(request.match_info["file_id"])
+    if entry is None:
+        return web.json_response({"error": {"message": "No such file"}}, status=404)
+    return web.Response(body=entry[1], content_type="application/jsonl")
+
+
+def _answer_line(config, request_line):
+    custom_id = request_line["custom_id"]
+    if random.random() < config.error_rate:
+        status = random.choice(config.error_codes)
+        return False, {"id": f"batch_req_{uuid.uuid4().hex}", "custom_id": custom_id,
+                       "response": {"status_code": status, "request_id": uuid.uuid4().hex,
+                                    "body": {"error": {"message": "Injected error", "type": "standin_error"}}},
+                       "error": None}
+    body = request_line["body"]
+    messages = body.get("messages", [])
+    content = _apply_stop(scripted_reply(messages, config.script), body.get("stop"))
+    completion = _completion(body.get("model", "standin"), content,
+                             _count_tokens(_prompt_text(messages)), _count_tokens(content))
+    return True, {"id": f"batch_req_{uuid.uuid4().hex}", "custom_id": custom_id,
+                  "response": {"status_code": 200, "request_id": uuid.uuid4().hex, "body": completion},
+                  "error": None}
+
+
+def _not_run_line(request_line, code):
+    # What the API writes for requests a batch never got to
+    message = {"batch_expired": "This request could not be executed before the completion window expired.",
+               "batch_cancelled": "This request was not executed because the batch was cancelled."}[code]
+    return {"id": f"batch_req_{uuid.uuid4().hex}", "custom_id": request_line["custom_id"],
+            "response": None, "error": {"code": code, "message": message}}
+
+
+async def _process_batch(app, batch):
+    config = app["config"]
+    await asyncio.sleep(config.batch_delay / 2)
+    if batch["status"] == "cancelling":
+        batch.update(status="cancelled", cancelled_at=int(time.time()))
+        return
+    batch.update(status="in_progress", in_progress_at=int(time.time()))
+    await asyncio.sleep(config.batch_delay / 2)
+    _, data = app["files"][batch["input_file_id"]]
+    lines = [json.loads(line) for line in data.decode("utf-8").splitlines() if line.strip()]
+    end_status, not_run = "completed", None
+    if batch["status"] == "cancelling":
+        end_status, not_run = "cancelled", "batch_cancelled"
+    elif random.random() < config.batch_expire_rate:
+        end_status, not_run = "expired", "batch_expired"
+    finished = len(lines) if not_run is None else len(lines) // 2
+    outputs, errors = [], []
+    for index, request_line in enumerate(lines):
+        if index < finished:
+            ok, record = _answer_line(config, request_line)
+        else:
+            ok, record = False, _not_run_line(request_line, not_run)
+        (outputs if ok else errors).append(json.dumps(record) + "\n")
+    app["stats"]["batch_requests"] += len(outputs) + len(errors)
+    if outputs:
+        batch["output_file_id"] = _store_file(app, "batch_output.jsonl", "".join(outputs).encode(), "batch_output")
+    if errors:
+        batch["error_file_id"] = _store_file(app, "batch_errors.jsonl", "".join(errors).encode(), "batch_output")
+    batch["request_counts"] = {"total": len(outputs) + len(errors), "completed": len(outputs), "failed": len(errors)}
+    batch.update({"status": end_status, f"{end_status}_at": int(time.time())})
+
+
+async def create_batch(request):
+    app = request.app
+    body = await request.json()
+    if body.get("input_file_id") not in app["files"]:
+        return web.json_response({"error": {"message": "No such file"}}, status=400)
+    batch_id = f"batch_{uuid.uuid4().hex[:24]}"
+    batch = app["batches"][batch_id] = {
+        "id": batch_id, "object": "batch", "endpoint": body.get("endpoint"), "errors": None,
+        "input_file_id": body["input_file_id"], "completion_window": body.get("completion_window", "24h"),
+        "status": "validating", "output_file_id": None, "error_file_id": None, "created_at": int(time.time()),
+        "request_counts": {"total": 0, "completed": 0, "failed": 0}, "metadata": body.get("metadata"),
+    }
+    app["stats"]["batches"] += 1
+    asyncio.get_running_loop().create_task(_process_batch(app, batch))
+    return web.json_response(batch)
+
+
+async def get_batch(request):
+    batch = request.app["batches"].get(request.match_info["batch_id"])
+    if batch is None:
+        return web.json_response({"error": {"message": "No such batch"}}, status=404)
+    return web.json_response(batch)
+
+
+async def list_batches(request):
+    # Newest first, paged with ?after=<batch_id>&limit=N like the real API
+    batches = list(reversed(request.app["batches"].values()))
+    after = request.query.get("after")
+    if after:
+        ids = [batch["id"] for batch in batches]
+        batches = batches[ids.index(after) + 1:] if after in ids else []
+    limit = int(request.query.get("limit", 20))
+    page = batches[:limit]
+    return web.json_response({"object": "list", "data": page, "has_more": len(batches) > limit,
+                              "first_id": page[0]["id"] if page else None,
+                              "last_id": page[-1]["id"] if page else None})
+
+
+async def cancel_batch(request):
+    batch = request.app["batches"].get(request.match_info["batch_id"])
+    if batch is None:
+        return web.json_response({"error": {"message": "No such batch"}}, status=404)
+    if batch["status"] in ("validating", "in_progress"):
+        batch["status"] = "cancelling"
+    return web.json_response(batch)
+
+
+async def list_models(request):
+    return web.json_response({"object": "list", "data": [{"id": "standin", "object": "model"}]})
+
+
+async def stats(request):
+    return web.json_response(request.app["stats"])
+
+
+def create_app(config):
+    app = web.Application(client_max_size=64 * 1024 * 1024)
+    app["config"] = config
+    app["stats"] = {"requests": 0, "errors": 0, "batches": 0, "batch_requests": 0}
+    app["files"] = {}
+    app["batches"] = {}
+    app.router.add_post("/v1/chat/completions", chat_completions)
+    app.router.add_post("/v1/files", upload_file)
+    app.router.add_get("/v1/files/{file_id}", get_file)
+    app.router.add_get("/v1/files/{file_id}/content", file_content)
+    app.router.add_post("/v1/batches", create_batch)
+    app.router.add_get("/v1/batches", list_batches)
+    app.router.add_get("/v1/batches/{batch_id}", get_batch)
+    app.router.add_post("/v1/batches/{batch_id}/cancel", cancel_batch)
+    app.router.add_get("/v1/models", list_models)
+    app.router.add_get("/stats", stats)
+    return app
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Local OpenAI-compatible stand-in server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8800)
+    parser.add_argument("--latency", default="lognormal:300,0.5", help="fixed:MS | uniform:A,B | lognormal:MEDIAN,SIGMA")
+    parser.add_argument("--tokens-per-second", type=float, default=100.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--error-codes", type=int, nargs="*", default=[429, 500])
+    parser.add_argument("--batch-delay", type=float, default=2.0, help="seconds until a submitted batch completes")
+    parser.add_argument("--batch-expire-rate", type=float, default=0.0,
+                        help="fraction of batches that expire with half their requests unanswered")
+    parser.add_argument("--script", help='JSON file: [{"match": "regex", "response": "text"}, ...]')
+    args = parser.parse_args(argv)
+    args.latency = parse_latency(args.latency)
+    if args.script:
+        with open(args.script) as f:
+            args.script = json.load(f)
+    else:
+        args.script = []
+    return args
+
+
+def main():
+    config = parse_args()
+    web.run_app(create_app(config), host=config.host, port=config.port)
+
+
+if __name__ == "__main__":
+    main()